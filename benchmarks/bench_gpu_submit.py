@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy gpu_submit.sh pipeline vs the Python submission engine.
+
+Runs a batch of debug files against the local mock cluster
+(tools/mock_cluster) and reports wall-clock time, CPU time (user+sys of the
+whole process tree) and the number of API requests for:
+
+- legacy:   benchmarks/gpu_submit_legacy.sh (curl + python3 -c per field)
+- serial:   tools/fairy.py batch --max-in-flight 1
+- parallel: tools/fairy.py batch --max-in-flight <files>
+
+usage: python benchmarks/bench_gpu_submit.py [--files 20] [--run-time 1.0] [--json out.json]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LEGACY_SCRIPT = ROOT / "benchmarks" / "gpu_submit_legacy.sh"
+FAIRY = ROOT / "tools" / "fairy.py"
+
+sys.path.insert(0, str(ROOT / "tools"))
+from mock_cluster.server import MockSettings, run_in_thread
+
+
+def make_workdir(n_files):
+    """Creates a temp dir with n_files debug files (cycled from code/)."""
+    workdir = Path(tempfile.mkdtemp(prefix="fairy-bench-"))
+    (workdir / "code").mkdir()
+    sources = sorted((ROOT / "code").glob("*_*_*.py"))
+    for i in range(n_files):
+        source = sources[i % len(sources)]
+        competition = source.stem.rsplit("_", 2)[0]
+        shutil.copy(source, workdir / "code" / f"{competition}_bench{i:03d}_0.py")
+    return workdir
+
+
+def run_scenario(name, cmd, n_files, run_time, poll_interval):
+    settings = MockSettings(nodes=n_files, run_time=(run_time, run_time), fail_rate=0, timeout_rate=0,
+                            error_rate=1.0, stdout_bytes=4000, seed=0)
+    server, url, app = run_in_thread(settings)
+    workdir = make_workdir(n_files)
+    # A result cache of its own: scenarios must not serve each other's results,
+    # and mock output must never land in the repo's cache under real code's keys
+    env = dict(os.environ, SERVER_URL=url, TOKEN="bench-token", USER_ID="bench",
+               POLL_INTERVAL=str(poll_interval), RESULT_CACHE_DIR=str(workdir / ".cache" / "results"))
+    try:
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        subprocess.run(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        wall = time.perf_counter() - started
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        written = len(list((workdir / "logs").glob("*/*.jsonl")))
+    finally:
+        server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {
+        "scenario": name,
+        "files": n_files,
+        "logs_written": written,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "cpu_per_file_ms": round(cpu / n_files * 1000, 1),
+        "requests": app.state.stats["requests"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gpu_submit.sh vs fairy batch against a mock cluster")
+    parser.add_argument("--files", type=int, default=20, help="number of debug files in the batch")
+    parser.add_argument("--run-time", type=float, default=1.0, help="simulated job runtime in seconds")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="status poll interval for both pipelines")
+    parser.add_argument("--skip-legacy", action="store_true", help="don't run the legacy shell pipeline")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    python = sys.executable
+    scenarios = []
+    if not args.skip_legacy and shutil.which("bash") and shutil.which("curl"):
+        scenarios.append(("legacy", ["bash", str(LEGACY_SCRIPT)]))
+    batch = [python, str(FAIRY), "batch", "--poll-interval", str(args.poll_interval)]
+    scenarios.append(("serial", batch + ["--max-in-flight", "1"]))
+    scenarios.append(("parallel", batch + ["--max-in-flight", str(args.files)]))
+
+    results = []
+    print(f"{'scenario':<10} {'files':>5} {'logs':>5} {'wall_s':>8} {'cpu_s':>8} {'cpu/file':>10} {'requests':>9}")
+    for name, cmd in scenarios:
+        r = run_scenario(name, cmd, args.files, args.run_time, args.poll_interval)
+        results.append(r)
+        print(f"{r['scenario']:<10} {r['files']:>5} {r['logs_written']:>5} {r['wall_s']:>8.2f} "
+              f"{r['cpu_s']:>8.2f} {r['cpu_per_file_ms']:>8.1f}ms {r['requests']:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "gpu_submit", "args": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the debug-row pipeline:
+
+    scaffold -> submit -> poll -> collect -> generate_row_data
+
+Every competition script in code/ is pushed through the pipeline against
+the local mock cluster, once per log size (1 KB, 50 KB and 5 MB of console
+output by default). Each stage is timed per job; the report shows p50/p95
+latency per stage and log size plus API requests per job, and is written
+to a JSON file for regression tracking.
+
+usage:
+    python benchmarks/bench_pipeline.py [--repeat 1] [--output bench_pipeline.json]
+    python benchmarks/bench_pipeline.py --baseline old.json   # exit 1 on p95 regressions
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+sys.path.insert(0, str(ROOT / "scripts_python"))
+
+from batch_runner import parse_code_filename
+from cluster_client import ClusterClient
+from generate_sheet_row import generate_row_data
+from job_poller import TERMINAL_STATUSES, JobPoller
+from log_normalizer import normalize_stream
+from mock_cluster.server import MockSettings, run_in_thread
+
+TEMPLATE_PATH = ROOT / "tools" / "templates" / "debug_template.py"
+STAGES = ("scaffold", "submit", "poll", "collect", "generate_row", "total")
+LOG_SIZES = {"1KB": 1024, "50KB": 50 * 1024, "5MB": 5 * 1024 * 1024}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_one(fixture, index, workdir, client, poller):
+    """Runs one fixture through every stage and returns {stage: seconds}."""
+    competition_id, datarow_id, step = parse_code_filename(fixture)
+    datarow_id = f"{datarow_id}r{index}"
+    code_path = workdir / "code" / f"{competition_id}_{datarow_id}_{step}.py"
+    log_path = workdir / "logs" / datarow_id / f"{step}.jsonl"
+    timings = {}
+    started = time.perf_counter()
+
+    # scaffold: template copy + the edited code written over it (what the UI does)
+    t = time.perf_counter()
+    shutil.copy(TEMPLATE_PATH, code_path)
+    code_path.write_bytes(fixture.read_bytes())
+    timings["scaffold"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    response = client.submit(code_path, competition_id, datarow_id, expected_time=300, timeout=0.1)
+    job_id = response["job_id"]
+    timings["submit"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    done = threading.Event()
+
+    def on_change(changed_id, state, previous):
+        if changed_id == job_id and state.get("status") in TERMINAL_STATUSES:
+            done.set()
+
+    unsubscribe = poller.subscribe(on_change)
+    poller.watch(job_id)
+    done.wait(timeout=600)
+    unsubscribe()
+    timings["poll"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    processed, _ = normalize_stream(client.stream_results(job_id))
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.write_text(processed + "\n", encoding="utf-8")
+    timings["collect"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    generate_row_data(competition_id, datarow_id, int(step), root_path=workdir)
+    timings["generate_row"] = time.perf_counter() - t
+
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def run_size(label, n_bytes, fixtures, repeat, run_time, poll_interval):
+    settings = MockSettings(nodes=len(fixtures) * repeat, run_time=(run_time, run_time),
+                            fail_rate=0, timeout_rate=0, error_rate=1.0, stdout_bytes=n_bytes, seed=0)
+    server, url, app = run_in_thread(settings)
+    workdir = Path(tempfile.mkdtemp(prefix="fairy-bench-"))
+    (workdir / "code").mkdir()
+    (workdir / "logs").mkdir()
+
+    client = ClusterClient(url, "bench-token", "bench", pool_size=len(fixtures) * repeat)
+    poller = JobPoller(client, interval=poll_interval).start()
+    jobs = [(fixture, i) for i in range(repeat) for fixture in fixtures]
+    try:
+        # generate_row_data prints progress; silence it once for all worker threads
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            samples = list(pool.map(lambda job: run_one(job[0], job[1], workdir, client, poller), jobs))
+    finally:
+        poller.stop()
+        server.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stages = {}
+    for stage in STAGES:
+        values = [sample[stage] for sample in samples]
+        stages[stage] = {
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2),
+        }
+    return {
+        "log_size": label,
+        "log_bytes": n_bytes,
+        "jobs": len(samples),
+        "requests_per_job": round(app.state.stats["requests"] / len(samples), 2),
+        "stages": stages,
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Returns a list of (log_size, stage, old_p95, new_p95) regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["log_size"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get(result["log_size"])
+        if not old:
+            continue
+        for stage in STAGES:
+            # 'poll' and 'total' include the simulated run time; compare the work stages only
+            if stage in ("poll", "total") or stage not in old["stages"]:
+                continue
+            old_p95 = old["stages"][stage]["p95_ms"]
+            new_p95 = result["stages"][stage]["p95_ms"]
+            if new_p95 > old_p95 * (1 + tolerance) and new_p95 - old_p95 > 1.0:
+                regressions.append((result["log_size"], stage, old_p95, new_p95))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the debug-row pipeline against a mock cluster")
+    parser.add_argument("--sizes", default=",".join(LOG_SIZES), help=f"log sizes to run ({', '.join(LOG_SIZES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per fixture and log size")
+    parser.add_argument("--run-time", type=float, default=0.5, help="simulated job runtime in seconds")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="base poll interval in seconds")
+    parser.add_argument("--output", default="bench_pipeline.json", help="JSON results file")
+    parser.add_argument("--baseline", help="previous results file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    fixtures = sorted(p for p in (ROOT / "code").glob("*_*_*.py") if parse_code_filename(p))
+    results = []
+    for label in args.sizes.split(","):
+        result = run_size(label, LOG_SIZES[label], fixtures, args.repeat, args.run_time, args.poll_interval)
+        results.append(result)
+        print(f"\n== log size {label}: {result['jobs']} jobs, {result['requests_per_job']} requests/job ==")
+        print(f"{'stage':<14} {'p50_ms':>10} {'p95_ms':>10} {'max_ms':>10}")
+        for stage, s in result["stages"].items():
+            print(f"{stage:<14} {s['p50_ms']:>10.2f} {s['p95_ms']:>10.2f} {s['max_ms']:>10.2f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": "pipeline",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+            "fixtures": [p.name for p in fixtures],
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for size, stage, old, new in regressions:
+            print(f"REGRESSION {size}/{stage}: p95 {old:.2f}ms -> {new:.2f}ms")
+        if regressions:
+            sys.exit(1)
+        print("No p95 regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
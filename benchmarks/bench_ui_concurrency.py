@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the fairy_ui server: does /api/status stay fast
+while slow requests are in flight?
+
+The UI server runs in-process against the local mock cluster (with
+--cluster-latency added to every cluster call) and a stand-in LM Studio
+that answers after --llm-latency seconds. Status pollers hit
+/api/status for --duration seconds twice:
+
+- idle: nothing else running
+- load: --cancels clients cancelling remote jobs and --rows clients
+  generating step 0 sheet rows (LM Studio scored) in a loop
+
+The report shows status latency p50/p99 for both phases and is written to a
+JSON file. The run fails (exit 1) when the loaded p99 exceeds the idle p99
+by more than --tolerance (and by more than --slack-ms).
+
+usage:
+    python benchmarks/bench_ui_concurrency.py [--duration 10] [--output bench_ui_concurrency.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+sys.path.insert(0, str(ROOT / "tools" / "fairy_ui"))
+sys.path.insert(0, str(ROOT / "scripts_python"))
+
+from cluster_client import ClusterClient
+from mock_cluster.server import MockSettings, run_in_thread
+
+STATUS_LOG_BYTES = 50 * 1024
+# Analysis without an exception name: the rules leave it to LM Studio
+ANALYSIS = "The model setup looks wrong and the run fails before training (request {})."
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def free_port(host="127.0.0.1"):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, host="127.0.0.1"):
+    """Starts app with uvicorn in a background thread; returns (server, base_url)."""
+    import uvicorn
+
+    port = free_port(host)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}"
+
+
+def slow_lm_studio(latency):
+    """An OpenAI-style chat endpoint that answers "1" after latency seconds."""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def complete():
+        await asyncio.sleep(latency)
+        return {"choices": [{"message": {"content": "1"}}]}
+
+    return serve(app)
+
+
+def make_workdir(n_status, n_cancel, n_rows, job_ids):
+    """Creates code/ and logs/ with completed runs to poll, runs to cancel and rows to generate."""
+    workdir = Path(tempfile.mkdtemp(prefix="fairy-bench-ui-"))
+    (workdir / "code").mkdir()
+    source = sorted((ROOT / "code").glob("*_*_0.py"))[0]
+    stdout = [f"epoch {i}: loss=0.{i:04d}\n" for i in range(STATUS_LOG_BYTES // 20)]
+    log = json.dumps({"success": False, "exec_time": 12.5, "stdout": stdout}, indent=2)
+
+    for i in range(n_status):
+        (workdir / "logs" / f"status{i}").mkdir(parents=True)
+        (workdir / "logs" / f"status{i}" / "0.jsonl").write_text(log, encoding="utf-8")
+    for i in range(n_cancel):
+        (workdir / "logs" / f"cancel{i}").mkdir(parents=True)
+        (workdir / "logs" / f"cancel{i}" / "0.raw.log").write_text(f"Job ID: {job_ids[i]}\n", encoding="utf-8")
+    for i in range(n_rows):
+        (workdir / "logs" / f"row{i}").mkdir(parents=True)
+        (workdir / "logs" / f"row{i}" / "0.jsonl").write_text(log, encoding="utf-8")
+        shutil.copy(source, workdir / "code" / f"bench_row{i}_0.py")
+    return workdir
+
+
+def poll_status(base_url, index, n_status, stop):
+    """Polls /api/status until stop is set; returns the latencies in seconds."""
+    latencies = []
+    with requests.Session() as session:
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(f"{base_url}/api/status/status{index % n_status}/0", timeout=60).raise_for_status()
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def cancel_loop(base_url, index, stop):
+    done = 0
+    with requests.Session() as session:
+        while not stop.is_set():
+            session.post(f"{base_url}/api/cancel/cancel{index}/0", timeout=120).raise_for_status()
+            done += 1
+    return done
+
+
+def row_loop(base_url, index, stop, counter):
+    done = 0
+    with requests.Session() as session:
+        while not stop.is_set():
+            analysis = ANALYSIS.format(next(counter))
+            response = session.post(f"{base_url}/api/generate_row", timeout=120, json={
+                "competition_id": "bench", "datarow_id": f"row{index}", "debug_step": 0,
+                "proposed_analysis": analysis,
+            })
+            response.raise_for_status()
+            done += 1
+    return done
+
+
+def run_phase(base_url, args, load):
+    """Polls status for args.duration seconds, with or without slow requests running."""
+    stop = threading.Event()
+    counter = iter(range(10 ** 9))
+    workers = args.pollers + (args.cancels + args.rows if load else 0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pollers = [pool.submit(poll_status, base_url, i, args.pollers, stop) for i in range(args.pollers)]
+        cancels = [pool.submit(cancel_loop, base_url, i, stop) for i in range(args.cancels)] if load else []
+        rows = [pool.submit(row_loop, base_url, i, stop, counter) for i in range(args.rows)] if load else []
+        time.sleep(args.duration)
+        stop.set()
+        latencies = [value for future in pollers for value in future.result()]
+        result = {
+            "status_requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        }
+        if load:
+            result["cancels"] = sum(future.result() for future in cancels)
+            result["rows"] = sum(future.result() for future in rows)
+    return result
+
+
+@contextlib.contextmanager
+def ui_stack(args):
+    """Runs the mock cluster, the slow LM Studio and the UI server; yields the UI's base URL."""
+    cluster, cluster_url, _ = run_in_thread(MockSettings(
+        nodes=1, run_time=(3600, 3600), fail_rate=0, timeout_rate=0, seed=0, latency=args.cluster_latency))
+    client = ClusterClient(cluster_url, "bench-token", "bench")
+    source = sorted((ROOT / "code").glob("*_*_0.py"))[0]
+    job_ids = [client.submit(source, "bench", f"cancel{i}")["job_id"] for i in range(args.cancels)]
+    lm_server, lm_url = slow_lm_studio(args.llm_latency)
+    workdir = make_workdir(args.pollers, args.cancels, args.rows, job_ids)
+
+    # Configure the UI server before importing it: it reads these at import time
+    os.environ.update(SERVER_URL=cluster_url, TOKEN="bench-token",
+                      SCORE_CACHE_DIR=str(workdir / "score_cache"))
+    # The server mounts it; empty directories are not tracked by git
+    (ROOT / "tools" / "fairy_ui" / "static").mkdir(exist_ok=True)
+    import lm_studio_client
+    import server as ui
+
+    lm_studio_client.LM_STUDIO_URL = f"{lm_url}/v1/chat/completions"
+    ui.BASE_DIR, ui.CODE_DIR, ui.LOG_DIR = workdir, workdir / "code", workdir / "logs"
+    ui_server, ui_url = serve(ui.app)
+
+    try:
+        yield ui_url
+    finally:
+        for server in (ui_server, lm_server, cluster):
+            server.should_exit = True
+        if ui.job_poller:
+            ui.job_poller.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def p99_regressed(idle, load, args):
+    """True when the loaded p99 exceeds the idle one by more than the tolerance and the slack."""
+    limit = max(idle["p99_ms"] * (1 + args.tolerance), idle["p99_ms"] + args.slack_ms)
+    return load["p99_ms"] > limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /api/status latency while cancels and row generation run")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--pollers", type=int, default=8, help="clients polling /api/status")
+    parser.add_argument("--cancels", type=int, default=4, help="clients cancelling jobs in a loop")
+    parser.add_argument("--rows", type=int, default=4, help="clients generating sheet rows in a loop")
+    parser.add_argument("--cluster-latency", type=float, default=0.5, help="seconds added to every cluster call")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="seconds LM Studio takes per score")
+    parser.add_argument("--output", default="bench_ui_concurrency.json", help="JSON results file")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed p99 increase under load (1.0 = 2x)")
+    parser.add_argument("--slack-ms", type=float, default=50.0, help="p99 increases below this never fail")
+    args = parser.parse_args()
+
+    with ui_stack(args) as ui_url:
+        # Row generation prints progress from worker threads
+        with contextlib.redirect_stdout(io.StringIO()):
+            idle = run_phase(ui_url, args, load=False)
+            load = run_phase(ui_url, args, load=True)
+
+    print(f"{'phase':<8} {'requests':>9} {'p50_ms':>10} {'p99_ms':>10} {'max_ms':>10}")
+    for name, phase in (("idle", idle), ("load", load)):
+        print(f"{name:<8} {phase['status_requests']:>9} {phase['p50_ms']:>10.2f} "
+              f"{phase['p99_ms']:>10.2f} {phase['max_ms']:>10.2f}")
+    print(f"under load: {load['cancels']} cancels, {load['rows']} rows generated")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": "ui_concurrency",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+            "results": {"idle": idle, "load": load},
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if p99_regressed(idle, load, args):
+        print(f"REGRESSION: /api/status p99 {idle['p99_ms']:.2f}ms idle -> {load['p99_ms']:.2f}ms under load")
+        sys.exit(1)
+    print("/api/status p99 stayed flat under load.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,29 @@ Lists all jobs and cancels those that are still running.
 """
 
 import os
+import sys
+from pathlib import Path
+
 import requests
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tools"))
+from cluster_client import get_client
+
 load_dotenv()
 
-SERVER_URL = os.getenv("SERVER_URL", "https://ceriferous-hoelike-jeffie.ngrok-free.dev")
 TOKEN = os.getenv("TOKEN")
 
 if not TOKEN:
     print("Error: TOKEN not set in .env file")
     exit(1)
 
-headers = {"Authorization": f"Bearer {TOKEN}"}
+client = get_client()
 
 # Get all jobs
 print("Fetching all jobs...")
 try:
-    response = requests.get(f"{SERVER_URL}/api/jobs", headers=headers)
-    response.raise_for_status()
-    data = response.json()
-    
-    jobs = data.get("jobs", [])
+    jobs = client.list_jobs()
     print(f"Found {len(jobs)} total jobs\n")
     
     # Filter running jobs
@@ -54,12 +55,7 @@ try:
         print(f"Cancelling {job_id}...", end=" ")
         
         try:
-            cancel_response = requests.post(
-                f"{SERVER_URL}/api/cancel/{job_id}",
-                headers=headers
-            )
-            cancel_response.raise_for_status()
-            result = cancel_response.json()
+            result = client.cancel(job_id)
             
             if result.get("status") == "cancelled":
                 print("Success")
@@ -0,0 +1,174 @@
+"""
+Cache of parsed debug artifacts (code files, logs, bugfix notes).
+
+Sheet rows read the same files over and over: every row opens its own code
+and log plus those of the next step, and the UI regenerates a row each time
+it is asked. ArtifactIndex keeps what it read keyed by path and re-reads a
+file only when its mtime or size changed.
+
+It lives in its own module so the UI server's importlib.reload() of
+generate_sheet_row does not throw the cache away.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("ARTIFACT_CACHE_MB", "256")) * 1024 * 1024)
+# Block size when looking for the last line of a JSONL file
+TAIL_BLOCK = 64 * 1024
+
+
+def _last_line(f, size):
+    """
+    Last non-empty line of a binary file, read backwards from the end.
+
+    Returns:
+        tuple: (line, offset where the bytes read start, the bytes read up to the end)
+    """
+    end = size
+    data = b""
+    while end > 0:
+        start = max(0, end - TAIL_BLOCK)
+        f.seek(start)
+        data = f.read(end - start) + data
+        end = start
+        stripped = data.rstrip()
+        newline = stripped.rfind(b"\n")
+        if newline != -1:
+            return stripped[newline + 1:], end, data
+    return data.strip(), 0, data
+
+
+def parse_jsonl(path):
+    """
+    Parses a log written to logs/<datarow>/<step>.jsonl.
+
+    JSONL files are parsed from their last line only (it holds the result);
+    single JSON objects, usually pretty-printed over many lines, are parsed whole.
+    Every byte is read at most once: the whole-file parse reuses the tail
+    already read and only reads what comes before it.
+
+    Returns:
+        The parsed value, or None if the file is neither.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        line, start, tail = _last_line(f, size)
+        try:
+            return json.loads(line.decode("utf-8"))
+        except ValueError:
+            pass
+        if start:
+            f.seek(0)
+            tail = f.read(start) + tail
+        try:
+            return json.loads(tail.decode("utf-8"))
+        except ValueError:
+            return None
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class ArtifactIndex:
+    """
+    Parsed files by path, re-read only when they change.
+
+    Parsed logs are shared between callers: treat them as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # (path, kind) -> (mtime_ns, size, value), least recently used first
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "reads": 0}
+
+    def _get(self, path, kind, loader):
+        path = str(path)
+        key = (path, kind)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry:
+                    self._total -= entry[1]
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[2]
+        try:
+            value = loader(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.stats["reads"] += 1
+            old = self._entries.pop(key, None)
+            if old:
+                self._total -= old[1]
+            # File size stands in for the memory the value takes
+            if stat.st_size <= self.max_bytes:
+                self._entries[key] = (stat.st_mtime_ns, stat.st_size, value)
+                self._total += stat.st_size
+            while self._total > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= evicted[1]
+        return value
+
+    def read_text(self, path):
+        """Returns a text file's contents, or None if it does not exist."""
+        return self._get(path, "text", read_text)
+
+    def read_jsonl(self, path):
+        """Returns a parsed log (see parse_jsonl()), or None if it does not exist or does not parse."""
+        return self._get(path, "jsonl", parse_jsonl)
+
+    def log_json(self, path):
+        """Returns a parsed log re-serialized with indent=2 (as pasted into the sheet), or None."""
+        def dump(path):
+            data = self.read_jsonl(path)
+            return json.dumps(data, indent=2) if data else None
+        return self._get(path, "log_json", dump)
+
+    def datarow(self, root, comp_id, row_id, step):
+        """
+        Reads everything a sheet row for (datarow, step) is built from.
+
+        Returns:
+            dict: {"code", "log", "log_json", "bugfix", "fixed_code", "fixed_log",
+                "fixed_log_json"}; missing files are None.
+        """
+        root = Path(root)
+        log_path = root / "logs" / row_id / f"{step}.jsonl"
+        fixed_log_path = root / "logs" / row_id / f"{step + 1}.jsonl"
+        return {
+            "code": self.read_text(root / "code" / f"{comp_id}_{row_id}_{step}.py"),
+            "log": self.read_jsonl(log_path),
+            "log_json": self.log_json(log_path),
+            "bugfix": self.read_text(root / "logs" / row_id / f"step{step}_{row_id}_bugfix.txt"),
+            "fixed_code": self.read_text(root / "code" / f"{comp_id}_{row_id}_{step + 1}.py"),
+            "fixed_log": self.read_jsonl(fixed_log_path),
+            "fixed_log_json": self.log_json(fixed_log_path),
+        }
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the process-wide index (ARTIFACT_CACHE_MB caps what it keeps)."""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = ArtifactIndex()
+        return _default_index
@@ -1,50 +1,55 @@
 import argparse
 import json
 import os
+import re
 import sys
 import csv
 import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 
+from artifact_index import get_index
+
+# Column order of a sheet row
+ROW_COLUMNS = [
+    "code",
+    "_term_out",
+    "exec_time",
+    "output_logs",
+    "bug_confirmed",
+    "proposed_debug_analysis_accurate",
+    "initial_bug_reproducible",
+    "bug_fixed",
+    "all_bugs_fixed",
+    "revised_analysis",
+    "revised_plan",
+    "debug_step",
+    "current_debug_code",
+    "output_logs_after_fix",
+]
+
+# code/<competition>_<datarow>_<step>.py (competition IDs may contain underscores)
+CODE_FILE_PATTERN = re.compile(r"^(.+)_([^_]+)_(\d+)$")
+
 def read_file(path):
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        return None
+    return get_index().read_text(path)
 
 def read_jsonl(path):
-    content = read_file(path)
-    if content:
-        try:
-            # Try parsing as a single JSON object first (as seen in examples)
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # If that fails, try parsing line by line (traditional JSONL)
-            lines = content.strip().split('\n')
-            if lines:
-                try:
-                    return json.loads(lines[-1]) # Return the last line as it usually contains the result
-                except json.JSONDecodeError:
-                    return None
-    return None
-
-def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""):
+    # Last line of a JSONL file, or the whole file if it is one (pretty-printed) JSON object
+    return get_index().read_jsonl(path)
+
+def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis="", scorer=None):
     root = Path(root_path)
     
-    # Define file paths
-    code_path = root / "code" / f"{comp_id}_{row_id}_{step}.py"
-    log_path = root / "logs" / row_id / f"{step}.jsonl"
-    bugfix_path = root / "logs" / row_id / f"step{step}_{row_id}_bugfix.txt"
-    fixed_code_path = root / "code" / f"{comp_id}_{row_id}_{step+1}.py"
-    fixed_log_path = root / "logs" / row_id / f"{step+1}.jsonl"
-
-    # Read contents
-    code_content = read_file(code_path) or ""
-    log_data = read_jsonl(log_path)
-    bugfix_content = read_file(bugfix_path) or ""
-    fixed_code_content = read_file(fixed_code_path) or ""
-    fixed_log_data = read_jsonl(fixed_log_path)
+    # Read contents (code and log of this step and the next, bugfix notes);
+    # unchanged files come parsed from the artifact index
+    artifacts = get_index().datarow(root, comp_id, row_id, step)
+    code_content = artifacts["code"] or ""
+    log_data = artifacts["log"]
+    bugfix_content = artifacts["bugfix"] or ""
+    fixed_code_content = artifacts["fixed_code"] or ""
+    fixed_log_data = artifacts["fixed_log"]
 
     # Process Log Data (Step N)
     term_out = "[]"
@@ -55,7 +60,7 @@ def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""
     if log_data:
         term_out = json.dumps(log_data.get("stdout", []), indent=None)
         exec_time = str(log_data.get("exec_time", ""))
-        output_logs = json.dumps(log_data, indent=2)
+        output_logs = artifacts["log_json"]
         if not log_data.get("success", False):
             bug_confirmed = "TRUE"
 
@@ -73,7 +78,7 @@ def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""
     bug_fixed = "TRUE" # Hardcoded as per user request
     
     if fixed_log_data:
-        output_logs_after_fix = json.dumps(fixed_log_data, indent=2)
+        output_logs_after_fix = artifacts["fixed_log_json"]
 
     # Derived Columns
     if step > 0:
@@ -85,12 +90,7 @@ def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""
         # Step 0 Logic
         # Try to get score from LM Studio
         try:
-            # Add tools to path to import client
-            tools_dir = root / "tools"
-            if str(tools_dir) not in sys.path:
-                sys.path.append(str(tools_dir))
-            
-            import lm_studio_client
+            lm_studio_client = import_lm_studio_client(root)
             
             # We need the original analysis from the spreadsheet guide or similar
             # But since we don't have easy access to the spreadsheet here, we might need to rely on 
@@ -130,10 +130,11 @@ def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""
             
             if proposed_analysis:
                 print(f"Querying LM Studio for score on Step 0...")
-                proposed_debug_analysis_accurate = lm_studio_client.get_analysis_score(
+                proposed_debug_analysis_accurate = (scorer or lm_studio_client.get_analysis_score)(
                     code_content, 
                     output_logs, 
-                    proposed_analysis
+                    proposed_analysis,
+                    decision_log=root / "logs" / row_id / "score_decisions.jsonl"
                 )
             else:
                 print("No proposed analysis found. Defaulting score to 1.")
@@ -166,61 +167,163 @@ def generate_row_data(comp_id, row_id, step, root_path=".", proposed_analysis=""
         "output_logs_after_fix": output_logs_after_fix
     }
 
-    # Prepare row list for CSV writer
-    row_list = [
-        row_dict["code"],
-        row_dict["_term_out"],
-        row_dict["exec_time"],
-        row_dict["output_logs"],
-        row_dict["bug_confirmed"],
-        row_dict["proposed_debug_analysis_accurate"],
-        row_dict["initial_bug_reproducible"],
-        row_dict["bug_fixed"],
-        row_dict["all_bugs_fixed"],
-        row_dict["revised_analysis"],
-        row_dict["revised_plan"],
-        row_dict["debug_step"],
-        row_dict["current_debug_code"],
-        row_dict["output_logs_after_fix"]
-    ]
+    raw_string = format_rows([row_dict]).strip() # Remove the trailing newline added by writerow
+    
+    return row_dict, raw_string
+
+def import_lm_studio_client(root):
+    # Add tools to path to import client
+    tools_dir = Path(root) / "tools"
+    if str(tools_dir) not in sys.path:
+        sys.path.append(str(tools_dir))
+
+    import lm_studio_client
+    return lm_studio_client
 
+def format_rows(rows, fmt="tsv", header=False):
+    """
+    Renders row dicts as TSV (paste into Sheets) or CSV (import).
+
+    Args:
+        rows (list): Row dicts from generate_row_data().
+        fmt (str): "tsv" or "csv".
+        header (bool): Start with a line of column names.
+
+    Returns:
+        str: One line per row (cells with newlines are quoted).
+    """
     # Use csv module for robust TSV generation
     output = io.StringIO()
     # Use excel-tab dialect which is standard for TSV
     # lineterminator='\n' ensures we don't get extra \r that might confuse some clipboards
-    writer = csv.writer(output, dialect='excel-tab', lineterminator='\n')
-    
-    row_list = [
-        row_dict["code"],
-        row_dict["_term_out"],
-        row_dict["exec_time"],
-        row_dict["output_logs"],
-        row_dict["bug_confirmed"],
-        row_dict["proposed_debug_analysis_accurate"],
-        row_dict["initial_bug_reproducible"],
-        row_dict["bug_fixed"],
-        row_dict["all_bugs_fixed"],
-        row_dict["revised_analysis"],
-        row_dict["revised_plan"],
-        row_dict["debug_step"],
-        row_dict["current_debug_code"],
-        row_dict["output_logs_after_fix"]
-    ]
-    
-    writer.writerow(row_list)
-    raw_string = output.getvalue().strip() # Remove the trailing newline added by writerow
-    
-    return row_dict, raw_string
+    writer = csv.writer(output, dialect='excel-tab' if fmt == "tsv" else 'excel', lineterminator='\n')
+    if header:
+        writer.writerow(ROW_COLUMNS)
+    for row_dict in rows:
+        writer.writerow([row_dict[column] for column in ROW_COLUMNS])
+    return output.getvalue()
+
+def discover_rows(root_path=".", step=None):
+    """
+    Finds every code file that has a log.
+
+    Args:
+        root_path (str): Project root (with code/ and logs/).
+        step (int): Only this debug step (default: all steps).
+
+    Returns:
+        list: (competition_id, datarow_id, step) tuples, sorted.
+    """
+    root = Path(root_path)
+    found = []
+    for code_path in (root / "code").glob("*.py"):
+        match = CODE_FILE_PATTERN.match(code_path.stem)
+        if not match:
+            continue
+        comp_id, row_id, row_step = match.group(1), match.group(2), int(match.group(3))
+        if step is not None and row_step != step:
+            continue
+        if (root / "logs" / row_id / f"{row_step}.jsonl").is_file():
+            found.append((comp_id, row_id, row_step))
+    return sorted(found)
+
+def generate_rows(rows, root_path=".", workers=8, proposed_analyses=None, score=True):
+    """
+    Builds many sheet rows at once.
+
+    Files are read in a thread pool, then every step 0 score is requested from
+    LM Studio in one concurrent batch (lm_studio_client.score_batch).
+
+    Args:
+        rows (list): (competition_id, datarow_id, step) tuples, e.g. from discover_rows().
+        root_path (str): Project root.
+        workers (int): Rows built at the same time.
+        proposed_analyses (dict): Optional {(datarow_id, step): analysis text}.
+        score (bool): Score step 0 analyses; if False their score is left empty.
+
+    Returns:
+        tuple: (list of (key, row_dict) in input order, list of (key, error message)).
+    """
+    proposed_analyses = proposed_analyses or {}
+    # [row_dict, (code, logs, analysis, decision_log)] of step 0 rows waiting for a score
+    pending = []
+
+    def build(key):
+        comp_id, row_id, step = key
+        item = []
+
+        def defer_score(code, logs, analysis, decision_log=None):
+            item.append((code, logs, analysis, decision_log))
+            return "1" # Replaced once the batch is scored
+
+        try:
+            row_dict, _ = generate_row_data(
+                comp_id, row_id, step, root_path,
+                proposed_analysis=proposed_analyses.get((row_id, step), ""),
+                scorer=defer_score
+            )
+            if item:
+                pending.append((row_dict, item[0]))
+            return key, row_dict, None
+        except Exception as e:
+            return key, None, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(build, rows))
+
+    if pending and not score:
+        for row_dict, _ in pending:
+            row_dict["proposed_debug_analysis_accurate"] = ""
+    elif pending:
+        try:
+            scores = import_lm_studio_client(root_path).score_batch([item for _, item in pending])
+        except Exception as e:
+            print(f"LM Studio integration failed: {e}")
+            scores = ["1"] * len(pending)
+        for (row_dict, _), score in zip(pending, scores):
+            row_dict["proposed_debug_analysis_accurate"] = score
+    built = [(key, row_dict) for key, row_dict, error in results if error is None]
+    errors = [(key, error) for key, _, error in results if error is not None]
+    return built, errors
+
+def bulk(args):
+    """Writes one sheet with a row for every code/log pair."""
+    keys = discover_rows(args.root, step=args.only_step)
+    # Progress messages go to stderr so stdout stays a clean sheet
+    with redirect_stdout(sys.stderr):
+        rows, errors = generate_rows(keys, args.root, workers=args.workers)
+    for (comp_id, row_id, step), error in errors:
+        print(f"Skipped {comp_id}_{row_id}_{step}: {error}", file=sys.stderr)
+
+    sheet = format_rows([row_dict for _, row_dict in rows], fmt=args.format, header=not args.no_header)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(sheet)
+        print(f"Wrote {len(rows)} rows to {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(sheet)
 
 def main():
     parser = argparse.ArgumentParser(description="Generate Google Sheets row from debug artifacts")
-    parser.add_argument("competition_id", help="Competition ID")
-    parser.add_argument("datarow_id", help="Datarow ID")
-    parser.add_argument("step", type=int, help="Debug step number")
+    parser.add_argument("competition_id", nargs="?", help="Competition ID")
+    parser.add_argument("datarow_id", nargs="?", help="Datarow ID")
+    parser.add_argument("step", nargs="?", type=int, help="Debug step number")
     parser.add_argument("--root", default=".", help="Root directory of the project")
+    parser.add_argument("--all", action="store_true", help="One row for every code/log pair under code/ and logs/")
+    parser.add_argument("--only-step", type=int, help="With --all: only this debug step")
+    parser.add_argument("--format", choices=("tsv", "csv"), default="tsv", help="With --all: output format")
+    parser.add_argument("--output", help="With --all: write the sheet to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=8, help="With --all: rows built at the same time")
+    parser.add_argument("--no-header", action="store_true", help="With --all: leave out the column names line")
 
     args = parser.parse_args()
 
+    if args.all:
+        bulk(args)
+        return
+    if args.step is None:
+        parser.error("competition_id, datarow_id and step are required (or use --all)")
+
     _, raw_string = generate_row_data(args.competition_id, args.datarow_id, args.step, args.root)
     print(raw_string)
 
@@ -8,8 +8,8 @@ import os
 import sys
 from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).parent))
-from api_run import submit_job
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+from cluster_client import submit_job
 
 def extract_parts(filename):
     # filename format: <datarow_id>_<competition_id>_<debugstep>.py
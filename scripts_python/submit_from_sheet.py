@@ -8,8 +8,8 @@ import sys
 from pathlib import Path
 
 # import the main submit function
-sys.path.insert(0, str(Path(__file__).parent))
-from api_run import submit_job
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+from cluster_client import submit_job
 
 def main():
     parser = argparse.ArgumentParser(
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from batch_runner import successful_exec_time
+from cancel_policy import history_from_manifest
+
+
+def test_history_skips_crashes_and_failures():
+    manifest = SimpleNamespace(entries={
+        "ok.py": {"status": "completed", "exit_code": 0, "exec_time": 12.5, "competition_id": "c",
+                  "started_at": 0, "finished_at": 100},
+        "crash.py": {"status": "completed", "exit_code": 0, "exec_time": None, "competition_id": "c",
+                     "started_at": 0, "finished_at": 3},
+        "failed.py": {"status": "completed", "exit_code": 1, "competition_id": "c",
+                      "started_at": 0, "finished_at": 3},
+        "old.py": {"status": "completed", "exit_code": 0, "competition_id": "c",
+                   "started_at": 0, "finished_at": 30},
+        "cancelled.py": {"status": "cancelled", "exit_code": None, "competition_id": "c",
+                         "started_at": 0, "finished_at": 360},
+    })
+
+    assert history_from_manifest(manifest) == {"c": [12.5, 30]}
+
+
+def test_successful_exec_time():
+    assert successful_exec_time('{"success": true, "exec_time": 4.2, "stdout": []}') == 4.2
+    assert successful_exec_time('{"success": false, "exec_time": 0.3, "stdout": []}') is None
+    assert successful_exec_time("plain text log") is None
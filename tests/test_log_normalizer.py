@@ -0,0 +1,109 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from log_normalizer import (HEAD, HEAD_TAIL, LOG_CHAR_LIMIT, TRACEBACK_START, Truncation, normalize_results,
+                            normalize_stream)
+
+# A "Traceback" entry bigger than the traceback cap (cap // 4) lands in the
+# block's tail and gets popped, leaving the block's head empty
+OVERSIZED_TRACEBACK_LOG = "step\n" * 12000 + "x" * 20000 + TRACEBACK_START + "\n"
+
+
+def _chunks(text, size=4096):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_head_tail_oversized_traceback_format_a():
+    body = json.dumps({"stdout": json.dumps({"success": False, "stdout": [OVERSIZED_TRACEBACK_LOG]})})
+    truncation = Truncation(HEAD_TAIL)
+
+    text = normalize_results(json.loads(body), truncation=truncation)
+    streamed, _ = normalize_stream(_chunks(body), truncation=truncation)
+
+    assert streamed == text
+    assert json.loads(text)["stdout"][0] == "step"
+
+
+def test_head_tail_oversized_traceback_format_b():
+    body = json.dumps({"stdout": OVERSIZED_TRACEBACK_LOG})
+    truncation = Truncation(HEAD_TAIL)
+
+    text = normalize_results(json.loads(body), truncation=truncation)
+    streamed, _ = normalize_stream(_chunks(body), truncation=truncation)
+
+    assert streamed == text
+    assert text.startswith("step\n")
+
+
+TRACEBACK = f"{TRACEBACK_START}\n  File \"train.py\", line 3, in <module>\n    main()\nValueError: bad shape\n"
+ERROR_LINES = [f"stderr line {i}\n" for i in range(3000)]
+
+BODIES = {
+    "format_a_small": {"stdout": json.dumps({"success": True, "exec_time": 1.5, "stdout": ["epoch 1\n", "done\n"]})},
+    "format_a_long": {"stdout": json.dumps({
+        "success": False,
+        "stdout": [f"epoch {i}: loss=0.{i:04d}\n" for i in range(20000)] + [TRACEBACK] + ["after\n"] * 500,
+    })},
+    "format_a_escapes": {"stdout": json.dumps({"stdout": ["caf\u00e9 \U0001f600 \"quoted\"\t\\\n"] * 5000})},
+    "format_a_long_line": {"stdout": json.dumps({"stdout": ["start\n" + "z" * 200000 + "\r\nend\n" + "y" * 70000]})},
+    "format_a_error_output": {"stdout": json.dumps({
+        "success": False, "error_output": ERROR_LINES, "stderr": "E" * 30000 + "last", "stdout": ["a\n"] * 10,
+    }), "stderr": "S" * 30000},
+    "format_b_long": {"stdout": "step\n" * 30000 + TRACEBACK + "bye\n"},
+    "format_b_one_line": {"stdout": "[INFO] " + "x" * 300000},
+    "format_b_list": {"stdout": ["line one\n", "line ", "two\n"] * 10000},
+    "small_array": {"stdout": json.dumps(list(range(2000)))},
+    "huge_array": {"stdout": json.dumps(list(range(60000)))},
+    "null_stdout": {"stdout": None, "exit_code": 1},
+}
+
+
+@pytest.mark.parametrize("mode", [HEAD, HEAD_TAIL])
+@pytest.mark.parametrize("name", sorted(BODIES))
+def test_stream_matches_results(name, mode):
+    body = json.dumps(BODIES[name])
+    truncation = Truncation(mode)
+    text = normalize_results(json.loads(body), truncation=truncation)
+
+    for size in (97, 65536):
+        streamed, _ = normalize_stream(_chunks(body, size), truncation=truncation)
+        assert streamed == text
+
+
+def test_head_tail_keeps_both_ends_of_one_long_line():
+    text = normalize_results(BODIES["format_b_one_line"], truncation=Truncation(HEAD_TAIL))
+
+    assert text.startswith("[INFO] xxx")
+    assert text.endswith("xxx")
+    assert "chars elided to fit" in text
+
+
+def test_huge_array_is_cut_as_text():
+    text = normalize_results(BODIES["huge_array"], truncation=Truncation(HEAD))
+
+    assert text.startswith("[0, 1, 2")
+    assert text.endswith("...[LOG TRUNCATED]...")
+
+
+def test_error_output_keeps_the_end():
+    body = json.dumps(BODIES["format_a_error_output"])
+
+    text, wrapper = normalize_stream(_chunks(body), truncation=Truncation(HEAD))
+    data = json.loads(text)
+
+    assert data["error_output"][0].startswith("...[")
+    assert data["error_output"][-1] == ERROR_LINES[-1]
+    assert data["stderr"].endswith("Elast")
+    assert len(data["stderr"]) < LOG_CHAR_LIMIT // 2
+    assert wrapper["stderr"].endswith("SSS")
+    assert len(wrapper["stderr"]) < LOG_CHAR_LIMIT // 2
+
+
+def test_stream_rejects_non_object_body():
+    with pytest.raises(ValueError):
+        normalize_stream(["[1, 2, 3]"])
@@ -0,0 +1,48 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from score_rules import classify
+
+TRACEBACK_LOG = json.dumps({"success": False, "stdout": [
+    "loading data\n",
+    "Traceback (most recent call last):\n",
+    '  File "/workspace/main.py", line 59, in <module>\n',
+    "    batch = np.stack(images)\n",
+    "ValueError: could not broadcast input array from shape (3,224,224) into shape (3,256,256)\n",
+]})
+SUCCESS_LOG = json.dumps({"success": True, "stdout": ["epoch 1: loss=0.4\n", "done\n"]})
+FAILED_LOG = json.dumps({"success": False, "stdout": ["epoch 1: loss=nan\n"]})
+
+
+def test_matching_exception_and_message_scores_2():
+    analysis = ("The code fails with a ValueError: 'could not broadcast input array from shape (3,224,224) "
+                "into shape (3,256,256)' at line 59 because the images are not resized.")
+
+    decision = classify(TRACEBACK_LOG, analysis)
+
+    assert decision["score"] == "2"
+
+
+def test_exception_named_for_a_successful_run_scores_0():
+    decision = classify(SUCCESS_LOG, "The code raises a KeyError because the 'target' column is missing.")
+
+    assert decision["score"] == "0"
+
+
+@pytest.mark.parametrize("logs, analysis", [
+    # A different exception was raised: the analysis may still find the bug
+    (TRACEBACK_LOG, "The code raises a KeyError because the 'target' column is missing."),
+    # Failed without a traceback in the log
+    (FAILED_LOG, "The code raises a KeyError because the 'target' column is missing."),
+    # Right class, wrong message
+    (TRACEBACK_LOG, "The code fails with a ValueError: 'invalid literal for int() with base 10'."),
+    # No exception named
+    (TRACEBACK_LOG, "The images have different sizes, so stacking them fails."),
+])
+def test_unclear_cases_go_to_the_llm(logs, analysis):
+    assert classify(logs, analysis)["score"] is None
@@ -0,0 +1,23 @@
+import contextlib
+import io
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_ui_concurrency import p99_regressed, run_phase, ui_stack
+
+# bench_ui_concurrency.py with short phases; the slack absorbs the noise of
+# a 2 second sample (a blocked event loop shows up as seconds, not ms)
+ARGS = Namespace(duration=2.0, pollers=4, cancels=2, rows=2, cluster_latency=0.3, llm_latency=1.0,
+                 tolerance=1.0, slack_ms=250.0)
+
+
+def test_status_stays_fast_under_slow_requests():
+    with ui_stack(ARGS) as ui_url, contextlib.redirect_stdout(io.StringIO()):
+        idle = run_phase(ui_url, ARGS, load=False)
+        load = run_phase(ui_url, ARGS, load=True)
+
+    assert load["cancels"] and load["rows"]
+    assert not p99_regressed(idle, load, ARGS), f"p99 {idle['p99_ms']}ms idle -> {load['p99_ms']}ms under load"
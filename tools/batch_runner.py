@@ -0,0 +1,620 @@
+"""
+Concurrent submission engine for the GPU cluster.
+
+Submits every code/<competition_id>_<datarow_id>_<debug_step>.py file with a
+bounded number of jobs in flight, tracks each job on its own and writes the
+same logs/<datarow_id>/<debug_step>.jsonl artifacts as gpu_submit.sh.
+"""
+import json
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+
+from cancel_policy import CancelPolicy, format_duration
+from cluster_client import RateLimited
+from job_poller import POLL_INTERVAL, JobPoller
+from log_normalizer import Truncation, is_truncated, normalize_results, normalize_stream
+from log_stream import LogTail, TracebackDetector, console_text
+from result_cache import cache_key
+
+# Same filename pattern as gpu_submit.sh (competition names may contain hyphens)
+CODE_FILE_PATTERN = re.compile(r"^(.+)_([^_]+)_([^_]+)$")
+
+# Indicators gpu_submit.sh looks for in a .raw.log before skipping a file
+RAW_LOG_DONE_PATTERN = re.compile(
+    r"Job (completed|cancelled|failed)|Job ID:|Monitoring job status|no_repro|ERROR:|Results saved",
+    re.IGNORECASE,
+)
+
+MAX_WAIT = 60 * 60          # give up monitoring a job after an hour (longer if its cancel deadline is)
+
+
+class BatchJob:
+    """One code file and the state of its remote job."""
+
+    def __init__(self, code_path, competition_id, datarow_id, debug_step, log_dir):
+        self.code_path = Path(code_path)
+        self.competition_id = competition_id
+        self.datarow_id = datarow_id
+        self.debug_step = debug_step
+        self.log_file = Path(log_dir) / datarow_id / f"{debug_step}.jsonl"
+        self.raw_log_file = Path(log_dir) / datarow_id / f"{debug_step}.raw.log"
+        self.job_id = None
+        self.status = "queued"
+        # State changes pushed by the shared JobPoller
+        self.updates = queue.Queue()
+        # One of: submitted, failed, skipped (same buckets as the shell summary)
+        self.outcome = None
+        self.exit_code = None
+        # Inner log's exec_time, only for runs that report success
+        self.exec_time = None
+        # Set once the job produced a real result worth caching
+        self.cache_key = None
+        self.cacheable = False
+        # Seconds of running (wall clock) before the job is cancelled as No Repro
+        self.cancel_after = None
+        # LogTail appending live console output to raw_log_file while the job runs
+        self.tail = None
+        # --stop-on-error: streamed output so far and the traceback scanner
+        self.console = []
+        self.detector = None
+
+    @property
+    def name(self):
+        return self.code_path.name
+
+
+def parse_code_filename(path):
+    """Returns (competition_id, datarow_id, debug_step) or None if the name doesn't match."""
+    match = CODE_FILE_PATTERN.match(Path(path).stem)
+    if not match:
+        return None
+    return match.group(1), match.group(2), match.group(3)
+
+
+def successful_exec_time(text):
+    """Returns the exec_time of a normalized Format A log that reports success, else None."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("success") is not True:
+        return None
+    exec_time = data.get("exec_time")
+    return exec_time if isinstance(exec_time, (int, float)) and not isinstance(exec_time, bool) else None
+
+
+def already_processed(job):
+    """Mirrors gpu_submit.sh's skip check for a single job."""
+    if job.log_file.exists():
+        return f"already completed - log exists at {job.log_file}"
+    if job.raw_log_file.exists() and job.raw_log_file.stat().st_size > 100:
+        try:
+            content = job.raw_log_file.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return None
+        if RAW_LOG_DONE_PATTERN.search(content):
+            return f"already processed - raw log exists at {job.raw_log_file}"
+    return None
+
+
+def discover_jobs(code_dir, log_dir):
+    """Finds all code files matching the gpu_submit.sh naming pattern."""
+    jobs = []
+    for path in sorted(Path(code_dir).glob("*_*_*.py")):
+        parts = parse_code_filename(path)
+        if parts is None:
+            print(f"Warning: Skipping {path} - doesn't match expected pattern")
+            continue
+        jobs.append(BatchJob(path, *parts, log_dir=log_dir))
+    return jobs
+
+
+class BatchRunner:
+    """Runs many BatchJobs against the cluster with at most max_in_flight at once."""
+
+    def __init__(self, client, expected_time=300, max_in_flight=4, poll_interval=POLL_INTERVAL,
+                 cache=None, bypass_cache=False, manifest=None, stream_logs=True, stop_on_error=False,
+                 cancel_policy=None, truncation=None):
+        self.client = client
+        self.expected_time = expected_time
+        self.max_in_flight = max(1, max_in_flight)
+        # Results of byte-identical code are served from the cache; bypass still stores fresh ones
+        self.cache = cache
+        self.bypass_cache = bypass_cache
+        # RunManifest for dirty-set detection; without one, gpu_submit.sh's log checks are used
+        self.manifest = manifest
+        # Tail console output into the .raw.log while jobs run
+        self.stream_logs = stream_logs or stop_on_error
+        # Cancel a job as soon as its output shows the first traceback
+        self.stop_on_error = stop_on_error
+        # Per-competition/per-file No Repro deadlines
+        self.cancel_policy = cancel_policy or CancelPolicy.load(manifest=manifest)
+        # How oversized logs are cut (head, or head_tail keeping tracebacks)
+        self.truncation = truncation or Truncation.from_env()
+
+        # One poller tracks every in-flight job instead of a status loop per job
+        self.poller = JobPoller(client, interval=poll_interval)
+        self.poller.subscribe(self._on_state)
+
+        self.stop_event = threading.Event()
+        self.counts = {"total": 0, "submitted": 0, "failed": 0, "skipped": 0, "cached": 0}
+        self._lock = threading.Lock()
+        self._print_lock = threading.Lock()
+        self._in_flight = {}
+
+    # ---- output helpers ----
+
+    def log(self, job, message):
+        prefix = f"[{job.datarow_id}/{job.debug_step}] " if self.max_in_flight > 1 else ""
+        with self._print_lock:
+            print(f"{prefix}{message}", flush=True)
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    # ---- API helpers ----
+
+    def _submit(self, job, code):
+        delay = 15
+        while True:
+            try:
+                return self.client.submit(
+                    code, job.competition_id, job.datarow_id,
+                    expected_time=self.expected_time, timeout=0.1,
+                )
+            except RateLimited as e:
+                # The cluster rate-limits submissions; wait and retry instead of failing the file
+                wait = e.retry_after or delay
+                self.log(job, f"  Rate limited, retrying submit in {wait}s...")
+                if self.stop_event.wait(wait):
+                    return {"detail": str(e)}
+                delay = min(delay * 2, 120)
+
+    # ---- per-job pipeline ----
+
+    def _write_log(self, job, data):
+        job.log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(job.log_file, "w", encoding="utf-8") as f:
+            if isinstance(data, str):
+                f.write(data + "\n")
+            else:
+                json.dump(data, f)
+                f.write("\n")
+
+    def run_job(self, job):
+        """Submits one job, monitors it and saves its log. Sets job.outcome."""
+        self.log(job, "=========================================")
+        self.log(job, f"Processing: {job.code_path}")
+        self.log(job, f"  Competition: {job.competition_id}")
+        self.log(job, f"  Project ID: {job.datarow_id}")
+        self.log(job, f"  Number: {job.debug_step}")
+        self.log(job, f"  Log: {job.log_file}")
+
+        # Read once so the hash always matches the code that gets submitted
+        code = job.code_path.read_bytes()
+        job.cancel_after, source = self.cancel_policy.deadline(job.competition_id, job.name)
+        if self.cache is not None:
+            job.cache_key = cache_key(code, job.competition_id, self.expected_time)
+            if not self.bypass_cache and self._serve_cached(job, code):
+                return job
+
+        self.log(job, "Submitting job...")
+        try:
+            submit_response = self._submit(job, code)
+        except requests.exceptions.RequestException as e:
+            submit_response = {"detail": str(e)}
+
+        job.job_id = submit_response.get("job_id")
+        if not job.job_id:
+            self.log(job, "ERROR: Failed to submit job")
+            self.log(job, f"Response: {json.dumps(submit_response)}")
+            job.outcome = "failed"
+            self._record_finished(job)
+            return job
+        if self.manifest is not None:
+            self.manifest.record_submitted(job.code_path, code, job.competition_id, job.job_id)
+
+        with self._lock:
+            self._in_flight[job.job_id] = job
+        try:
+            self.log(job, f"Job submitted! Job ID: {job.job_id}")
+            self.log(job, f"Monitoring job status (will auto-cancel after {format_duration(job.cancel_after)} "
+                          f"of running if still running, {source})...")
+            self._monitor(job)
+        finally:
+            with self._lock:
+                self._in_flight.pop(job.job_id, None)
+        self._store_result(job)
+        self._record_finished(job)
+        return job
+
+    def _record_finished(self, job):
+        if self.manifest is not None:
+            self.manifest.record_finished(job.code_path, job.status, job.outcome or "failed", job.log_file,
+                                          exit_code=job.exit_code, exec_time=job.exec_time)
+            # Big batches would rewrite the whole file per job; run() saves once more at the end
+            self.manifest.save(min_interval=2)
+
+    def _serve_cached(self, job, code):
+        """Writes a cached result for identical code instead of submitting. Returns True on a hit."""
+        entry = self.cache.get(job.cache_key, truncation=self.truncation.mode, server_url=self.client.server_url,
+                               stop_on_error=self.stop_on_error, cancel_after=job.cancel_after)
+        if entry is None:
+            return False
+        self._write_log(job, entry["log"])
+        job.job_id = entry.get("job_id")
+        job.outcome = entry.get("outcome") or "submitted"
+        job.status = "cached"
+        self._count("cached")
+        if self.manifest is not None:
+            self.manifest.record_submitted(job.code_path, code, job.competition_id, job.job_id)
+            self._record_finished(job)
+        self.log(job, f"Identical code already ran as job {entry.get('job_id')} - using cached result")
+        self.log(job, f"✓ Results saved to {job.log_file}")
+        return True
+
+    def _store_result(self, job):
+        if self.cache is None or not job.cache_key or not job.cacheable:
+            return
+        try:
+            log = job.log_file.read_text(encoding="utf-8").rstrip("\n")
+            truncation = self.truncation.mode if is_truncated(log) else None
+            # Only a No Repro result (auto-cancelled, outcome skipped) depends on the deadline
+            cancel_after = job.cancel_after if job.outcome == "skipped" else None
+            self.cache.put(job.cache_key, log, job.outcome, job.job_id, job.competition_id, truncation=truncation,
+                           server_url=self.client.server_url, stop_on_error=self.stop_on_error,
+                           cancel_after=cancel_after)
+        except OSError as e:
+            self.log(job, f"Warning: Could not cache result: {e}")
+
+    def _on_state(self, job_id, state, previous):
+        """JobPoller subscriber: hands state changes to the worker owning the job."""
+        with self._lock:
+            job = self._in_flight.get(job_id)
+        if job is not None:
+            job.updates.put(state)
+
+    def _monitor(self, job):
+        started = time.monotonic()
+        running_since = None
+        last_reported = None
+        self.poller.watch(job.job_id, deadline=job.cancel_after)
+        # Queue time counts too, so leave room beyond a long deadline
+        max_wait = max(MAX_WAIT, 2 * job.cancel_after)
+
+        try:
+            while time.monotonic() - started < max_wait:
+                if self.stop_event.is_set():
+                    job.outcome = "failed"
+                    return
+                try:
+                    status_response = job.updates.get(timeout=self.poller.interval)
+                except queue.Empty:
+                    status_response = {"status": job.status}
+
+                if status_response.get("error_detected"):
+                    self._cancel_on_error(job, time.monotonic() - (running_since or started))
+                    return
+
+                status = status_response.get("status") or ""
+                job.status = status or job.status
+
+                if status == "running" and running_since is None:
+                    running_since = time.monotonic()
+                    self.log(job, f"  Job started running at {time.ctime()}")
+                    if self.manifest is not None:
+                        self.manifest.record_started(job.code_path)
+                    self._start_tail(job)
+
+                if status in ("completed", "failed", "cancelled"):
+                    # Catch up on the last lines before results are collected
+                    self._stop_tail(job)
+
+                if status == "completed":
+                    self.log(job, "Job completed successfully!")
+                    self._collect_completed(job)
+                    return
+                if status == "failed":
+                    self.log(job, "ERROR: Job failed")
+                    self._collect_failed(job)
+                    return
+                if status == "cancelled":
+                    self.log(job, "WARNING: Job was cancelled externally")
+                    job.outcome = "failed"
+                    return
+
+                if status == "running":
+                    running_for = time.monotonic() - running_since
+                    if running_for >= job.cancel_after:
+                        self._auto_cancel(job, running_for)
+                        return
+                    elapsed_minutes = int(running_for // 60)
+                    if elapsed_minutes != last_reported:
+                        last_reported = elapsed_minutes
+                        self.log(job, f"  Status: Running on GPU... ({elapsed_minutes}m elapsed, "
+                                      f"will cancel at {format_duration(job.cancel_after)})")
+                elif status == "pending" and "queue_position" in status_response:
+                    queue_pos = status_response.get("queue_position")
+                    self.log(job, f"  Status: Pending (Queue position: {queue_pos if queue_pos is not None else ''})")
+
+            self.log(job, f"ERROR: Job monitoring timeout ({format_duration(max_wait)})")
+            job.outcome = "failed"
+        finally:
+            self._stop_tail(job)
+            self.poller.unwatch(job.job_id)
+
+    def _start_tail(self, job):
+        if not self.stream_logs or job.tail is not None:
+            return
+        job.raw_log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(job.raw_log_file, "a", encoding="utf-8") as f:
+            f.write(f"----- console output (job {job.job_id}) -----\n")
+        on_text = None
+        if self.stop_on_error:
+            job.detector = TracebackDetector()
+            on_text = lambda text: self._scan_output(job, text)
+        job.tail = LogTail(self.client, job.job_id, job.raw_log_file,
+                           interval=min(2.0, self.poller.interval), on_text=on_text).start()
+        self.log(job, f"  Streaming console output to {job.raw_log_file}")
+
+    def _scan_output(self, job, text):
+        """LogTail callback: wakes the job's worker once a traceback has been printed."""
+        job.console.append(text)
+        already_seen = job.detector.traceback is not None
+        if job.detector.feed(text) and not already_seen:
+            job.updates.put({"status": job.status, "error_detected": True})
+
+    def _cancel_on_error(self, job, running_for):
+        """Cancels a job that already reproduced its exception and saves the log from streamed output."""
+        self.log(job, "")
+        self.log(job, "⚡ Traceback detected in console output. Cancelling job to save GPU time...")
+        self.log(job, job.detector.traceback.splitlines()[-1])
+        try:
+            self.client.cancel(job.job_id)
+        except requests.exceptions.RequestException as e:
+            self.log(job, f"⚠ Warning: Cancellation request failed: {e}")
+        # Catch up on whatever was printed while the cancel went out
+        self._stop_tail(job)
+
+        results = self._fetch_results(job)
+        if console_text(results).strip():
+            processed = normalize_results(results, truncation=self.truncation)
+        else:
+            # Cancelled jobs have no results blob; build the usual log from the streamed output
+            processed = normalize_results({"stdout": json.dumps({
+                "success": False,
+                "exit_code": None,
+                "timed_out": False,
+                "exec_time": round(running_for, 2),
+                "valid_solution": False,
+                "validation_fitness": None,
+                "test_fitness": None,
+                "error_output": [job.detector.traceback],
+                "stdout": ["".join(job.console)],
+                "stopped_on_error": True,
+            })}, truncation=self.truncation)
+        self._write_log(job, processed)
+        self.log(job, f"✓ Results saved to {job.log_file}")
+        job.status = "cancelled"
+        job.outcome = "submitted"
+        job.cacheable = True
+
+    def _stop_tail(self, job):
+        if job.tail is None:
+            return
+        tail, job.tail = job.tail, None
+        tail.stop()
+
+    def _auto_cancel(self, job, running_for):
+        self.log(job, "")
+        self.log(job, f"⏱ Job has been running for {format_duration(job.cancel_after)}+. Auto-cancelling...")
+        try:
+            self.client.cancel(job.job_id)
+            time.sleep(2)
+            verify_status = self.poller.fetch_status(job.job_id).get("status")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            verify_status = f"unknown ({e})"
+
+        if verify_status == "cancelled":
+            self.log(job, "✓ Job cancelled successfully.")
+            self._write_log(job, {
+                "status": "no_repro",
+                "message": f"Job ran for {format_duration(job.cancel_after)}+ without error. Auto-cancelled by script.",
+                "exec_time": int(running_for),
+                "cancel_after": job.cancel_after,
+            })
+            job.status = "cancelled"
+            job.outcome = "skipped"
+            job.cacheable = True
+        else:
+            self.log(job, f"⚠ Warning: Cancellation sent but status is: {verify_status}")
+            job.outcome = "failed"
+
+    def _fetch_results(self, job):
+        try:
+            return self.client.results(job.job_id)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.log(job, f"Warning: Could not retrieve results: {e}")
+            return {}
+
+    def _process_results(self, job):
+        """
+        Downloads and normalizes the results of a completed job.
+
+        The body is parsed as it arrives, so a multi-megabyte log never has to
+        sit in memory whole. Responses the streaming parser rejects are fetched
+        again and handled the old way.
+
+        Returns:
+            tuple: (text for the .jsonl log, results response fields besides stdout)
+        """
+        try:
+            return normalize_stream(self.client.stream_results(job.job_id), truncation=self.truncation)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.log(job, f"Warning: Could not stream results: {e}")
+
+        results = self._fetch_results(job)
+        self.log(job, "Processing log...")
+        try:
+            return normalize_results(results, truncation=self.truncation), results
+        except Exception as e:
+            self.log(job, f"Error processing log: {e}")
+            return "", results
+
+    def _collect_completed(self, job):
+        self.log(job, "Retrieving results...")
+        processed, results = self._process_results(job)
+
+        if processed:
+            self._write_log(job, processed)
+            # Crashes reproduce on identical code too, so any exit code is cacheable
+            job.cacheable = True
+        else:
+            self.log(job, "Warning: Log processing returned empty. Saving raw results response.")
+            self._write_log(job, str(results.get("stdout") or ""))
+
+        exit_code = job.exit_code = results.get("exit_code")
+        if exit_code == 0 or str(exit_code) == "0":
+            # Run time for future No Repro deadlines; crashes report success: false
+            job.exec_time = successful_exec_time(processed) if processed else None
+            self.log(job, f"✓ Results saved to {job.log_file}")
+            job.outcome = "submitted"
+            return
+
+        self.log(job, f"WARNING: Job completed with non-zero exit code: {exit_code}")
+        stderr = results.get("stderr") or ""
+        self.log(job, f"Error output: {stderr}")
+        content = job.log_file.read_text(encoding="utf-8").strip()
+        if not content or content == "null":
+            self._write_log(job, {"error": "failed", "exit_code": exit_code, "stderr": stderr})
+        job.outcome = "failed"
+
+    def _collect_failed(self, job):
+        self.log(job, "Retrieving failure information...")
+        results = self._fetch_results(job)
+        exit_code = job.exit_code = results.get("exit_code")
+        stderr = results.get("stderr") or ""
+        timeout_minutes = self.expected_time * 2 // 60
+
+        # Exit code 143 = SIGTERM, 137 = SIGKILL
+        if str(exit_code) in ("143", "137") or "timeout" in stderr or "killed" in stderr:
+            self._write_log(job, {
+                "error": "timeout",
+                "message": f"Code ran for approximately {timeout_minutes} minutes without completing (timeout at 2x expected_time)",
+                "exit_code": exit_code,
+            })
+            self.log(job, f"⚠ Timeout detected - summary saved to {job.log_file}")
+        else:
+            self._write_log(job, {
+                "error": "failed",
+                "message": f"Job failed with exit code {exit_code}",
+                "stderr": stderr,
+            })
+            self.log(job, f"⚠ Failure logged to {job.log_file}")
+        if stderr:
+            self.log(job, f"Error output: {stderr}")
+        job.outcome = "failed"
+
+    # ---- batch ----
+
+    def run(self, jobs, force=False):
+        """Runs all jobs and returns the summary counters."""
+        pending = []
+        scan_started = time.perf_counter()
+        for job in jobs:
+            self.counts["total"] += 1
+            if force:
+                pending.append(job)
+                continue
+            if self.manifest is not None:
+                dirty, reason = self.manifest.dirty_reason(
+                    job.code_path, job.log_file, legacy_check=lambda: already_processed(job)
+                )
+            else:
+                reason = already_processed(job)
+                dirty = reason is None
+            if dirty:
+                pending.append(job)
+            else:
+                print(f"Skipping: {job.code_path} ({reason})")
+                self.counts["skipped"] += 1
+        if self.manifest is not None:
+            self.manifest.save()
+            print(f"Scanned {self.counts['total']} files in {(time.perf_counter() - scan_started) * 1000:.1f}ms "
+                  f"({len(pending)} to run)")
+
+        self.poller.start()
+        pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            futures = [pool.submit(self.run_job, job) for job in pending]
+            for future in as_completed(futures):
+                job = future.result()
+                # Cache hits were counted as "cached" already
+                if job.status != "cached":
+                    self._count(job.outcome or "failed")
+                self.log(job, "---")
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            self._handle_interrupt()
+            raise
+        finally:
+            pool.shutdown(wait=not self.stop_event.is_set(), cancel_futures=True)
+            self.poller.stop()
+            if self.manifest is not None:
+                self.manifest.save()
+        return self.counts
+
+    def _handle_interrupt(self):
+        print("")
+        print("=========================================")
+        print("Interrupt signal received (Ctrl+C)")
+        with self._lock:
+            in_flight = list(self._in_flight)
+        if not in_flight:
+            return
+
+        print(f"Jobs still running on the GPU cluster: {', '.join(in_flight)}")
+        answer = ""
+        if sys.stdin.isatty():
+            try:
+                answer = input(f"Cancel the {len(in_flight)} remote job(s)? (y/n): ").strip().lower()
+            except EOFError:
+                answer = ""
+        if answer.startswith("y"):
+            for job_id in in_flight:
+                print(f"Cancelling remote job {job_id}...")
+                try:
+                    print(f"Response: {json.dumps(self.client.cancel(job_id))}")
+                except requests.exceptions.RequestException as e:
+                    print(f"Error: {e}")
+        else:
+            print("Remote jobs will continue running.")
+            print("To check status later, run:")
+            for job_id in in_flight:
+                print(f"  python tools/fairy.py check {job_id}")
+
+
+def print_summary(counts, poller=None):
+    print("")
+    print("=========================================")
+    print("===== Submission Summary =====")
+    print(f"Total files found: {counts['total']}")
+    print(f"Files submitted successfully: {counts['submitted']}")
+    print(f"Files failed: {counts['failed']}")
+    print(f"Files skipped (already done): {counts['skipped']}")
+    if counts.get("cached"):
+        print(f"Files served from result cache: {counts['cached']}")
+    if poller is not None:
+        requests_sent = poller.stats["bulk_requests"] + poller.stats["status_requests"]
+        polls = poller.scheduler.summary()
+        print(f"Status requests sent: {requests_sent} "
+              f"(fixed 10s polling per job would have sent ~{polls['fixed_polls']})")
+    print("All submissions complete!")
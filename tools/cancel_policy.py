@@ -0,0 +1,130 @@
+"""
+Auto-cancel (No Repro) deadlines per competition or per file.
+
+gpu_submit.sh cancelled every job after 36 polls of 10 seconds. The policy
+here picks a wall-clock deadline (seconds since the job started running)
+for each code file, first match wins:
+
+1. "files" entry in the config, by code file name
+2. "competitions" entry in the config, by competition ID
+3. history: p95 of the run times (the logs' exec_time) of earlier successful
+   jobs of the competition (from logs/manifest.json) times a safety
+   multiplier, clamped to [floor, ceiling]; needs min_samples runs
+4. "default"
+
+Config file (CANCEL_POLICY_FILE, default cancel_policy.json in the repo root):
+
+    {
+      "default": 360,
+      "competitions": {"hubmap-kidney-segmentation": 1800},
+      "files": {"<competition>_<datarow>_<step>.py": 2400},
+      "history": {"multiplier": 2.0, "percentile": 95, "min_samples": 3, "floor": 120, "ceiling": 3600}
+    }
+"""
+import json
+import math
+import os
+from pathlib import Path
+
+DEFAULT_CANCEL_AFTER = 6 * 60
+DEFAULT_POLICY_FILE = Path(__file__).resolve().parent.parent / "cancel_policy.json"
+DEFAULT_HISTORY = {"multiplier": 2.0, "percentile": 95, "min_samples": 3, "floor": 120, "ceiling": 3600}
+
+
+def format_duration(seconds):
+    """360 -> '6m', 90 -> '1m30s', 45 -> '45s'."""
+    seconds = int(seconds)
+    minutes, rest = divmod(seconds, 60)
+    if not minutes:
+        return f"{rest}s"
+    return f"{minutes}m{rest}s" if rest else f"{minutes}m"
+
+
+def history_from_manifest(manifest):
+    """
+    Collects the run times of jobs that ran successfully.
+
+    The time is the exec_time the job's own log reports for a run with
+    success: true. Crashes, non-zero exit codes and cancelled runs are left
+    out: a crash says nothing about how long a working run takes, and a
+    cancel only tells us the job ran at least that long. Entries written
+    before exec_time was recorded fall back to the wall-clock run time of a
+    completed job with exit code 0.
+
+    Returns:
+        dict: {competition_id: [seconds, ...]}
+    """
+    history = {}
+    if manifest is None:
+        return history
+    for entry in manifest.entries.values():
+        if entry.get("status") != "completed" or str(entry.get("exit_code")) != "0":
+            continue
+        if "exec_time" in entry:
+            seconds = entry["exec_time"]
+        else:
+            started, finished = entry.get("started_at"), entry.get("finished_at")
+            seconds = finished - started if started is not None and finished is not None else None
+        if seconds is None or seconds < 0:
+            continue
+        history.setdefault(entry.get("competition_id"), []).append(seconds)
+    return history
+
+
+class CancelPolicy:
+    """Decides how long a job may run before it is cancelled as No Repro."""
+
+    def __init__(self, config=None, history=None, override=None):
+        config = config or {}
+        self.default = config.get("default", DEFAULT_CANCEL_AFTER)
+        self.competitions = config.get("competitions", {})
+        self.files = config.get("files", {})
+        self.history_settings = {**DEFAULT_HISTORY, **config.get("history", {})}
+        self.history = history or {}
+        # --cancel-after: one deadline for everything
+        self.override = override
+
+    @classmethod
+    def load(cls, path=None, manifest=None, override=None):
+        """Reads the config file (if any) and the run history from a RunManifest."""
+        path = Path(path or os.getenv("CANCEL_POLICY_FILE") or DEFAULT_POLICY_FILE)
+        config = {}
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read cancel policy {path}: {e}")
+        return cls(config, history_from_manifest(manifest), override=override)
+
+    def _from_history(self, competition_id):
+        settings = self.history_settings
+        samples = sorted(self.history.get(competition_id) or [])
+        if len(samples) < settings["min_samples"]:
+            return None
+        rank = max(1, math.ceil(settings["percentile"] / 100 * len(samples)))
+        seconds = samples[rank - 1] * settings["multiplier"]
+        return max(settings["floor"], min(settings["ceiling"], seconds)), len(samples)
+
+    def deadline(self, competition_id, filename=None):
+        """
+        Returns the auto-cancel deadline for a code file.
+
+        Args:
+            competition_id (str): Competition ID.
+            filename (str): Code file name (<competition>_<datarow>_<step>.py).
+
+        Returns:
+            tuple: (seconds (int), source (str) describing where the value came from).
+        """
+        if self.override:
+            return int(self.override), "--cancel-after"
+        if filename and filename in self.files:
+            return int(self.files[filename]), "file config"
+        if competition_id in self.competitions:
+            return int(self.competitions[competition_id]), "competition config"
+        from_history = self._from_history(competition_id)
+        if from_history:
+            seconds, samples = from_history
+            return int(seconds), f"history of {samples} runs"
+        return int(self.default), "default"
@@ -0,0 +1,250 @@
+"""
+Python client for the GPU cluster API.
+
+All cluster calls go through one requests.Session with a keep-alive
+connection pool, so the TLS connection to the ngrok endpoint is reused
+instead of paying a curl process spawn plus handshake per call.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_SERVER_URL = "https://ceriferous-hoelike-jeffie.ngrok-free.dev"
+
+
+class RateLimited(Exception):
+    """The cluster answered 429; retry_after is the suggested wait in seconds (or None)."""
+
+    def __init__(self, retry_after=None):
+        super().__init__(f"Rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+def build_config_yaml(competition_id, project_id, user_id, expected_time, token, timeout=None):
+    """Renders the config.yaml the /api/submit endpoint expects."""
+    lines = [
+        f'competition_id: "{competition_id}"',
+        f'project_id: "{project_id}"',
+        f'user_id: "{user_id}"',
+        f"expected_time: {expected_time}",
+    ]
+    if timeout is not None:
+        lines.append(f"timeout: {timeout}")
+    lines.append(f'token: "{token}"')
+    return "\n".join(lines) + "\n"
+
+
+class ClusterClient:
+    """Thin wrapper around the cluster's /api endpoints sharing one connection pool."""
+
+    def __init__(self, server_url, token, user_id=None, pool_size=16, verify=True):
+        self.server_url = server_url.rstrip("/")
+        self.token = token
+        self.user_id = user_id
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "ngrok-skip-browser-warning": "true",
+        })
+        # Only idempotent reads are retried; a retried submit could start a job twice
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        return f"{self.server_url}{path}"
+
+    def _json(self, response):
+        try:
+            return response.json()
+        except ValueError:
+            return {"detail": response.text, "http_status": response.status_code}
+
+    def submit(self, code, competition_id, project_id, expected_time=600, wait=False,
+               timeout=None, filename="solution.py"):
+        """
+        Submits code to the cluster.
+
+        Args:
+            code (bytes | str | Path): The code itself, or a path to the code file.
+            competition_id (str): Competition ID.
+            project_id (str): Project ID (the datarow ID for debug runs).
+            expected_time (int): Expected runtime in seconds.
+            wait (bool): Block until the job finishes (sync mode).
+            timeout (float): Optional 'timeout' config value.
+
+        Returns:
+            dict: The submit response (job_id, status, ...).
+        """
+        if isinstance(code, Path):
+            code = code.read_bytes()
+        elif isinstance(code, str):
+            code = code.encode("utf-8")
+        config_yaml = build_config_yaml(
+            competition_id, project_id, self.user_id, expected_time, self.token, timeout=timeout
+        )
+        files = {
+            "code": (filename, code),
+            "config_file": ("config.yaml", config_yaml.encode("utf-8")),
+        }
+        response = self.session.post(
+            self.url("/api/submit"),
+            params={"wait": "true" if wait else "false"},
+            files=files,
+            # Sync mode can wait up to 4 hours server-side
+            timeout=None if wait else 60,
+        )
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimited(int(retry_after) if retry_after and retry_after.isdigit() else None)
+        return self._json(response)
+
+    def status(self, job_id, timeout=30):
+        response = self.session.get(self.url(f"/api/status/{job_id}"), timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def results(self, job_id, timeout=120):
+        response = self.session.get(self.url(f"/api/results/{job_id}"), timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_results(self, job_id, timeout=120, chunk_size=64 * 1024):
+        """
+        Same response as results(), but as decoded text chunks while it downloads.
+
+        Yields:
+            str: The next piece of the JSON body (pass to log_normalizer.normalize_stream).
+        """
+        with self.session.get(self.url(f"/api/results/{job_id}"), stream=True, timeout=(10, timeout)) as response:
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+            yield from response.iter_content(chunk_size, decode_unicode=True)
+
+    def logs(self, job_id, offset=0, timeout=30):
+        """
+        Console output printed since offset (offset polling).
+
+        Returns:
+            dict: {"content", "next_offset", "complete", "status", ...}
+        """
+        response = self.session.get(self.url(f"/api/logs/{job_id}"), params={"offset": offset}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_logs(self, job_id, offset=0, read_timeout=60):
+        """
+        Opens a chunked stream of console output from offset on.
+
+        Returns:
+            requests.Response: Streaming response; a JSON content type means the
+            server ignored follow and answered like logs(). Close it when done.
+        """
+        response = self.session.get(
+            self.url(f"/api/logs/{job_id}"),
+            params={"offset": offset, "follow": "true"},
+            stream=True,
+            timeout=(10, read_timeout),
+        )
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        response.encoding = response.encoding or "utf-8"
+        return response
+
+    def cancel(self, job_id, timeout=30):
+        response = self.session.post(self.url(f"/api/cancel/{job_id}"), timeout=timeout)
+        response.raise_for_status()
+        return self._json(response)
+
+    def list_jobs(self, timeout=30):
+        response = self.session.get(self.url("/api/jobs"), timeout=timeout)
+        response.raise_for_status()
+        return response.json().get("jobs", [])
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide client configured from SERVER_URL/TOKEN/USER_ID."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = ClusterClient(
+                os.getenv("SERVER_URL") or DEFAULT_SERVER_URL,
+                os.getenv("TOKEN", "your_secret_token_xyz"),
+                os.getenv("USER_ID", "your_username"),
+            )
+        return _default_client
+
+
+def submit_job(competition_id, code_file, expected_time=600, wait=False, project_id=None):
+    """
+    Submits a code file and saves the response under logs/ (what api_run.sh does).
+
+    Returns:
+        dict: The submit response, or None if the submission failed.
+    """
+    code_path = Path(code_file)
+    if not code_path.is_file():
+        print(f"ERROR: file not found: {code_file}")
+        return None
+
+    client = get_client()
+    project_id = project_id or os.getenv("PROJECT_ID", "my-project")
+    print(f"submitting to {client.server_url}...")
+    print(f"  competition: {competition_id}")
+    print(f"  code file: {code_file}")
+    print(f"  expected time: {expected_time} seconds")
+    print(f"  wait mode: wait={'true' if wait else 'false'}")
+    print()
+
+    try:
+        response = client.submit(code_path, competition_id, project_id, expected_time=expected_time, wait=wait)
+    except (requests.exceptions.RequestException, RateLimited) as e:
+        print(f"ERROR: submission failed: {e}")
+        return None
+
+    logs_dir = Path(__file__).resolve().parent.parent / "logs"
+    logs_dir.mkdir(exist_ok=True)
+    log_file = logs_dir / f"{competition_id}_{code_path.stem}_response.json"
+    with open(log_file, "w", encoding="utf-8") as f:
+        json.dump(response, f, indent=2)
+
+    job_id = response.get("job_id")
+    if not job_id:
+        print("ERROR: submission failed")
+        print(json.dumps(response, indent=2))
+        return None
+
+    print("✓ submitted!")
+    print(f"  job id: {job_id}")
+    for key in ("node_id", "status"):
+        if response.get(key) is not None:
+            print(f"  {response[key]}")
+    print(f"  saved to: {log_file}")
+
+    if wait and response.get("status") == "completed":
+        print()
+        print("✓ done!")
+        if response.get("exit_code") is not None:
+            print(f"  exit code: {response['exit_code']}")
+    return response
@@ -0,0 +1,177 @@
+"""
+Columnar export of every debug result (Parquet or Arrow IPC).
+
+One record per code/log pair: the sheet row columns from generate_sheet_row
+(typed: TRUE/FALSE as booleans, scores as integers, N/A as null) plus the
+job metadata logs/manifest.json keeps for the code file (job ID, status,
+exit code, submit/start/finish times, queue wait and run time). Questions
+across hundreds of datarows, like the mean exec_time per competition or the
+failure rate per step, then become one pass over a column:
+
+    import pyarrow.parquet as pq
+    df = pq.read_table("results.parquet").to_pandas()
+    df.groupby("competition_id").exec_time.mean()
+
+pyarrow is optional: only writing the file needs it (pip install pyarrow).
+"""
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts_python"))
+from generate_sheet_row import discover_rows, generate_rows
+from run_manifest import MANIFEST_NAME, RunManifest
+
+FORMATS = ("parquet", "arrow")
+
+# Sheet columns that hold TRUE/FALSE (N/A becomes null)
+BOOL_COLUMNS = ("bug_confirmed", "initial_bug_reproducible", "bug_fixed", "all_bugs_fixed")
+TEXT_COLUMNS = ("code", "_term_out", "output_logs", "revised_analysis", "revised_plan",
+                "current_debug_code", "output_logs_after_fix")
+TIME_COLUMNS = ("submitted_at", "started_at", "finished_at")
+
+
+def _bool(value):
+    return {"TRUE": True, "FALSE": False}.get(str(value).upper())
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _time(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value else None
+
+
+def to_record(key, row_dict, entry=None):
+    """
+    Turns a sheet row and its manifest entry into one typed record.
+
+    Args:
+        key (tuple): (competition_id, datarow_id, step).
+        row_dict (dict): Row from generate_row_data().
+        entry (dict): The code file's logs/manifest.json entry, if any.
+
+    Returns:
+        dict: Column name -> Python value (None for missing).
+    """
+    comp_id, row_id, step = key
+    entry = entry or {}
+    record = {"competition_id": comp_id, "datarow_id": row_id, "debug_step": step}
+    record["exec_time"] = _float(row_dict.get("exec_time"))
+    record["proposed_debug_analysis_accurate"] = _int(row_dict.get("proposed_debug_analysis_accurate"))
+    for column in BOOL_COLUMNS:
+        record[column] = _bool(row_dict.get(column))
+    for column in TEXT_COLUMNS:
+        record[column] = row_dict.get(column) or None
+
+    record["job_id"] = entry.get("job_id")
+    record["status"] = entry.get("status")
+    record["outcome"] = entry.get("outcome")
+    record["exit_code"] = _int(entry.get("exit_code"))
+    for column in TIME_COLUMNS:
+        record[column] = _time(entry.get(column))
+    submitted, started, finished = (entry.get(column) for column in TIME_COLUMNS)
+    record["queue_wait"] = started - submitted if submitted and started else None
+    record["run_time"] = finished - started if started and finished and finished >= started else None
+    return record
+
+
+def collect_records(root=".", log_dir=None, step=None, workers=8, score=False):
+    """
+    Builds a record for every code/log pair under root.
+
+    Args:
+        root (str): Project root (with code/ and logs/).
+        log_dir (str): Where manifest.json lives (default: <root>/logs).
+        step (int): Only this debug step (default: all steps).
+        workers (int): Rows built at the same time.
+        score (bool): Score step 0 analyses (rules, score cache, then LM Studio);
+            off by default, leaving the score null.
+
+    Returns:
+        tuple: (list of records, list of ((competition_id, datarow_id, step), error message))
+    """
+    manifest = RunManifest(Path(log_dir or Path(root) / "logs") / MANIFEST_NAME)
+    keys = discover_rows(root, step=step)
+    rows, errors = generate_rows(keys, root, workers=workers, score=score)
+    records = [
+        to_record(key, row_dict, manifest.get(f"{key[0]}_{key[1]}_{key[2]}.py"))
+        for key, row_dict in rows
+    ]
+    return records, errors
+
+
+def to_table(records, metadata=None):
+    """Builds a pyarrow Table with a fixed schema from records (requires pyarrow)."""
+    import pyarrow as pa
+
+    fields = [
+        ("competition_id", pa.string()),
+        ("datarow_id", pa.string()),
+        ("debug_step", pa.int32()),
+        ("exec_time", pa.float64()),
+        ("proposed_debug_analysis_accurate", pa.int8()),
+        *[(column, pa.bool_()) for column in BOOL_COLUMNS],
+        *[(column, pa.large_string()) for column in TEXT_COLUMNS],
+        ("job_id", pa.string()),
+        ("status", pa.string()),
+        ("outcome", pa.string()),
+        ("exit_code", pa.int32()),
+        *[(column, pa.timestamp("ms", tz="UTC")) for column in TIME_COLUMNS],
+        ("queue_wait", pa.float64()),
+        ("run_time", pa.float64()),
+    ]
+    schema = pa.schema(fields, metadata={k: str(v) for k, v in (metadata or {}).items()})
+    columns = {name: [record.get(name) for record in records] for name, _ in fields}
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def write_table(table, path, fmt=None):
+    """
+    Writes a table as Parquet or Arrow IPC (format from the extension unless given).
+
+    Returns:
+        str: The format written.
+    """
+    path = Path(path)
+    fmt = fmt or ("arrow" if path.suffix in (".arrow", ".feather", ".ipc") else "parquet")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, compression="zstd")
+    else:
+        import pyarrow as pa
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return fmt
+
+
+def export(output, root=".", log_dir=None, step=None, workers=8, score=False, fmt=None):
+    """
+    Collects every result under root and writes it to output.
+
+    Returns:
+        tuple: (number of rows written, list of skipped rows with their errors)
+    """
+    records, errors = collect_records(root, log_dir=log_dir, step=step, workers=workers, score=score)
+    manifest_path = Path(log_dir or Path(root) / "logs") / MANIFEST_NAME
+    table = to_table(records, metadata={
+        "fairy.exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fairy.root": Path(root).resolve(),
+        "fairy.manifest": manifest_path.resolve() if manifest_path.exists() else "",
+        "fairy.rows": len(records),
+        "fairy.scored": score,
+    })
+    write_table(table, output, fmt)
+    return len(records), errors
@@ -3,11 +3,19 @@ import argparse
 import os
 import sys
 import json
-import subprocess
 import shutil
+import time
 from pathlib import Path
 from datetime import datetime
 
+import requests
+from dotenv import load_dotenv
+
+from cluster_client import RateLimited, get_client
+from log_normalizer import TRUNCATION_MODES
+
+load_dotenv()
+
 # Configuration
 SERVER_URL = os.getenv("SERVER_URL", "https://ceriferous-hoelike-jeffie.ngrok-free.dev")
 USER_ID = os.getenv("USER_ID", "your_username")
@@ -17,21 +25,6 @@ PROJECT_ID = os.getenv("PROJECT_ID", "my-project")
 TOOLS_DIR = Path(__file__).parent
 TEMPLATE_PATH = TOOLS_DIR / "templates" / "debug_template.py"
 
-def run_curl_command(args):
-    """Runs a curl command and returns the output."""
-    try:
-        result = subprocess.run(
-            args,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error running curl: {e}")
-        print(f"Stderr: {e.stderr}")
-        return None
-
 def scaffold(args):
     """Creates a new debug file from template."""
     filename = f"{args.datarow_id}_{args.competition_id}_{args.debug_step}.py"
@@ -60,76 +53,172 @@ def submit(args):
     # Expected format: <datarow_id>_<competition_id>_<debugstep>.py
     parts = code_file.stem.split('_')
     competition_id = parts[1] if len(parts) >= 2 else "unknown-competition"
-    
-    # Create temp config
-    config_data = {
-        "competition_id": competition_id,
-        "project_id": PROJECT_ID,
-        "user_id": USER_ID,
-        "expected_time": args.expected_time,
-        "token": TOKEN
-    }
-    
-    config_file = Path("temp_config.yaml")
-    with open(config_file, "w") as f:
-        for k, v in config_data.items():
-            f.write(f"{k}: \"{v}\"\n")
 
     print(f"Submitting {code_file} to {SERVER_URL}...")
     print(f"Competition: {competition_id}")
     
-    wait_param = "true" if args.wait else "false"
-    curl_args = [
-        "curl", "-s", "-X", "POST",
-        f"{SERVER_URL}/api/submit?wait={wait_param}",
-        "-F", f"code=@{code_file}",
-        "-F", f"config_file=@{config_file}"
-    ]
-    
-    response_json = run_curl_command(curl_args)
+    try:
+        response = get_client().submit(
+            code_file, competition_id, PROJECT_ID,
+            expected_time=args.expected_time, wait=args.wait
+        )
+    except (requests.exceptions.RequestException, RateLimited) as e:
+        print(f"Error submitting job: {e}")
+        return
+
+    print("Submission response:")
+    print(json.dumps(response, indent=2))
     
-    # Cleanup config
-    if config_file.exists():
-        config_file.unlink()
-        
-    if response_json:
-        try:
-            response = json.loads(response_json)
-            print("Submission response:")
-            print(json.dumps(response, indent=2))
-            
-            job_id = response.get("job_id")
-            if job_id:
-                print(f"\nJob ID: {job_id}")
-                # Save to log
-                log_dir = Path("logs")
-                log_dir.mkdir(exist_ok=True)
-                log_file = log_dir / f"{code_file.stem}_response.json"
-                with open(log_file, "w") as f:
-                    json.dump(response, f, indent=2)
-                print(f"Response saved to {log_file}")
-        except json.JSONDecodeError:
-            print("Error decoding response JSON:")
-            print(response_json)
+    job_id = response.get("job_id")
+    if job_id:
+        print(f"\nJob ID: {job_id}")
+        # Save to log
+        log_dir = Path("logs")
+        log_dir.mkdir(exist_ok=True)
+        log_file = log_dir / f"{code_file.stem}_response.json"
+        with open(log_file, "w") as f:
+            json.dump(response, f, indent=2)
+        print(f"Response saved to {log_file}")
 
 def check(args):
     """Checks job status."""
-    job_id = args.job_id
-    print(f"Checking status for Job ID: {job_id}...")
-    
-    curl_args = [
-        "curl", "-s",
-        "-H", f"Authorization: Bearer {TOKEN}",
-        f"{SERVER_URL}/api/status/{job_id}"
-    ]
-    
-    response_json = run_curl_command(curl_args)
-    if response_json:
+    if args.watch:
+        watch(args.job_ids)
+        return
+
+    for job_id in args.job_ids:
+        print(f"Checking status for Job ID: {job_id}...")
         try:
-            response = json.loads(response_json)
-            print(json.dumps(response, indent=2))
-        except json.JSONDecodeError:
-            print(response_json)
+            print(json.dumps(get_client().status(job_id), indent=2))
+        except requests.exceptions.HTTPError as e:
+            print(f"Error: {e}")
+            print(e.response.text)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error checking status: {e}")
+
+def watch(job_ids):
+    """Follows several jobs with one shared polling loop until they finish."""
+    from job_poller import JobPoller
+
+    poller = JobPoller(get_client())
+
+    def on_change(job_id, state, previous):
+        status = state.get("status", "unknown")
+        queue_pos = state.get("queue_position")
+        suffix = f" (Queue position: {queue_pos})" if status == "pending" and queue_pos is not None else ""
+        print(f"[{datetime.now():%H:%M:%S}] {job_id}: {status}{suffix}")
+
+    poller.subscribe(on_change)
+    for job_id in job_ids:
+        poller.watch(job_id)
+    print(f"Watching {len(job_ids)} job(s)... (Ctrl+C to stop)")
+    try:
+        poller.poll_once()
+        while poller.watched():
+            time.sleep(poller.next_delay())
+            poller.poll_once()
+    except KeyboardInterrupt:
+        pass
+    print(f"Requests sent: {poller.stats['bulk_requests'] + poller.stats['status_requests']}")
+    polls = poller.scheduler.summary()
+    print(f"  {polls['polls']} polls for {polls['jobs']} job(s), {polls['saved']} saved vs fixed 10s polling")
+
+def batch(args):
+    """Submits every debug file in a directory with several jobs in flight."""
+    from batch_runner import BatchRunner, discover_jobs, print_summary
+    from result_cache import get_cache
+    from run_manifest import MANIFEST_NAME, RunManifest
+    from cancel_policy import CancelPolicy
+    from log_normalizer import Truncation
+
+    if not os.getenv("TOKEN"):
+        print("Error: TOKEN not set (check .env file or set TOKEN environment variable)")
+        sys.exit(1)
+
+    code_dir = Path(args.code_dir)
+    if not code_dir.is_dir():
+        print(f"Error: Code directory {code_dir} does not exist")
+        sys.exit(1)
+    Path(args.log_dir).mkdir(parents=True, exist_ok=True)
+
+    if args.force:
+        print("Force mode: Will re-submit all files, even if logs exist")
+    if args.no_cache:
+        print("Cache bypass: Will submit even if identical code already ran")
+    if args.stop_on_error:
+        print("Stop on error: Jobs are cancelled at the first traceback in their output")
+    print("Starting GPU cluster submissions...")
+    print(f"Server: {SERVER_URL}")
+    print(f"User: {USER_ID}")
+    print(f"Expected runtime per job: {args.expected_time}s")
+    print(f"Max jobs in flight: {args.max_in_flight}")
+    print("")
+
+    manifest = RunManifest(Path(args.log_dir) / MANIFEST_NAME)
+    runner = BatchRunner(
+        get_client(),
+        expected_time=args.expected_time,
+        max_in_flight=args.max_in_flight,
+        poll_interval=args.poll_interval,
+        cache=get_cache(),
+        bypass_cache=args.no_cache,
+        manifest=manifest,
+        cancel_policy=CancelPolicy.load(args.cancel_policy, manifest, override=args.cancel_after),
+        stream_logs=not args.no_stream,
+        stop_on_error=args.stop_on_error,
+        truncation=Truncation.from_env(args.truncate),
+    )
+    try:
+        jobs = discover_jobs(code_dir, args.log_dir)
+        if args.only:
+            only = {Path(name).name for name in args.only}
+            jobs = [job for job in jobs if job.name in only]
+        counts = runner.run(jobs, force=args.force)
+    except KeyboardInterrupt:
+        print("")
+        print("Script terminated.")
+        sys.exit(130)
+    print_summary(counts, runner.poller)
+
+def export(args):
+    """Writes every debug result to one Parquet/Arrow file."""
+    try:
+        import pyarrow
+    except ImportError:
+        print("Error: export needs pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    from export_results import export as export_results
+
+    rows, errors = export_results(
+        args.output,
+        root=args.root,
+        log_dir=args.log_dir,
+        step=args.step,
+        workers=args.workers,
+        score=args.score,
+        fmt=args.format,
+    )
+    for (comp_id, row_id, step), error in errors:
+        print(f"Skipped {comp_id}_{row_id}_{step}: {error}")
+    print(f"Exported {rows} rows to {args.output}")
+
+def score_cache(args):
+    """Shows or drops cached LM Studio scores."""
+    from score_cache import get_score_cache
+
+    cache = get_score_cache()
+    if args.clear:
+        cache.clear()
+        print(f"Cleared score cache {cache.cache_dir}")
+    elif args.invalidate_model:
+        cache.invalidate_model(args.invalidate_model)
+        print(f"Dropped cached scores of model {args.invalidate_model}")
+    else:
+        stats = cache.stats()
+        if not stats:
+            print("Score cache is empty")
+        for model, count in stats.items():
+            print(f"{model}: {count} scores")
 
 def main():
     parser = argparse.ArgumentParser(description="Fairy Debugger CLI")
@@ -149,7 +238,45 @@ def main():
     
     # Check command
     check_parser = subparsers.add_parser("check", help="Check job status")
-    check_parser.add_argument("job_id", help="Job ID")
+    check_parser.add_argument("job_ids", nargs="+", metavar="job_id", help="Job ID(s)")
+    check_parser.add_argument("--watch", action="store_true", help="Keep polling until all jobs finish")
+    
+    # Batch command
+    batch_parser = subparsers.add_parser("batch", help="Submit all debug files concurrently")
+    batch_parser.add_argument("--code-dir", default="code", help="Directory with <competition>_<datarow>_<step>.py files")
+    batch_parser.add_argument("--log-dir", default="logs", help="Directory for <datarow>/<step>.jsonl logs")
+    batch_parser.add_argument("--max-in-flight", type=int, default=4, help="Max jobs submitted at the same time")
+    batch_parser.add_argument("--expected-time", type=int, default=300, help="Expected runtime per job in seconds")
+    batch_parser.add_argument("--poll-interval", type=float, default=10, help="Base seconds between status polls")
+    batch_parser.add_argument("--force", action="store_true", help="Re-submit files even if logs exist")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Always submit, even if identical code already ran")
+    batch_parser.add_argument("--no-stream", action="store_true", help="Don't tail console output into .raw.log while jobs run")
+    batch_parser.add_argument("--cancel-after", type=int,
+                              help="Cancel every job as No Repro after this many seconds of running (overrides the policy)")
+    batch_parser.add_argument("--cancel-policy", help="Cancel policy JSON (default: cancel_policy.json)")
+    batch_parser.add_argument("--stop-on-error", action="store_true",
+                              help="Cancel a job as soon as its output shows a traceback (saves GPU time)")
+    batch_parser.add_argument("--truncate", choices=TRUNCATION_MODES,
+                              help="How to cut logs over 50K chars: head, or head_tail keeping the end and "
+                                   "every traceback (default: LOG_TRUNCATION or head)")
+    batch_parser.add_argument("--only", action="append", metavar="FILE",
+                              help="Only run this code file (repeatable); other files in --code-dir are left alone")
+
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Export all debug results to Parquet/Arrow (needs pyarrow)")
+    export_parser.add_argument("output", help="Output file (.parquet, or .arrow/.feather for Arrow IPC)")
+    export_parser.add_argument("--format", choices=("parquet", "arrow"), help="Output format (default: from the extension)")
+    export_parser.add_argument("--root", default=".", help="Project root with code/ and logs/")
+    export_parser.add_argument("--log-dir", help="Directory with manifest.json (default: <root>/logs)")
+    export_parser.add_argument("--step", type=int, help="Only this debug step")
+    export_parser.add_argument("--workers", type=int, default=8, help="Rows built at the same time")
+    export_parser.add_argument("--score", action="store_true",
+                               help="Score step 0 analyses (may query LM Studio); otherwise the score is left empty")
+
+    # Score cache command
+    score_cache_parser = subparsers.add_parser("score-cache", help="Show or drop cached LM Studio scores")
+    score_cache_parser.add_argument("--invalidate-model", metavar="MODEL", help="Drop every score of this model")
+    score_cache_parser.add_argument("--clear", action="store_true", help="Drop every cached score")
     
     args = parser.parse_args()
     
@@ -159,6 +286,12 @@ def main():
         submit(args)
     elif args.command == "check":
         check(args)
+    elif args.command == "batch":
+        batch(args)
+    elif args.command == "export":
+        export(args)
+    elif args.command == "score-cache":
+        score_cache(args)
     else:
         parser.print_help()
 
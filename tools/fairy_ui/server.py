@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import os
 import sys
 import subprocess
@@ -5,27 +7,43 @@ import shutil
 import time
 import json
 import glob
+import importlib
 import re
+import threading
 import requests
 from pathlib import Path
 from typing import Optional, Dict
 
+import anyio
+import anyio.to_thread
 from fastapi import FastAPI, Request, Form, BackgroundTasks
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Import the row generation logic
 # Add scripts_python to path to allow import
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(BASE_DIR / "scripts_python"))
-from generate_sheet_row import generate_row_data
+sys.path.append(str(BASE_DIR / "tools"))
+import generate_sheet_row
+from cluster_client import DEFAULT_SERVER_URL, ClusterClient
+from job_poller import JobPoller
+from result_cache import cache_key, get_cache
+from run_manifest import MANIFEST_NAME, RunManifest
+from cancel_policy import CancelPolicy, format_duration
+from log_normalizer import Truncation
+from log_watcher import FileWatcher
 
 # Load environment variables
 load_dotenv()
 
+# Development mode: pick up edits to the row generation code without a restart
+DEV_MODE = os.getenv("FAIRY_UI_DEV", "").lower() in ("1", "true", "yes")
+
 app = FastAPI()
 
 # Directories
@@ -45,6 +63,133 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 # Configure Server URL
 SERVER_URL = os.getenv("SERVER_URL")
 TOKEN = os.getenv("TOKEN")
+# Must match what gpu_submit.sh passes to the cluster, it is part of the result cache key
+EXPECTED_TIME = int(os.getenv("EXPECTED_TIME", "300"))
+
+# Cluster and LM Studio calls can take seconds each. They get threads of their
+# own, so a burst of cancels or row generations never holds up the threads that
+# serve status and log reads (plain `def` handlers run there).
+SLOW_CALL_WORKERS = int(os.getenv("FAIRY_UI_SLOW_WORKERS", "8"))
+slow_calls = anyio.CapacityLimiter(SLOW_CALL_WORKERS)
+
+async def run_slow(func, *args, **kwargs):
+    """Runs a blocking cluster or LM Studio call on the slow call threads."""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=slow_calls)
+
+# Browser polling bounds (ms): fast while output is expected, never slower than the cap
+UI_POLL_MIN_MS = 2000
+UI_POLL_MAX_MS = 15000
+
+# One shared poller tracks the remote jobs of every open tab, so UI polling
+# never turns into one cluster request per tab per tick
+remote_job_ids: Dict[str, str] = {}
+
+# /api/logs serves .raw.log from the offset the page already has. Every new run
+# truncates the file, so each run gets a generation; a page holding an offset
+# from another generation (or from before a server restart) starts over at 0.
+SERVER_BOOT_ID = format(int(time.time()), "x")
+log_generations: Dict[str, int] = {}
+# Bytes per /api/logs response; the page asks again right away while "more" is set
+MAX_LOG_CHUNK = 1024 * 1024
+
+def log_generation(key: str) -> str:
+    return f"{SERVER_BOOT_ID}.{log_generations.get(key, 0)}"
+
+def utf8_boundary(data: bytes) -> int:
+    """Length of data without a trailing incomplete UTF-8 sequence (the writer may be mid-character)."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:
+            needed = 2 if 0xC0 <= byte < 0xE0 else 3 if 0xE0 <= byte < 0xF0 else 4 if 0xF0 <= byte < 0xF8 else 1
+            return len(data) if needed <= back else len(data) - back
+    return len(data)
+
+cluster: Optional[ClusterClient] = None
+job_poller: Optional[JobPoller] = None
+if SERVER_URL and TOKEN:
+    # Keep-alive connection pool shared by cancels and the poller
+    cluster = ClusterClient(SERVER_URL, TOKEN, verify=False)
+    job_poller = JobPoller(cluster).start()
+
+def read_job_id(raw_log_path: Path) -> Optional[str]:
+    """Returns the cluster job ID gpu_submit.sh printed to a raw log, if any (OSError if unreadable)."""
+    if not raw_log_path.exists():
+        return None
+    with open(raw_log_path, "r", encoding="utf-8") as f:
+        match = re.search(r"Job ID: ([a-f0-9\-]+)", f.read())
+    return match.group(1) if match else None
+
+def find_remote_job_id(datarow_id: str, debug_step: int) -> Optional[str]:
+    """Returns the cluster job ID printed to the raw log for this run, if any."""
+    key = f"{datarow_id}_{debug_step}"
+    if key in remote_job_ids:
+        return remote_job_ids[key]
+    try:
+        job_id = read_job_id(LOG_DIR / datarow_id / f"{debug_step}.raw.log")
+    except OSError:
+        return None
+    if job_id:
+        remote_job_ids[key] = job_id
+        if job_poller:
+            job_poller.watch(job_id)
+    return job_id
+
+# Row generation modules and the watched modules they import names from, in
+# dependency order: a changed module is reloaded together with its dependents,
+# so none of them keeps a stale function (generate_sheet_row looks up
+# lm_studio_client at call time, so it does not depend on it). artifact_index
+# is left out so its cache survives reloads.
+HOT_RELOAD_MODULES = {
+    "score_cache": [],
+    "score_rules": [],
+    "judge_prompt": ["score_rules"],
+    "lm_studio_client": ["score_cache", "score_rules", "judge_prompt"],
+    "generate_sheet_row": [],
+}
+
+class ModuleReloader:
+    """Reloads modules whose source file changed since they were loaded (FAIRY_UI_DEV only)."""
+
+    def __init__(self, dependencies, watcher):
+        self.dependencies = dependencies
+        self.watcher = watcher
+        self.watched = set()
+        # Modules the watcher saw change since the last check
+        self.changed = set()
+        self._lock = threading.Lock()
+        self._watch_imported()
+
+    def _watch_imported(self):
+        # Modules imported lazily (lm_studio_client) are watched from the first check after their import
+        for name in self.dependencies:
+            path = getattr(sys.modules.get(name), "__file__", None)
+            if path and name not in self.watched:
+                self.watched.add(name)
+                self.watcher.watch(path, functools.partial(self._mark_changed, name))
+
+    def _mark_changed(self, name, path):
+        with self._lock:
+            self.changed.add(name)
+
+    def check(self):
+        """Reloads the modules the watcher flagged and their dependents; returns the reloaded module names."""
+        with self._lock:
+            self._watch_imported()
+            if not self.changed:
+                return []
+            stale = set()
+            for name, imports in self.dependencies.items():
+                if name in self.changed or stale.intersection(imports):
+                    stale.add(name)
+            self.changed.clear()
+            reloaded = [name for name in self.dependencies if name in stale and name in sys.modules]
+            for name in reloaded:
+                importlib.reload(sys.modules[name])
+            if reloaded:
+                print(f"Reloaded {', '.join(reloaded)}")
+            return reloaded
+
+module_reloader = ModuleReloader(HOT_RELOAD_MODULES, FileWatcher()) if DEV_MODE else None
 
 class SubmissionRequest(BaseModel):
     competition_id: str
@@ -53,6 +198,7 @@ class SubmissionRequest(BaseModel):
     code: str
     original_plan: Optional[str] = ""
     proposed_analysis: Optional[str] = ""
+    bypass_cache: Optional[bool] = False
 
 class ScaffoldRequest(BaseModel):
     competition_id: str
@@ -65,12 +211,21 @@ class GenerateRowRequest(BaseModel):
     debug_step: int
     proposed_analysis: Optional[str] = ""
 
+class GenerateRowsRequest(BaseModel):
+    format: str = "tsv"
+    header: bool = True
+    debug_step: Optional[int] = None
+    # Rows built at the same time; each worker can hold a LM Studio call open
+    workers: int = Field(8, ge=1, le=32)
+    # {"<datarow_id>_<step>": proposed analysis}
+    proposed_analyses: Optional[Dict[str, str]] = None
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/api/scaffold")
-async def scaffold_file(req: ScaffoldRequest):
+def scaffold_file(req: ScaffoldRequest):
     filename = f"{req.datarow_id}_{req.competition_id}_{req.debug_step}.py"
     file_path = CODE_DIR / filename
     
@@ -87,7 +242,7 @@ async def scaffold_file(req: ScaffoldRequest):
         return {"status": "error", "message": str(e)}
 
 @app.post("/api/run")
-async def run_submission(req: SubmissionRequest):
+def run_submission(req: SubmissionRequest):
     # 1. Validate and construct filename
     filename = f"{req.competition_id}_{req.datarow_id}_{req.debug_step}.py"
     file_path = CODE_DIR / filename
@@ -97,22 +252,45 @@ async def run_submission(req: SubmissionRequest):
         f.write(req.code)
     
     # 3. Clear existing logs for this run
+    run_key = f"{req.datarow_id}_{req.debug_step}"
+    remote_job_ids.pop(run_key, None)
+    # Pages following the old run's log start over
+    log_generations[run_key] = log_generations.get(run_key, 0) + 1
     log_path = LOG_DIR / req.datarow_id / f"{req.debug_step}.jsonl"
     if log_path.exists():
         os.remove(log_path)
-        
-    # 4. Run gpu_submit.sh in background
+    raw_log_path = LOG_DIR / req.datarow_id / f"{req.debug_step}.raw.log"
+    raw_log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 4. Identical code already ran: reuse its result instead of spending GPU minutes
+    if not req.bypass_cache:
+        # gpu_submit.sh submits to the same default server when SERVER_URL is unset
+        entry = get_cache().get(cache_key(req.code, req.competition_id, EXPECTED_TIME),
+                                truncation=Truncation.from_env().mode,
+                                server_url=SERVER_URL or DEFAULT_SERVER_URL,
+                                cancel_after=no_repro_deadline(req.competition_id, req.datarow_id, req.debug_step)[0])
+        if entry is not None:
+            with open(log_path, "w", encoding="utf-8") as f:
+                f.write(entry["log"] + "\n")
+            with open(raw_log_path, "w", encoding="utf-8") as f:
+                f.write(f"Identical code already ran as job {entry.get('job_id')} - using cached result\n")
+                f.write(f"✓ Results saved to {log_path}\n")
+            return {"status": "cached", "message": f"Reused cached result for {filename}", "job_id": entry.get("job_id")}
+
+    # 5. Run gpu_submit.sh in background
     try:
         # Capture output to a log file for live streaming
-        raw_log_path = LOG_DIR / req.datarow_id / f"{req.debug_step}.raw.log"
-        raw_log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        log_file = open(raw_log_path, "w", encoding="utf-8")
+        # Truncate, then hand over an O_APPEND handle: the batch process also
+        # appends the job's live console output to this file
+        open(raw_log_path, "w", encoding="utf-8").close()
+        log_file = open(raw_log_path, "a", encoding="utf-8")
         
         # Use unbuffered output for python if we were running python, but this is bash
-        # We removed --force to avoid re-submitting other files in code/ that already have logs.
-        # Since we deleted the specific log for this run above, gpu_submit.sh will run this one naturally.
-        cmd = ["bash", "gpu_submit.sh"]
+        # Only this file: other pending files in code/ would run alongside it and
+        # write their progress and Job IDs into this run's .raw.log
+        cmd = ["bash", "gpu_submit.sh", "--only", filename, "--max-in-flight", "1"]
+        if req.bypass_cache:
+            cmd.append("--no-cache")
         
         process = subprocess.Popen(
             cmd, 
@@ -132,19 +310,67 @@ async def run_submission(req: SubmissionRequest):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.get("/api/logs/{datarow_id}/{debug_step}")
-async def get_live_logs(datarow_id: str, debug_step: int):
+def read_log_chunk(datarow_id: str, debug_step: int, offset: int = 0, generation: Optional[str] = None,
+                   if_none_match: Optional[str] = None):
+    """
+    Reads the run's .raw.log from byte `offset` on.
+
+    Returns:
+        tuple: (chunk, etag). chunk is None when there is nothing new (offset at
+            the end of the same generation, or if_none_match equal to the ETag);
+            etag is None when there is no log yet or it could not be read.
+    """
     raw_log_path = LOG_DIR / datarow_id / f"{debug_step}.raw.log"
-    if raw_log_path.exists():
-        try:
-            with open(raw_log_path, "r", encoding="utf-8") as f:
-                return {"content": f.read()}
-        except Exception:
-            return {"content": "Error reading log file"}
-    return {"content": "Waiting for logs..."}
+    current = log_generation(f"{datarow_id}_{debug_step}")
+    if generation is not None and generation != current:
+        offset = 0
+    try:
+        size = raw_log_path.stat().st_size
+    except OSError:
+        return {"content": "Waiting for logs...", "start": 0, "offset": 0, "generation": current, "more": False}, None
+    if offset > size or offset < 0:
+        # Truncated by a run this server did not start (gpu_submit.sh from a shell)
+        offset = 0
+
+    etag = f'"{current}-{size}"'
+    if (offset == size and generation == current) or if_none_match == etag:
+        return None, etag
+    try:
+        with open(raw_log_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(min(size - offset, MAX_LOG_CHUNK))
+    except OSError:
+        return {"error": "Error reading log file"}, None
+    data = data[:utf8_boundary(data)]
+    return {
+        "content": data.decode("utf-8", errors="replace"),
+        "start": offset,
+        "offset": offset + len(data),
+        "generation": current,
+        # Cut at MAX_LOG_CHUNK (not just a held back partial character)
+        "more": offset + MAX_LOG_CHUNK < size,
+    }, etag
+
+@app.get("/api/logs/{datarow_id}/{debug_step}")
+def get_live_logs(request: Request, datarow_id: str, debug_step: int, offset: int = 0,
+                  generation: Optional[str] = None):
+    """
+    Returns the part of the run's .raw.log from byte `offset` on.
+
+    The page sends back the "offset" and "generation" of its last response and
+    appends "content", or replaces what it shows when "start" is 0. Nothing new
+    (or If-None-Match equal to the ETag) answers 304 with no body.
+    """
+    chunk, etag = read_log_chunk(datarow_id, debug_step, offset, generation,
+                                 request.headers.get("if-none-match"))
+    if chunk is None:
+        return Response(status_code=304, headers={"ETag": etag})
+    if etag is None:
+        return chunk
+    return JSONResponse(chunk, headers={"ETag": etag, "Cache-Control": "no-store"})
 
 @app.get("/api/code/{competition_id}/{datarow_id}/{debug_step}")
-async def get_code_file(competition_id: str, datarow_id: str, debug_step: int):
+def get_code_file(competition_id: str, datarow_id: str, debug_step: int):
     filename = f"{competition_id}_{datarow_id}_{debug_step}.py"
     file_path = CODE_DIR / filename
     if file_path.exists():
@@ -155,8 +381,8 @@ async def get_code_file(competition_id: str, datarow_id: str, debug_step: int):
             return {"code": f"Error reading code file: {e}"}
     return JSONResponse(status_code=404, content={"message": f"Code file not found: {filename}"})
 
-@app.get("/api/status/{datarow_id}/{debug_step}")
-async def get_status(datarow_id: str, debug_step: int):
+def run_status(datarow_id: str, debug_step: int):
+    """Status of a run: completed (with its log), running locally, or processing."""
     # Check if process is still running
     key = f"{datarow_id}_{debug_step}"
     is_local_running = False
@@ -177,95 +403,205 @@ async def get_status(datarow_id: str, debug_step: int):
                 return {"status": "completed", "data": data}
         except json.JSONDecodeError:
             pass # Log exists but incomplete
-            
-    return {"status": "running" if is_local_running else "processing", "message": "Waiting for logs..."}
+
+    response = {
+        "status": "running" if is_local_running else "processing",
+        "message": "Waiting for logs...",
+        "poll_after_ms": UI_POLL_MIN_MS
+    }
+    # Remote state comes from the shared poller's cache, not a new cluster request
+    job_id = find_remote_job_id(datarow_id, debug_step) if is_local_running else None
+    if job_id:
+        response["job_id"] = job_id
+        remote = job_poller.get(job_id) if job_poller else None
+        if remote:
+            response["remote"] = remote
+            # Let the browser slow down while the job waits deep in the queue
+            hint_ms = int(job_poller.scheduler.interval_hint(job_id, remote) * 1000)
+            response["poll_after_ms"] = max(UI_POLL_MIN_MS, min(UI_POLL_MAX_MS, hint_ms))
+    return response
+
+@app.get("/api/status/{datarow_id}/{debug_step}")
+def get_status(datarow_id: str, debug_step: int):
+    return run_status(datarow_id, debug_step)
+
+# /api/events pushes what /api/logs and /api/status would return as it changes.
+# The watcher only stats the logs of runs a page is following.
+file_watcher = FileWatcher()
+# Seconds between comment lines on an idle stream (keeps proxies from closing it)
+EVENT_KEEPALIVE = 15
+
+def sse_message(event: str, data, event_id: Optional[str] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.get("/api/events/{datarow_id}/{debug_step}")
+async def stream_events(request: Request, datarow_id: str, debug_step: int):
+    """
+    Server-sent events for one run.
+
+    "log" events carry /api/logs chunks, with "<generation>:<offset>" as the
+    event ID so a reconnecting EventSource (Last-Event-ID) resumes where it
+    stopped. "status" events carry the /api/status response whenever the
+    status, remote status or queue position changes; the stream ends after
+    "completed".
+    """
+    key = f"{datarow_id}_{debug_step}"
+    generation, _, offset = (request.headers.get("last-event-id") or "").rpartition(":")
+    generation = generation or None
+    offset = int(offset) if offset.isdigit() else 0
+
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+
+    def notify(*_):
+        loop.call_soon_threadsafe(changed.set)
+
+    def notify_job(job_id, state, previous):
+        if job_id == remote_job_ids.get(key):
+            notify()
+
+    async def events():
+        nonlocal generation, offset
+        last_state = None
+        unsubscribes = [
+            file_watcher.watch(LOG_DIR / datarow_id / f"{debug_step}.raw.log", notify),
+            file_watcher.watch(LOG_DIR / datarow_id / f"{debug_step}.jsonl", notify),
+        ]
+        if job_poller:
+            unsubscribes.append(job_poller.subscribe(notify_job))
+        try:
+            while True:
+                # Cleared before reading, so a write during the reads wakes the next round
+                changed.clear()
+                while True:
+                    chunk, etag = await run_in_threadpool(read_log_chunk, datarow_id, debug_step, offset, generation)
+                    # Nothing new, no log yet, or unreadable: wait for the next change
+                    if chunk is None or etag is None:
+                        break
+                    generation, offset = chunk["generation"], chunk["offset"]
+                    yield sse_message("log", chunk, f"{generation}:{offset}")
+                    if not chunk["more"]:
+                        break
+
+                status = await run_in_threadpool(run_status, datarow_id, debug_step)
+                remote = status.get("remote") or {}
+                state = (status["status"], status.get("job_id"), remote.get("status"), remote.get("queue_position"))
+                if state != last_state:
+                    last_state = state
+                    yield sse_message("status", status)
+                    if status["status"] == "completed":
+                        return
+
+                try:
+                    await asyncio.wait_for(changed.wait(), EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Also rechecks the status: a local process can exit without writing a log
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+        finally:
+            for unsubscribe in unsubscribes:
+                unsubscribe()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+@app.get("/api/poller_stats")
+async def get_poller_stats():
+    if not job_poller:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "requests": job_poller.stats,
+        "totals": job_poller.scheduler.summary(),
+        "jobs": job_poller.scheduler.stats()
+    }
+
+def stop_local_process(key: str):
+    """Terminates the run's gpu_submit.sh, killing it if it has not exited after 2s."""
+    proc = active_processes.pop(key, None)
+    if proc is None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=2)
+    except subprocess.TimeoutExpired:
+        proc.kill()
 
 @app.post("/api/cancel/{datarow_id}/{debug_step}")
 async def cancel_job(datarow_id: str, debug_step: int):
     key = f"{datarow_id}_{debug_step}"
     
     # 1. Kill local process
-    if key in active_processes:
-        proc = active_processes[key]
-        proc.terminate()
-        try:
-            proc.wait(timeout=2)
-        except subprocess.TimeoutExpired:
-            proc.kill()
-        del active_processes[key]
+    await run_slow(stop_local_process, key)
     
     # 2. Try to find Job ID in the raw log and kill remote
-    remote_cancelled = False
-    job_id = None
     raw_log_path = LOG_DIR / datarow_id / f"{debug_step}.raw.log"
-    if raw_log_path.exists():
-        try:
-            with open(raw_log_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                # Regex to find Job ID: "Job ID: xxxxxxxx-..."
-                match = re.search(r"Job ID: ([a-f0-9\-]+)", content)
-                if match and SERVER_URL and TOKEN:
-                    job_id = match.group(1)
-                    # Call remote cancel
-                    headers = {
-                        "Authorization": f"Bearer {TOKEN}",
-                        "ngrok-skip-browser-warning": "true"
-                    }
-                    try:
-                        cancel_response = requests.post(
-                            f"{SERVER_URL}/api/cancel/{job_id}", 
-                            headers=headers, 
-                            verify=False, 
-                            timeout=10
-                        )
-                        cancel_response.raise_for_status()
-                        cancel_data = cancel_response.json()
-                        
-                        # Verify cancellation by checking job status
-                        import time
-                        time.sleep(1)  # Brief wait for status to update
-                        status_response = requests.get(
-                            f"{SERVER_URL}/api/status/{job_id}",
-                            headers=headers,
-                            verify=False,
-                            timeout=5
-                        )
-                        
-                        if status_response.status_code == 200:
-                            status_data = status_response.json()
-                            remote_status = status_data.get("status", "")
-                            
-                            if remote_status in ["cancelled", "completed", "failed"]:
-                                remote_cancelled = True
-                                return {
-                                    "status": "success", 
-                                    "message": f"Job {job_id} cancelled and confirmed. Remote status: {remote_status}"
-                                }
-                            else:
-                                return {
-                                    "status": "warning", 
-                                    "message": f"Cancellation sent, but job still shows status: {remote_status}. Job ID: {job_id}"
-                                }
-                        else:
-                            return {
-                                "status": "warning", 
-                                "message": f"Cancellation sent to {job_id}, but could not verify status"
-                            }
-                            
-                    except requests.exceptions.Timeout:
-                        return {"status": "warning", "message": f"Timeout cancelling remote job {job_id}. Check manually."}
-                    except requests.exceptions.RequestException as e:
-                        return {"status": "warning", "message": f"Failed to cancel remote job {job_id}: {str(e)}"}
-                    except Exception as e:
-                        return {"status": "warning", "message": f"Error cancelling/verifying job {job_id}: {str(e)}"}
-        except Exception as e:
-            return {"status": "error", "message": f"Error reading log file: {str(e)}"}
-    
-    if job_id:
-        return {"status": "warning", "message": f"Local stopped, but remote job {job_id} cancellation could not be confirmed"}
-    else:
+    try:
+        job_id = await run_in_threadpool(read_job_id, raw_log_path)
+    except Exception as e:
+        return {"status": "error", "message": f"Error reading log file: {str(e)}"}
+    if not (job_id and cluster):
         return {"status": "success", "message": "Local process stopped (no remote job ID found in logs)"}
 
+    # Call remote cancel
+    try:
+        await run_slow(cluster.cancel, job_id, timeout=10)
+
+        # Verify cancellation by checking job status
+        await asyncio.sleep(1)  # Brief wait for status to update
+        try:
+            status_data = await run_slow(cluster.status, job_id, timeout=5)
+        except requests.exceptions.HTTPError:
+            status_data = None
+    except requests.exceptions.Timeout:
+        return {"status": "warning", "message": f"Timeout cancelling remote job {job_id}. Check manually."}
+    except requests.exceptions.RequestException as e:
+        return {"status": "warning", "message": f"Failed to cancel remote job {job_id}: {str(e)}"}
+    except Exception as e:
+        return {"status": "warning", "message": f"Error cancelling/verifying job {job_id}: {str(e)}"}
+
+    if status_data is None:
+        return {
+            "status": "warning", 
+            "message": f"Cancellation sent to {job_id}, but could not verify status"
+        }
+    remote_status = status_data.get("status", "")
+    if remote_status in ["cancelled", "completed", "failed"]:
+        return {
+            "status": "success", 
+            "message": f"Job {job_id} cancelled and confirmed. Remote status: {remote_status}"
+        }
+    return {
+        "status": "warning", 
+        "message": f"Cancellation sent, but job still shows status: {remote_status}. Job ID: {job_id}"
+    }
+
+def no_repro_deadline(competition_id: str, datarow_id: str, debug_step: int):
+    """Auto-cancel deadline the batch runner uses for this file: (seconds, source)."""
+    policy = CancelPolicy.load(manifest=RunManifest(LOG_DIR / MANIFEST_NAME))
+    return policy.deadline(competition_id, f"{competition_id}_{datarow_id}_{debug_step}.py")
+
+@app.get("/api/cancel_policy/{competition_id}/{datarow_id}/{debug_step}")
+def get_cancel_policy(competition_id: str, datarow_id: str, debug_step: int):
+    seconds, source = no_repro_deadline(competition_id, datarow_id, debug_step)
+    return {"cancel_after": seconds, "label": format_duration(seconds), "source": source}
+
+def write_no_repro_log(competition_id: str, datarow_id: str, debug_step: int):
+    cancel_after, _ = no_repro_deadline(competition_id, datarow_id, debug_step)
+    log_path = LOG_DIR / datarow_id / f"{debug_step}.jsonl"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "status": "skipped", 
+            "message": f"Manually verified (Runtime > {format_duration(cancel_after)}). No error reproduced.",
+            "cancel_after": cancel_after
+        }, f)
+
 @app.post("/api/mark_no_repro")
 async def mark_no_repro(req: SubmissionRequest):
     # 1. Cancel job if running and confirm remote cancellation
@@ -280,13 +616,7 @@ async def mark_no_repro(req: SubmissionRequest):
         }
     
     # 2. Create placeholder log
-    log_path = LOG_DIR / req.datarow_id / f"{req.debug_step}.jsonl"
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(log_path, "w", encoding="utf-8") as f:
-        json.dump({
-            "status": "skipped", 
-            "message": "Manually verified (Runtime > 600s). No error reproduced."
-        }, f)
+    await run_in_threadpool(write_no_repro_log, req.competition_id, req.datarow_id, req.debug_step)
         
     return {
         "status": "success",
@@ -296,18 +626,12 @@ async def mark_no_repro(req: SubmissionRequest):
 @app.post("/api/generate_row")
 async def generate_row(req: GenerateRowRequest):
     try:
-        # Force reload to pick up changes to the script without restarting server
-        import sys
-        import importlib
-        if 'generate_sheet_row' in sys.modules:
-            import generate_sheet_row
-            importlib.reload(generate_sheet_row)
-            generate_row_data_func = generate_sheet_row.generate_row_data
-        else:
-            # Fallback if not in sys.modules (should be there from top-level import)
-            from generate_sheet_row import generate_row_data as generate_row_data_func
+        if module_reloader:
+            await run_in_threadpool(module_reloader.check)
 
-        row_dict, raw_string = generate_row_data_func(
+        # Reads the logs and may ask LM Studio for the score
+        row_dict, raw_string = await run_slow(
+            generate_sheet_row.generate_row_data,
             req.competition_id, 
             req.datarow_id, 
             req.debug_step, 
@@ -325,6 +649,45 @@ async def generate_row(req: GenerateRowRequest):
             "message": f"Failed to generate row: {str(e)}"
         }
 
+@app.post("/api/generate_rows")
+async def generate_all_rows(req: GenerateRowsRequest):
+    """One sheet for every code/log pair, built in a worker pool."""
+    if req.format not in ("tsv", "csv"):
+        return {"status": "error", "message": f"Unknown format: {req.format}"}
+    try:
+        if module_reloader:
+            await run_in_threadpool(module_reloader.check)
+        keys = await run_in_threadpool(generate_sheet_row.discover_rows, BASE_DIR, step=req.debug_step)
+        proposed = {}
+        for key, text in (req.proposed_analyses or {}).items():
+            row_id, _, step = key.rpartition("_")
+            if step.isdigit():
+                proposed[(row_id, int(step))] = text
+        # Blocking (file reads, LM Studio calls): keep it off the event loop
+        rows, errors = await run_slow(
+            generate_sheet_row.generate_rows, keys, BASE_DIR, workers=req.workers, proposed_analyses=proposed
+        )
+        raw_string = await run_in_threadpool(
+            generate_sheet_row.format_rows, [row_dict for _, row_dict in rows], fmt=req.format, header=req.header
+        )
+        return {
+            "status": "success",
+            "rows": [
+                {"competition_id": comp_id, "datarow_id": row_id, "debug_step": step}
+                for (comp_id, row_id, step), _ in rows
+            ],
+            "errors": [
+                {"competition_id": comp_id, "datarow_id": row_id, "debug_step": step, "message": error}
+                for (comp_id, row_id, step), error in errors
+            ],
+            "raw_string": raw_string
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to generate rows: {str(e)}"
+        }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
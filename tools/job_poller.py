@@ -0,0 +1,199 @@
+"""
+Shared status poller for GPU cluster jobs.
+
+One loop watches any number of job IDs. Each tick it reads the bulk
+/api/jobs listing (one request for every watched job) and only falls back to
+/api/status/{job_id} for jobs the listing doesn't cover. Subscribers are
+called whenever a job's state changes.
+
+Tick timing comes from a PollScheduler: the loop wakes up when the first
+watched job is due, so a job deep in the queue doesn't keep the loop busy.
+"""
+import threading
+import time
+
+import requests
+
+from poll_schedule import PollScheduler
+
+POLL_INTERVAL = 10              # default/maximum seconds between worker wake-ups
+BULK_RETRY_AFTER = 5 * 60       # re-try /api/jobs this long after it failed
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobPoller:
+    """Watches a set of job IDs with a single polling loop."""
+
+    def __init__(self, client, interval=POLL_INTERVAL, scheduler=None):
+        self.client = client
+        self.interval = interval
+        self.scheduler = scheduler or PollScheduler(base_interval=interval)
+
+        self.stats = {"ticks": 0, "bulk_requests": 0, "status_requests": 0, "errors": 0}
+
+        self._states = {}
+        self._watched = set()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._bulk_disabled_until = 0.0
+        self._next_due = {}
+
+    # ---- watch list / subscribers ----
+
+    def watch(self, job_id, deadline=None):
+        """Starts tracking a job. deadline: running seconds after which it gets cancelled."""
+        with self._lock:
+            self._watched.add(job_id)
+            self._next_due.setdefault(job_id, 0.0)
+        if deadline is not None:
+            self.scheduler.set_deadline(job_id, deadline)
+        self._wake.set()
+
+    def unwatch(self, job_id):
+        with self._lock:
+            self._watched.discard(job_id)
+            self._next_due.pop(job_id, None)
+        self.scheduler.forget(job_id)
+
+    def watched(self):
+        with self._lock:
+            return set(self._watched)
+
+    def subscribe(self, callback):
+        """
+        Registers callback(job_id, state, previous) for state changes.
+
+        Returns:
+            callable: Call it to unsubscribe.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def get(self, job_id):
+        """Returns the last known state dict for a job (or None)."""
+        with self._lock:
+            return self._states.get(job_id)
+
+    # ---- fetching ----
+
+    def list_jobs(self):
+        """Returns the /api/jobs listing (raises on HTTP or decode errors)."""
+        self.stats["bulk_requests"] += 1
+        return self.client.list_jobs()
+
+    def fetch_status(self, job_id):
+        self.stats["status_requests"] += 1
+        return self.client.status(job_id)
+
+    def next_delay(self):
+        """Seconds until the first watched job is due (capped at the interval)."""
+        with self._lock:
+            if not self._next_due:
+                return self.interval
+            first_due = min(self._next_due.values())
+        return max(0.0, min(self.interval, first_due - time.monotonic()))
+
+    def _schedule(self, job_id, delay):
+        with self._lock:
+            if job_id in self._watched:
+                self._next_due[job_id] = time.monotonic() + delay
+
+    def poll_once(self, force=False):
+        """
+        Fetches the state of watched jobs that are due and notifies subscribers of changes.
+
+        Args:
+            force (bool): Poll every watched job, due or not.
+        """
+        watched = self.watched()
+        now = time.monotonic()
+        with self._lock:
+            due = {job_id for job_id in watched if force or self._next_due.get(job_id, 0.0) <= now}
+        if not due:
+            return {}
+        self.stats["ticks"] += 1
+
+        found = {}
+        if now >= self._bulk_disabled_until:
+            try:
+                # One listing refreshes every watched job, due or not
+                for job in self.list_jobs():
+                    job_id = job.get("job_id")
+                    if job_id in watched:
+                        found[job_id] = job
+            except (requests.exceptions.RequestException, ValueError, AttributeError):
+                self.stats["errors"] += 1
+                self._bulk_disabled_until = now + BULK_RETRY_AFTER
+
+        # The listing may be paginated or unavailable; ask for the due rest one by one
+        for job_id in due - set(found):
+            try:
+                found[job_id] = self.fetch_status(job_id)
+            except (requests.exceptions.RequestException, ValueError):
+                self.stats["errors"] += 1
+                self._schedule(job_id, self.scheduler.on_error(job_id))
+
+        for job_id, state in found.items():
+            self._schedule(job_id, self.scheduler.on_success(job_id, state))
+            self._update(job_id, state)
+        return found
+
+    def _update(self, job_id, state):
+        with self._lock:
+            previous = self._states.get(job_id)
+            self._states[job_id] = state
+            changed = previous is None or (
+                previous.get("status") != state.get("status")
+                or previous.get("queue_position") != state.get("queue_position")
+            )
+            if state.get("status") in TERMINAL_STATUSES:
+                # Terminal states never change again
+                self._watched.discard(job_id)
+                self._next_due.pop(job_id, None)
+                self.scheduler.forget(job_id)
+            subscribers = list(self._subscribers)
+
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(job_id, state, previous)
+                except Exception as e:
+                    print(f"[JobPoller] Subscriber error for {job_id}: {e}")
+
+    # ---- background loop ----
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.watched():
+                # Nothing to do: sleep until something is watched
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            # Cleared before polling so a watch() during the poll is not lost
+            self._wake.clear()
+            self.poll_once()
+            # A newly watched job is due at once: watch() cuts the wait short
+            self._wake.wait(self.next_delay())
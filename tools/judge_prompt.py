@@ -0,0 +1,201 @@
+"""
+Prompt for the LM Studio judge of PROPOSED_DEBUG_ANALYSIS_ACCURATE.
+
+The system prompt and the opening of the user message are the same for every
+call, so LM Studio reuses their cached KV state (it matches the longest
+common prefix with the previous prompt) and only evaluates the per-row part.
+
+Code and logs are fitted to a token budget (LM_STUDIO_PROMPT_TOKENS) instead
+of a char cut:
+
+- logs: the last traceback first, then the tail of the output
+- code: the lines the traceback points at and the lines around them, then the
+  top of the file
+
+Lines are kept or dropped whole and every gap is marked, so the judge never
+sees half a traceback or code without its line numbers.
+"""
+import json
+import math
+import os
+
+from score_rules import console_text, last_traceback
+from log_normalizer import EXCEPTION_LINE, TRACEBACK_START
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("LM_STUDIO_PROMPT_TOKENS", "6000"))
+# Share of the budget for logs; code gets the rest (and any logs leave unused)
+LOG_SHARE = 0.4
+# No tokenizer on this side: code and logs average ~3.5 chars per token
+CHARS_PER_TOKEN = 3.5
+# Lines of code around each traceback line, widened one line at a time
+CODE_CONTEXT_LINES = 8
+# Progress bars and dumped arrays can be one huge line
+MAX_LINE_CHARS = 500
+
+SYSTEM_PROMPT = """
+You are an expert code debugger and judge. Your task is to evaluate the accuracy of a "Proposed Debug Analysis" against the actual code and error logs.
+You must assign a score of 0, 1, or 2 based on the following strict criteria:
+
+SCORE 0:
+- The client-quoted bug was NOT thrown ever.
+- The analysis is completely wrong or irrelevant.
+
+SCORE 1:
+- The client-quoted bug was accurate but thrown in a later debug_step (not the immediate one).
+- The quoted bug was correct but the analysis/description was lacking or vague.
+- The general class of error is correct (e.g., ValueError) but the actual content/details don't match.
+- The bug is related to internet access or environmental issues that cannot be reproduced locally.
+
+SCORE 2:
+- The client-quoted analysis and bug is completely correct and accurate for the immediate error.
+
+OUTPUT FORMAT:
+You must output ONLY a single number: 0, 1, or 2. Do not add any explanation or text.
+"""
+
+USER_PREFIX = """Evaluate the Proposed Analysis below against the code and the logs of its run.
+Code lines are prefixed with their line numbers; "..." marks lines left out to save space.
+"""
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _clip(line):
+    if len(line) <= MAX_LINE_CHARS:
+        return line
+    return line[:MAX_LINE_CHARS] + f" ...[{len(line) - MAX_LINE_CHARS} chars cut]"
+
+
+def _fit(costs, order, budget):
+    """Takes line indices in priority order while their cost fits the budget."""
+    chosen = set()
+    for index in order:
+        if index in chosen or not 0 <= index < len(costs):
+            continue
+        if costs[index] > budget:
+            continue
+        chosen.add(index)
+        budget -= costs[index]
+    return chosen, budget
+
+
+def _render(lines, chosen, numbered=False):
+    out = []
+    previous = -1
+    for index in sorted(chosen):
+        if index > previous + 1:
+            out.append(f"...[{index - previous - 1} lines omitted]...")
+        out.append(f"{index + 1:>5}| {lines[index]}" if numbered else lines[index])
+        previous = index
+    if previous < len(lines) - 1:
+        out.append(f"...[{len(lines) - previous - 1} lines omitted]...")
+    return "\n".join(out)
+
+
+def log_section(logs, budget):
+    """
+    Fits a log into budget tokens.
+
+    Returns:
+        tuple: (text, unused tokens)
+    """
+    meta = ""
+    try:
+        data = json.loads(logs)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        # success, exec_time, ... without the console output itself
+        meta = _clip(json.dumps({k: v for k, v in data.items() if k != "stdout"}, ensure_ascii=False))
+        budget -= estimate_tokens(meta) + 1
+
+    lines = [_clip(line) for line in console_text(logs).splitlines()]
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    order = []
+    start = max((i for i, line in enumerate(lines) if line.startswith(TRACEBACK_START)), default=None)
+    if start is not None:
+        # The whole last traceback, up to its exception line
+        for index in range(start, len(lines)):
+            order.append(index)
+            if index > start and not lines[index][:1].isspace() and EXCEPTION_LINE.match(lines[index].strip()):
+                break
+    order.extend(range(len(lines) - 1, -1, -1))
+    chosen, left = _fit(costs, order, budget)
+    text = _render(lines, chosen) if lines else ""
+    return (f"{meta}\n{text}" if meta else text), left
+
+
+def code_section(code, logs, budget):
+    """
+    Fits code into budget tokens, keeping the lines the log's last traceback points at.
+
+    Returns:
+        tuple: (text with line numbers, unused tokens)
+    """
+    lines = [_clip(line) for line in code.splitlines()]
+    # Line number prefix "  59| " is about 2 tokens
+    costs = [estimate_tokens(line) + 2 for line in lines]
+    if sum(costs) <= budget:
+        return _render(lines, range(len(lines)), numbered=True), budget - sum(costs)
+
+    traceback = last_traceback(console_text(logs))
+    referenced = [line - 1 for line in (traceback or {}).get("lines", []) if 0 < line <= len(lines)]
+    # Innermost frame first: it is where the error was raised
+    referenced.reverse()
+    order = list(referenced)
+    for distance in range(1, CODE_CONTEXT_LINES + 1):
+        for index in referenced:
+            order += [index - distance, index + distance]
+    order.extend(range(len(lines)))
+    chosen, left = _fit(costs, order, budget)
+    return _render(lines, chosen, numbered=True), left
+
+
+def fit_inputs(code, logs, budget=None):
+    """
+    Fits code and logs into a token budget.
+
+    Args:
+        code (str): The original buggy code.
+        logs (str): The error logs from the run (JSON or plain text).
+        budget (int): Tokens for code and logs together (default: LM_STUDIO_PROMPT_TOKENS).
+
+    Returns:
+        tuple: (code text, logs text) as they go into the prompt.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    logs_text, left = log_section(logs or "", int(budget * LOG_SHARE))
+    code_text, _ = code_section(code or "", logs or "", budget - int(budget * LOG_SHARE) + left)
+    return code_text, logs_text
+
+
+def build_messages(code_text, logs_text, analysis):
+    """
+    Builds the chat messages for one judgement from fit_inputs() output.
+
+    Returns:
+        list: OpenAI-style messages; the system message and the start of the
+            user message are identical across calls.
+    """
+    user_prompt = f"""{USER_PREFIX}
+CODE:
+```python
+{code_text}
+```
+
+LOGS:
+```
+{logs_text}
+```
+
+PROPOSED ANALYSIS:
+"{analysis}"
+
+Return ONLY the score (0, 1, or 2).
+"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
@@ -1,76 +1,124 @@
 import requests
 import json
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from requests.adapters import HTTPAdapter
+
+from score_cache import get_score_cache, score_key
+from judge_prompt import build_messages, fit_inputs
+from score_rules import classify
 
 # LM Studio default URL
 LM_STUDIO_URL = "http://localhost:1234/v1/chat/completions"
 
-def get_analysis_score(code, logs, analysis, model="local-model"):
+# Requests in flight at once during batch scoring; LM Studio queues the rest,
+# so going above its parallel slots only adds latency
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("LM_STUDIO_CONCURRENCY", "4"))
+POOL_SIZE = 16
+
+# Bump whenever judge_prompt changes what the model is shown: cached scores
+# from an older prompt are then never reused
+PROMPT_VERSION = 2
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the keep-alive session shared by every scoring call (threads included)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def record_decision(decision_log, entry):
+    """Appends one scoring decision to a score_decisions.jsonl audit file."""
+    try:
+        with open(decision_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[LM Studio] Could not record decision in {decision_log}: {e}")
+
+def get_analysis_score(code, logs, analysis, model="local-model", session=None, cache=None,
+                       rules=True, decision_log=None):
     """
-    Queries LM Studio to determine the PROPOSED_DEBUG_ANALYSIS_ACCURATE score (0, 1, or 2).
+    Determines the PROPOSED_DEBUG_ANALYSIS_ACCURATE score (0, 1, or 2).
+
+    Clear-cut cases are decided by score_rules.classify() without a request;
+    the rest are answered from the score cache or by LM Studio.
     
     Args:
         code (str): The original buggy code.
         logs (str): The error logs from the run.
         analysis (str): The proposed analysis to evaluate.
         model (str): The model identifier to use (default: "local-model").
+        session (requests.Session): Session to send with (default: the shared pool).
+        cache (ScoreCache): Score cache (default: the SCORE_CACHE_* one); False skips it.
+        rules (bool): Try the rule-based scoring first.
+        decision_log (str | Path): Append how the score was reached to this JSONL file.
         
     Returns:
         str: "0", "1", or "2" based on the evaluation, or "1" if error/timeout.
     """
-    
-    system_prompt = """
-You are an expert code debugger and judge. Your task is to evaluate the accuracy of a "Proposed Debug Analysis" against the actual code and error logs.
-You must assign a score of 0, 1, or 2 based on the following strict criteria:
-
-SCORE 0:
-- The client-quoted bug was NOT thrown ever.
-- The analysis is completely wrong or irrelevant.
-
-SCORE 1:
-- The client-quoted bug was accurate but thrown in a later debug_step (not the immediate one).
-- The quoted bug was correct but the analysis/description was lacking or vague.
-- The general class of error is correct (e.g., ValueError) but the actual content/details don't match.
-- The bug is related to internet access or environmental issues that cannot be reproduced locally.
-
-SCORE 2:
-- The client-quoted analysis and bug is completely correct and accurate for the immediate error.
-
-OUTPUT FORMAT:
-You must output ONLY a single number: 0, 1, or 2. Do not add any explanation or text.
-"""
+    decision = classify(logs, analysis) if rules else {"score": None, "rule": "rules disabled"}
+    score = decision["score"]
+    path = "rules"
+    if score is None:
+        code_text, logs_text = fit_inputs(code, logs)
+        if cache is None:
+            cache = get_score_cache()
+        key = score_key(code_text, logs_text, analysis, model, PROMPT_VERSION) if cache else None
+        score = cache.get(key, model) if cache else None
+        path = "cache"
+        if score is None:
+            score = ask_lm_studio(code_text, logs_text, analysis, model, session)
+            path = "lm_studio"
+            if score is None:
+                # Not cached: the next call retries it
+                score = "1"
+                path = "fallback"
+            elif cache:
+                cache.put(key, model, score)
 
-    user_prompt = f"""
-CODE:
-```python
-{code[:10000]} # Truncated if too long
-```
+    if decision_log:
+        record_decision(decision_log, {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "score": score,
+            "path": path,
+            "model": model if path != "rules" else None,
+            "prompt_version": PROMPT_VERSION if path != "rules" else None,
+            **{k: v for k, v in decision.items() if k != "score"},
+        })
+    return score
 
-LOGS:
-```
-{logs[:5000]} # Truncated if too long
-```
-
-PROPOSED ANALYSIS:
-"{analysis}"
+def ask_lm_studio(code_text, logs_text, analysis, model="local-model", session=None):
+    """
+    Asks the LM Studio judge for a score.
 
-Based on the code and logs, evaluate the accuracy of the Proposed Analysis.
-Return ONLY the score (0, 1, or 2).
-"""
+    Args:
+        code_text (str): Code as fitted by judge_prompt.fit_inputs().
+        logs_text (str): Logs as fitted by judge_prompt.fit_inputs().
 
+    Returns:
+        str: "0", "1" or "2", or None if the request failed or the answer had no score.
+    """
     payload = {
         "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+        "messages": build_messages(code_text, logs_text, analysis),
         "temperature": 0.1, # Low temperature for deterministic output
         "max_tokens": 10
     }
 
     try:
         # Increased timeout to 120s as per user request
-        response = requests.post(LM_STUDIO_URL, json=payload, timeout=120)
+        response = (session or get_session()).post(LM_STUDIO_URL, json=payload, timeout=120)
         
         if response.status_code == 200:
             result = response.json()
@@ -83,17 +131,52 @@ Return ONLY the score (0, 1, or 2).
                 return match.group(0)
             else:
                 print(f"[LM Studio] Could not parse score from response: {content}")
-                return "1" # Fallback
+                return None
         else:
             print(f"[LM Studio] Error: {response.status_code} - {response.text}")
-            return "1" # Fallback
+            return None
 
     except requests.exceptions.ConnectionError:
         print("[LM Studio] Connection failed. Is LM Studio running on port 1234?")
-        return "1" # Fallback
+        return None
     except Exception as e:
         print(f"[LM Studio] Exception: {e}")
-        return "1" # Fallback
+        return None
+
+def print_progress(done, total, score):
+    print(f"[LM Studio] Scored {done}/{total}")
+
+def score_batch(items, model="local-model", max_in_flight=None, progress=print_progress, cache=None):
+    """
+    Scores many analyses concurrently over the shared connection pool.
+
+    Args:
+        items (list): (code, logs, analysis) or (code, logs, analysis, decision_log) tuples.
+        model (str): The model identifier to use.
+        max_in_flight (int): Requests sent at the same time (default: LM_STUDIO_CONCURRENCY or 4).
+        progress (callable): Called as progress(done, total, score) after each answer, or None.
+        cache (ScoreCache): As in get_analysis_score(); cached scores return without a request.
+
+    Returns:
+        list: Scores ("0", "1" or "2") in the same order as items.
+    """
+    items = list(items)
+    scores = [None] * len(items)
+    if not items:
+        return scores
+    session = get_session()
+    workers = max(1, min(max_in_flight or DEFAULT_MAX_IN_FLIGHT, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(get_analysis_score, code, logs, analysis, model, session, cache,
+                        decision_log=decision_log[0] if decision_log else None): index
+            for index, (code, logs, analysis, *decision_log) in enumerate(items)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            scores[futures[future]] = future.result()
+            if progress:
+                progress(done, len(items), scores[futures[future]])
+    return scores
 
 if __name__ == "__main__":
     # Simple test
@@ -0,0 +1,1075 @@
+"""
+Turns an /api/results/{job_id} response into the readable
+logs/<datarow_id>/<debug_step>.jsonl format.
+
+This is the Python port of gpu_submit.sh's process_log helper.
+normalize_results() works on a parsed response; normalize_stream() gives the
+same text straight from the downloading body without holding it in memory.
+
+Logs over the size limit are cut one of two ways (LOG_TRUNCATION):
+
+    head       keep the start of stdout (what process_log did)
+    head_tail  keep the start and the end, plus every traceback with the
+               lines before it; the gaps get a marker with line/byte counts
+               (a single over-long line keeps its start and end)
+
+Error output (stderr, error_output) keeps its last limit // 4 chars, and an
+inner log that is JSON but not an object is only pretty-printed up to 4x the
+limit; a bigger one is cut like plain text.
+"""
+import json
+import os
+import re
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, repeat
+from operator import add
+
+# Max size of the written log file (chars)
+LOG_CHAR_LIMIT = 50000
+# Inner logs that are JSON but not an object are pretty-printed up to this many
+# times the limit; normalize_stream buffers them, so bigger ones are cut as text
+OTHER_JSON_LIMIT = 4
+# Error output fields (in the results object and the response) keep their last
+# limit // ERROR_FIELD_SHARE chars
+ERROR_FIELDS = ("stderr", "error_output")
+ERROR_FIELD_SHARE = 4
+
+HEAD, HEAD_TAIL = "head", "head_tail"
+TRUNCATION_MODES = (HEAD, HEAD_TAIL)
+
+TRACEBACK_START = "Traceback (most recent call last):"
+# Last line of a traceback: "ValueError: ...", "torch.cuda.OutOfMemoryError: ...", "KeyboardInterrupt"
+EXCEPTION_LINE = re.compile(r"^[A-Za-z_][\w.]*(Error|Exception|Exit|Interrupt|Warning)?(:.*)?$")
+
+
+class Truncation:
+    """How logs over the size limit are cut."""
+
+    def __init__(self, mode=HEAD, tail_share=0.5, context_lines=10):
+        if mode not in TRUNCATION_MODES:
+            raise ValueError(f"Unknown truncation mode {mode!r} (expected one of {', '.join(TRUNCATION_MODES)})")
+        self.mode = mode
+        # head_tail: share of the room left after tracebacks that goes to the end of the log
+        self.tail_share = min(1.0, max(0.0, tail_share))
+        # head_tail: lines kept before each traceback
+        self.context_lines = max(0, context_lines)
+
+    @classmethod
+    def from_env(cls, mode=None):
+        """Settings from LOG_TRUNCATION, LOG_TAIL_SHARE and LOG_TRACEBACK_CONTEXT."""
+        return cls(
+            mode or os.getenv("LOG_TRUNCATION") or HEAD,
+            tail_share=float(os.getenv("LOG_TAIL_SHARE", "0.5")),
+            context_lines=int(os.getenv("LOG_TRACEBACK_CONTEXT", "10")),
+        )
+
+    def keeper(self, cap, overhead=10):
+        return _HeadTail(cap, self.tail_share, self.context_lines, overhead)
+
+
+def is_truncated(text):
+    """True if a normalized log had lines cut (either truncation mode)."""
+    return "char limit]..." in text or "...[LOG TRUNCATED]..." in text
+
+
+def _stdout_cap(limit):
+    # normalize_results never gives stdout more room than this (no other fields at all)
+    return max(limit - 2 - 500, 1000)
+
+
+def normalize_stdout(stdout):
+    """Splits stdout entries into separate lines so the log stays readable."""
+    normalized = []
+    for item in stdout:
+        if isinstance(item, str):
+            normalized.extend(item.splitlines())
+        else:
+            normalized.append(str(item))
+    return normalized
+
+
+def _truncate_text(log_text, limit, truncation):
+    """Cuts a plain-text log at the nearest newline before the limit (head_tail: around the middle)."""
+    if len(log_text) <= limit:
+        return log_text
+    if truncation.mode == HEAD_TAIL:
+        kept = truncation.keeper(limit, overhead=1)
+        kept.add_lines(log_text.splitlines())
+        return "\n".join(kept.select(limit, limit))
+    truncated = log_text[:limit]
+    last_newline = truncated.rfind("\n")
+    if last_newline != -1:
+        truncated = truncated[:last_newline]
+    return truncated + "\n\n...[LOG TRUNCATED]..."
+
+
+def normalize_results(wrapper, limit=LOG_CHAR_LIMIT, truncation=None):
+    """
+    Extracts the results.jsonl content from an API results response and truncates it.
+
+    Args:
+        wrapper (dict): Parsed /api/results/{job_id} response.
+        limit (int): Max size of the returned text.
+        truncation (Truncation): How to cut an oversized log (default: from the environment).
+
+    Returns:
+        str: Text to write to the .jsonl log ("" if there was nothing to write).
+    """
+    truncation = truncation or Truncation.from_env()
+    wrapper_stdout = wrapper.get("stdout", [])
+    if isinstance(wrapper_stdout, list):
+        log_text = "".join(wrapper_stdout)
+    else:
+        log_text = str(wrapper_stdout) if wrapper_stdout is not None else ""
+
+    try:
+        data = json.loads(log_text)
+    except json.JSONDecodeError:
+        # Not JSON (Format B)
+        return _truncate_text(log_text, limit, truncation)
+
+    if not isinstance(data, dict):
+        if len(log_text) > OTHER_JSON_LIMIT * limit:
+            # A huge top-level array or string isn't pretty-printed; it's cut as text
+            return _truncate_text(log_text, limit, truncation)
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    # Format A: a JSON object whose 'stdout' field holds the console lines
+    lines = normalize_stdout(data.get("stdout", []) or [])
+    for key in ERROR_FIELDS:
+        if key in data:
+            data[key] = _error_tail(data[key], limit // ERROR_FIELD_SHARE)
+
+    # Work out how much space is left for stdout once the other fields are written
+    base_data = {k: v for k, v in data.items() if k != "stdout"}
+    base_size = len(json.dumps(base_data, ensure_ascii=False, indent=2))
+    available_for_stdout = max(limit - base_size - 500, 1000)
+
+    if truncation.mode == HEAD_TAIL:
+        kept = truncation.keeper(_stdout_cap(limit))
+        kept.add_lines(lines)
+        data["stdout"] = kept.select(available_for_stdout, limit)
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    # Truncate from END (keep start)
+    final_stdout = []
+    current_size = 0
+    for line in lines:
+        # Estimate size contribution: line + quotes + comma + indent
+        line_size = len(line) + 10
+        if current_size + line_size > available_for_stdout:
+            final_stdout.append(f"...[TRUNCATED to fit {limit} char limit]...")
+            break
+        final_stdout.append(line)
+        current_size += line_size
+
+    data["stdout"] = final_stdout
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+# ---- head + tail truncation ----
+#
+# _HeadTail sees every line once and keeps, each within `cap` chars: the first
+# lines, a rolling window of the last lines, and the most recent traceback
+# blocks with the lines printed just before them. Each window is a contiguous
+# run of lines, so select() can work out the line numbers and byte offsets of
+# what it keeps and say exactly what each gap holds.
+
+def _byte_len(text):
+    return len(text.encode("utf-8", "surrogatepass"))
+
+
+def _elision_marker(lines, nbytes, limit):
+    return f"...[{lines:,} lines ({nbytes:,} bytes) elided to fit {limit} char limit]..."
+
+
+def _clipped_line(clip, limit):
+    """The start and end of an over-long line around a marker; clip = (start, length, end)."""
+    start, length, end = clip
+    return f"{start}...[{length - len(start) - len(end):,} chars elided to fit {limit} char limit]...{end}"
+
+
+def _entries(lines, index, offset, backwards=False):
+    """(line number, byte offset, bytes, line) for a run of lines starting (or, backwards, ending) at index/offset."""
+    entries = []
+    for line in reversed(lines) if backwards else lines:
+        nbytes = _byte_len(line) + 1
+        if backwards:
+            index -= 1
+            offset -= nbytes
+        entries.append((index, offset, nbytes, line))
+        if not backwards:
+            index += 1
+            offset += nbytes
+    return entries
+
+
+class _Traceback:
+    """One traceback block: the context before it, and its first and last lines."""
+
+    def __init__(self, context, start, prefix, cap, overhead):
+        self.prefix = prefix
+        # Line number of the "Traceback" line (its own entry can end up in the tail)
+        self.start = start[0]
+        # Ended with an exception line (not cut off or interrupted by other output)
+        self.complete = False
+        self.cap = cap
+        self.overhead = overhead
+        self.context = []
+        size = 0
+        # Context lines end right before the "Traceback" line (start = its line number and offset)
+        for entry in _entries(context, *start, backwards=True):
+            size += len(entry[3]) + overhead
+            if size > cap:
+                break
+            self.context.insert(0, entry)
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.size = None             # set by close()
+
+    def add(self, entry):
+        size = len(entry[3]) + self.overhead
+        # A huge traceback (RecursionError) keeps its first and last frames
+        if not self.tail and self.head_size + size <= self.cap:
+            self.head.append(entry)
+            self.head_size += size
+            return
+        self.tail.append(entry)
+        self.tail_size += size
+        while self.tail_size > self.cap:
+            self.tail_size -= len(self.tail.popleft()[3]) + self.overhead
+
+    def close(self):
+        self.size = sum(len(entry[3]) + self.overhead for entry in self.context) + self.head_size + self.tail_size
+
+    def entries(self):
+        return self.context + self.head + list(self.tail)
+
+
+class _HeadTail:
+    """Line sink for head_tail truncation; see select()."""
+
+    # Streaming never needs to stop early: the tail is only known at the end
+    full = False
+
+    def __init__(self, cap, tail_share, context_lines, overhead=10):
+        self.cap = cap
+        self.tail_share = tail_share
+        # Size of a line = its length + overhead (quotes, comma and indent in the JSON list)
+        self.overhead = overhead
+        self.count = 0
+        self.bytes = 0
+        self.size = 0
+        self.head = []               # lines 0..len(head)-1
+        self.head_size = 0
+        self.head_full = False
+        self.tail = deque()          # the last lines, up to line count-1
+        self.tail_size = 0
+        self.recent = deque(maxlen=context_lines)
+        self.tracebacks = deque()
+        self.tracebacks_size = 0
+        self.incomplete = 0
+        self.traceback = None        # block being read
+        # Chars kept from each end of a line too long to keep whole
+        self.clip = cap // 8
+        # (line number, byte offset, bytes, clip) of the over-long lines right
+        # after the head and (the latest one) right before the tail
+        self.first_long = None
+        self.last_long = None
+
+    def room(self):
+        """Longest line worth keeping; anything longer is only clipped."""
+        return self.cap - self.overhead
+
+    def add_skipped(self, nbytes, clip):
+        """
+        Counts a line too long to keep (nbytes includes its newline); clip is
+        (its first self.clip chars, its length, its last self.clip chars).
+        """
+        entry = (self.count, self.bytes, nbytes, clip)
+        if not self.head_full:
+            self.first_long = entry
+        self.last_long = entry
+        self.count += 1
+        self.bytes += nbytes
+        self.size += self.cap + 1
+        self.head_full = True
+        # The tail and the context only ever hold unbroken runs of lines
+        self.tail.clear()
+        self.tail_size = 0
+        self.recent.clear()
+
+    def value(self, obj):
+        self.add(str(obj))
+
+    def add(self, line):
+        nbytes = _byte_len(line) + 1
+        if len(line) > self.room():
+            self.add_skipped(nbytes, (line[:self.clip], len(line), line[-self.clip:]))
+            return
+        index, offset = self.count, self.bytes
+        self.count += 1
+        self.bytes += nbytes
+        size = len(line) + self.overhead
+        self.size += size
+
+        if not self.head_full:
+            if self.head_size + size <= self.cap:
+                self.head.append(line)
+                self.head_size += size
+            else:
+                self.head_full = True
+        self.tail.append(line)
+        self.tail_size += size
+        while self.tail_size > self.cap:
+            self.tail_size -= len(self.tail.popleft()) + self.overhead
+
+        if self.traceback is not None or "Traceback" in line:
+            self._scan((index, offset, nbytes, line))
+        self.recent.append(line)
+
+    def add_lines(self, lines):
+        """Same as add() for each line, but runs of ordinary lines are only counted."""
+        if not lines:
+            return
+        if max(map(len, lines)) > self.room():
+            for line in lines:
+                self.add(line)
+            return
+        joined = "\n".join(lines)
+        i = pos = 0
+        while i < len(lines):
+            if self.traceback is not None or not self.head_full:
+                self.add(lines[i])
+                pos += len(lines[i]) + 1
+                i += 1
+                continue
+            # Up to the next line that could start a traceback nothing needs a closer look
+            at = joined.find("Traceback", pos)
+            end = len(lines) if at == -1 else i + joined.count("\n", pos, at)
+            if end > i:
+                run = lines[i:end]
+                chars = sum(map(len, run))
+                # The joined run already has the newlines between its lines; add the last one
+                self._count_run(run, chars, _byte_len(joined[pos:pos + chars + len(run) - 1]) + 1)
+                pos += chars + len(run)
+                i = end
+            if i < len(lines):
+                self.add(lines[i])
+                pos += len(lines[i]) + 1
+                i += 1
+
+    def _count_run(self, run, chars, nbytes):
+        size = chars + len(run) * self.overhead
+        self.count += len(run)
+        self.bytes += nbytes
+        self.size += size
+        if self.recent.maxlen:
+            self.recent.extend(run[-self.recent.maxlen:])
+        if size < self.cap:
+            self.tail.extend(run)
+            self.tail_size += size
+            while self.tail_size > self.cap:
+                self.tail_size -= len(self.tail.popleft()) + self.overhead
+            return
+        # The run fills the window on its own: keep its longest suffix that fits
+        sizes = list(accumulate(map(add, map(len, reversed(run)), repeat(self.overhead)), initial=0))
+        keep = bisect_right(sizes, self.cap) - 1
+        self.tail = deque(run[len(run) - keep:] if keep else ())
+        self.tail_size = sizes[keep]
+
+    def _scan(self, entry):
+        index, offset, _, line = entry
+        block = self.traceback
+        if block is not None:
+            if len(block.head) == 1 and not line.startswith(block.prefix):
+                # The traceback began mid-line (after a progress bar); the first frame shows the real prefix
+                at = line.find('  File "')
+                if at != -1:
+                    block.prefix = line[:at]
+            body = line[len(block.prefix):] if line.startswith(block.prefix) else line
+            stripped = body.rstrip()
+            if not stripped or stripped[0].isspace():
+                block.add(entry)
+                return
+            # Frames are indented; the first unindented line ends the traceback
+            ends_block = EXCEPTION_LINE.match(stripped)
+            if ends_block:
+                block.add(entry)
+                block.complete = True
+            self._close_traceback()
+            if ends_block:
+                return
+        stripped = line.rstrip()
+        if stripped.endswith(TRACEBACK_START):
+            # "[rank0]: Traceback ..." prefixes every line of the traceback the same way
+            prefix = stripped[:-len(TRACEBACK_START)]
+            self.traceback = _Traceback(self.recent, (index, offset), prefix, self.cap // 4, self.overhead)
+            self.traceback.add(entry)
+
+    def _close_traceback(self):
+        block, self.traceback = self.traceback, None
+        block.close()
+        self.tracebacks.append(block)
+        self.tracebacks_size += block.size
+        self.incomplete += not block.complete
+        # Keep the latest ones, dropping cut-off tracebacks first; the last
+        # complete traceback is usually the one that killed the job
+        while self.tracebacks_size > self.cap and len(self.tracebacks) > 1:
+            if self.incomplete:
+                drop = next(b for b in self.tracebacks if not b.complete)
+                self.tracebacks.remove(drop)
+                self.incomplete -= 1
+            else:
+                drop = self.tracebacks.popleft()
+            self.tracebacks_size -= drop.size
+
+    def select(self, budget, limit):
+        """
+        Picks the lines to write within `budget` chars, in this order of priority:
+        tracebacks (complete ones first, newest first), then the end and the start
+        of the log split by tail_share. Each run of dropped lines becomes one
+        elision marker.
+
+        Returns:
+            list: Lines with markers, in log order.
+        """
+        if self.size <= budget:
+            return list(self.head)
+
+        chosen = {}
+        marker_size = len(_elision_marker(self.count, self.bytes, limit)) + self.overhead
+
+        def take(entries, room):
+            used = 0
+            for entry in entries:
+                if entry[0] in chosen:
+                    continue
+                size = len(entry[3]) + self.overhead
+                if used + size > room:
+                    break
+                chosen[entry[0]] = entry
+                used += size
+            return used
+
+        # Room for the markers around the head and the tail
+        remaining = budget - 2 * marker_size
+        blocks = list(self.tracebacks) + ([self.traceback] if self.traceback is not None else [])
+        # Complete tracebacks first, newest first
+        blocks.sort(key=lambda block: (block.complete, block.start), reverse=True)
+        for block in blocks:
+            entries = [entry for entry in block.entries() if entry[0] not in chosen]
+            size = sum(len(entry[3]) + self.overhead for entry in entries) + marker_size
+            if size > remaining:
+                # Keep as much of the end (the exception) as fits, then stop
+                remaining -= take(reversed(entries), remaining - marker_size)
+                break
+            take(entries, size)
+            remaining -= size
+
+        remaining = max(remaining, 0)
+        # Newest first
+        tail = _entries(self.tail, self.count, self.bytes, backwards=True)
+        head = _entries(self.head, 0, 0)
+        # An over-long line next to the head or the tail keeps its start and end
+        long_lines = ((self.last_long, tail, self.count - len(self.tail) - 1), (self.first_long, head, len(self.head)))
+        for long, entries, index in long_lines:
+            if long is not None and long[0] == index:
+                entries.append(long[:3] + (_clipped_line(long[3], limit),))
+        tail_used = take(tail, int(remaining * self.tail_share))
+        head_used = take(head, remaining - tail_used)
+        # Whatever the head didn't need goes to the tail
+        take(tail, remaining - tail_used - head_used)
+
+        selected = []
+        next_index = next_byte = 0
+        for index in sorted(chosen):
+            _, offset, nbytes, line = chosen[index]
+            if index > next_index:
+                selected.append(_elision_marker(index - next_index, offset - next_byte, limit))
+            selected.append(line)
+            next_index, next_byte = index + 1, offset + nbytes
+        if self.count > next_index:
+            selected.append(_elision_marker(self.count - next_index, self.bytes - next_byte, limit))
+        return selected
+
+
+# ---- streaming normalizer ----
+#
+# normalize_stream() produces exactly what normalize_results() does, but from
+# the response body as a stream of text chunks: the wrapper's stdout string is
+# decoded piece by piece and fed straight into a second parser for the inner
+# results object, which keeps only the stdout lines that can fit the budget
+# and the end of the error output. Memory stays around `limit` no matter how
+# big the log is.
+
+# A run of string content with only complete escapes
+_STRING_RUN = re.compile(r'(?:[^"\\\x00-\x1f]+|\\u[0-9a-fA-F]{4}|\\["\\/bfnrt])*')
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}')
+_RAW_SPECIAL = re.compile(r'["{}\[\],]')
+_RAW_STRING_SPECIAL = re.compile(r'["\\]')
+_WHITESPACE = " \t\n\r"
+# What str.splitlines() splits on
+_LINE_BREAKS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+
+(_START, _KEY_OR_END, _KEY, _KEY_STRING, _COLON, _VALUE, _RAW, _STRING,
+ _ITEM_OR_END, _ITEM, _ITEM_STRING, _ITEM_RAW, _ITEM_SEP, _AFTER_VALUE, _DONE) = range(15)
+
+
+class _ObjectScanner:
+    """
+    Push parser for one JSON object.
+
+    Members named in `streams` are decoded and handed to their handler as they
+    arrive (text(piece) per string fragment, end_item() after each array
+    element, value(obj) for non-string elements); every other member is kept as
+    raw JSON text and parsed by raw_values().
+    """
+
+    def __init__(self, streams, stream_strings=()):
+        self.streams = streams
+        # Members streamed when their value is a plain string (not just an array of strings)
+        self.stream_strings = stream_strings
+        self.state = _START
+        self.members = []            # [(key, raw_text or None if streamed)]
+        self.strings = set()         # streamed members that were plain strings
+        self._buf = ""
+        self._key = []
+        self._raw = []
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self._handler = None
+
+    def feed(self, chunk):
+        """Consumes the next piece of the document. Raises ValueError on invalid JSON."""
+        buf = self._buf + chunk
+        pos = self._parse(buf, 0)
+        self._buf = buf[pos:]
+
+    def finish(self):
+        if self.state != _DONE or self._buf.strip(_WHITESPACE):
+            raise ValueError("Incomplete or invalid JSON object")
+
+    def raw_values(self):
+        """Returns {key: parsed value} for the members that were not streamed."""
+        return {key: json.loads(raw) for key, raw in self.members if raw is not None}
+
+    # ---- parsing ----
+
+    def _skip_ws(self, buf, pos):
+        n = len(buf)
+        while pos < n and buf[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _read_string(self, buf, pos, emit):
+        """Decodes string content from pos (after the opening quote). Returns (pos, finished)."""
+        n = len(buf)
+        end = _STRING_RUN.match(buf, pos).end()
+        finished = end < n and buf[end] == '"'
+        if not finished:
+            if end < n and buf[end] != "\\":
+                raise ValueError("Invalid control character in string")
+            if end < n and not (n - end == 1 or (buf[end + 1] == "u" and n - end < 6)):
+                raise ValueError("Invalid escape in string")
+            # Keep a trailing high surrogate back so it pairs with a low one in the next chunk
+            if end - pos >= 6 and _HIGH_SURROGATE.match(buf, end - 6):
+                backslashes = end - 6
+                while backslashes > pos and buf[backslashes - 1] == "\\":
+                    backslashes -= 1
+                if (end - 6 - backslashes) % 2 == 0:
+                    end -= 6
+        if end > pos:
+            # One C-level decode per run instead of one Python step per escape
+            emit(json.loads('"' + buf[pos:end] + '"'))
+        return (end + 1, True) if finished else (end, False)
+
+    def _stream_string(self, buf, pos):
+        # One handler call per chunk instead of one per escape sequence
+        pieces = []
+        pos, finished = self._read_string(buf, pos, pieces.append)
+        if pieces:
+            self._handler.text("".join(pieces))
+        return pos, finished
+
+    def _scan_raw(self, buf, pos):
+        """Captures a raw JSON value up to the ',', '}' or ']' that ends it. Returns (pos, finished)."""
+        n = len(buf)
+        start = pos
+        while pos < n:
+            if self._raw_in_string:
+                match = _RAW_STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = n
+                    break
+                if match.group() == "\\":
+                    if match.end() >= n:
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._raw_in_string = False
+                pos = match.end()
+                continue
+            match = _RAW_SPECIAL.search(buf, pos)
+            if match is None:
+                pos = n
+                break
+            char = match.group()
+            if char == '"':
+                self._raw_in_string = True
+            elif char in "{[":
+                self._raw_depth += 1
+            elif self._raw_depth:
+                if char in "}]":
+                    self._raw_depth -= 1
+            else:
+                self._raw.append(buf[start:match.start()])
+                return match.start(), True
+            pos = match.end()
+        self._raw.append(buf[start:pos])
+        return pos, False
+
+    def _take_raw(self):
+        raw = "".join(self._raw)
+        self._raw = []
+        if not raw.strip(_WHITESPACE):
+            raise ValueError("Expected a value")
+        return raw
+
+    def _parse(self, buf, pos):
+        n = len(buf)
+        while True:
+            if self.state not in (_KEY_STRING, _STRING, _ITEM_STRING, _RAW, _ITEM_RAW):
+                pos = self._skip_ws(buf, pos)
+            if pos >= n:
+                return pos
+            state = self.state
+            char = buf[pos]
+
+            if state == _START:
+                if char != "{":
+                    raise ValueError("Expected '{'")
+                self.state = _KEY_OR_END
+                pos += 1
+            elif state in (_KEY_OR_END, _KEY):
+                if char == "}" and state == _KEY_OR_END:
+                    self.state = _DONE
+                    pos += 1
+                elif char == '"':
+                    self.state = _KEY_STRING
+                    pos += 1
+                else:
+                    raise ValueError("Expected a key")
+            elif state == _KEY_STRING:
+                pos, finished = self._read_string(buf, pos, self._key.append)
+                if not finished:
+                    return pos
+                self.state = _COLON
+            elif state == _COLON:
+                if char != ":":
+                    raise ValueError("Expected ':'")
+                self.state = _VALUE
+                pos += 1
+            elif state == _VALUE:
+                key = "".join(self._key)
+                self._key = []
+                self._handler = self.streams.get(key)
+                if self._handler is not None and char == "[":
+                    self.members.append((key, None))
+                    self.state = _ITEM_OR_END
+                    pos += 1
+                elif self._handler is not None and char == '"' and key in self.stream_strings:
+                    self.members.append((key, None))
+                    self.strings.add(key)
+                    self.state = _STRING
+                    pos += 1
+                else:
+                    self.members.append((key, ""))
+                    self.state = _RAW
+            elif state == _RAW:
+                pos, finished = self._scan_raw(buf, pos)
+                if not finished:
+                    return pos
+                key, _ = self.members[-1]
+                self.members[-1] = (key, self._take_raw())
+                self.state = _AFTER_VALUE
+            elif state == _STRING:
+                pos, finished = self._stream_string(buf, pos)
+                if not finished:
+                    return pos
+                self.state = _AFTER_VALUE
+            elif state in (_ITEM_OR_END, _ITEM):
+                if char == "]" and state == _ITEM_OR_END:
+                    self.state = _AFTER_VALUE
+                    pos += 1
+                elif char == '"':
+                    self.state = _ITEM_STRING
+                    pos += 1
+                else:
+                    self.state = _ITEM_RAW
+            elif state == _ITEM_STRING:
+                pos, finished = self._stream_string(buf, pos)
+                if not finished:
+                    return pos
+                self._handler.end_item()
+                self.state = _ITEM_SEP
+            elif state == _ITEM_RAW:
+                pos, finished = self._scan_raw(buf, pos)
+                if not finished:
+                    return pos
+                self._handler.value(json.loads(self._take_raw()))
+                self.state = _ITEM_SEP
+            elif state == _ITEM_SEP:
+                if char == ",":
+                    self.state = _ITEM
+                elif char == "]":
+                    self.state = _AFTER_VALUE
+                else:
+                    raise ValueError("Expected ',' or ']'")
+                pos += 1
+            elif state == _AFTER_VALUE:
+                if char == ",":
+                    self.state = _KEY
+                elif char == "}":
+                    self.state = _DONE
+                else:
+                    raise ValueError("Expected ',' or '}'")
+                pos += 1
+            else:
+                raise ValueError("Extra data after JSON object")
+
+
+class _LineSplitter:
+    """
+    Splits streamed stdout text into lines exactly like normalize_stdout and
+    passes them to a sink (_HeadLines or _HeadTail).
+
+    A line the sink has no room for is never buffered whole; only its size and
+    the sink's clip chars at each end are kept until it ends.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._pending = ""
+        self._skipped = None         # bytes so far of an over-long line, else None
+        self._clip = None            # [first chars, length so far, last chars] of that line
+
+    def _skip(self, text):
+        self._skipped += _byte_len(text)
+        start, length, end = self._clip
+        keep = self.sink.clip
+        self._clip = [start + text[:keep - len(start)], length + len(text), (end + text)[-keep:]]
+
+    def _end_line(self, line):
+        if self._skipped is None:
+            self.sink.add(line)
+        else:
+            self._skip(line)
+            self.sink.add_skipped(self._skipped + 1, tuple(self._clip))
+            self._skipped = self._clip = None
+
+    def text(self, piece):
+        if self.sink.full:
+            return
+        text = self._pending + piece
+        lines = text.splitlines()
+        # The last line may be unfinished (or end in a '\r' waiting for its '\n')
+        if not text or (text[-1] in _LINE_BREAKS and text[-1] != "\r"):
+            self._pending = ""
+        elif text[-1] == "\r":
+            self._pending = lines.pop() + "\r"
+        else:
+            self._pending = lines.pop()
+        if lines and self._skipped is not None:
+            self._end_line(lines[0])
+            lines = lines[1:]
+        self.sink.add_lines(lines)
+        if self.sink.full:
+            self._pending = ""
+            return
+        if self._skipped is None and len(self._pending.rstrip("\r")) > self.sink.room():
+            # This line can't be kept whole even before it ends
+            if not self.sink.clip:
+                # Nothing after it is kept either (head mode)
+                self.sink.full = True
+                self._pending = ""
+                return
+            self._skipped = 0
+            self._clip = ["", 0, ""]
+        if self._skipped is not None:
+            body = self._pending.rstrip("\r")
+            self._skip(body)
+            self._pending = self._pending[len(body):]
+
+    def end_item(self):
+        if not self.sink.full:
+            if self._skipped is not None:
+                self._end_line("")
+            else:
+                for line in self._pending.splitlines():
+                    self.sink.add(line)
+        self._pending = ""
+        self._skipped = self._clip = None
+
+    def value(self, obj):
+        if not self.sink.full:
+            self.sink.add(str(obj))
+
+
+class _HeadLines:
+    """Line sink for head truncation: collects lines until they can no longer fit `cap` chars."""
+
+    # A line that doesn't fit ends the log; none of it is kept
+    clip = 0
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.lines = []
+        self.size = 0
+        # Set once a line didn't fit: everything after it is dropped unread
+        self.full = False
+
+    def room(self):
+        return self.cap - self.size - 10
+
+    def add(self, line):
+        line_size = len(line) + 10
+        if self.size + line_size > self.cap:
+            self.full = True
+            return
+        self.lines.append(line)
+        self.size += line_size
+
+    def add_lines(self, lines):
+        for line in lines:
+            self.add(line)
+            if self.full:
+                return
+
+
+class _ErrorTail:
+    """
+    Handler for an error output member (a string or a list of strings): keeps
+    the end of it, `cap` chars at most, and counts what came before.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.items = deque()         # (item, its length, kept chars) of the latest list items
+        self.size = 0
+        self.dropped = 0
+        self.dropped_chars = 0
+        self.pending = ""            # the last cap chars of the current string
+        self.pending_chars = 0
+
+    def text(self, piece):
+        self.pending = (self.pending + piece)[-self.cap:]
+        self.pending_chars += len(piece)
+
+    def _take_pending(self):
+        text, chars = self.pending, self.pending_chars
+        self.pending, self.pending_chars = "", 0
+        if chars > len(text):
+            text = f"...[{chars - len(text):,} chars elided]...{text}"
+        return text, chars
+
+    def end_item(self):
+        self._push(*self._take_pending())
+
+    def value(self, obj):
+        self._push(obj, len(str(obj)))
+
+    def _push(self, item, chars):
+        kept = min(chars, self.cap)
+        self.items.append((item, chars, kept))
+        self.size += kept
+        while self.size > self.cap and len(self.items) > 1:
+            _, chars, kept = self.items.popleft()
+            self.size -= kept
+            self.dropped += 1
+            self.dropped_chars += chars
+
+    def result(self, string):
+        """The value to write: a string if the member was one, else a list."""
+        if string:
+            return self._take_pending()[0]
+        items = [item for item, _, _ in self.items]
+        if self.dropped:
+            items.insert(0, f"...[{self.dropped:,} earlier entries ({self.dropped_chars:,} chars) elided]...")
+        return items
+
+
+def _error_tail(value, cap):
+    """What _ErrorTail keeps of an already parsed value (other types are kept as they are)."""
+    tail = _ErrorTail(cap)
+    if isinstance(value, str):
+        tail.text(value)
+        return tail.result(string=True)
+    if not isinstance(value, list):
+        return value
+    for item in value:
+        if isinstance(item, str):
+            tail.text(item)
+            tail.end_item()
+        else:
+            tail.value(item)
+    return tail.result(string=False)
+
+
+class _InnerLog:
+    """Receives the wrapper's decoded stdout text and parses the results object inside it."""
+
+    def __init__(self, limit, truncation):
+        self.limit = limit
+        self.truncation = truncation
+        self.mode = None             # "object", "other" (JSON but not an object) or "text"
+        self.head = []
+        self.head_size = 0
+        self.total = 0
+        if truncation.mode == HEAD_TAIL:
+            self.kept = truncation.keeper(_stdout_cap(limit))
+            # Format B fallback: the whole text, line by line
+            self.text_lines = _LineSplitter(truncation.keeper(limit, overhead=1))
+        else:
+            self.kept = _HeadLines(_stdout_cap(limit))
+            self.text_lines = None
+        self.lines = _LineSplitter(self.kept)
+        self.errors = {key: _ErrorTail(limit // ERROR_FIELD_SHARE) for key in ERROR_FIELDS}
+        self.scanner = _ObjectScanner({"stdout": self.lines, **self.errors}, stream_strings=ERROR_FIELDS)
+        self.other = []
+
+    def text(self, piece):
+        if not piece:
+            return
+        self.total += len(piece)
+        # Enough of the start to fall back to plain-text truncation
+        if self.head_size <= self.limit:
+            self.head.append(piece[:self.limit + 1 - self.head_size])
+            self.head_size += len(self.head[-1])
+        if self.text_lines is not None:
+            self.text_lines.text(piece)
+
+        if self.mode is None:
+            stripped = piece.lstrip(_WHITESPACE)
+            if not stripped:
+                return
+            self.mode = "object" if stripped[0] == "{" else "other"
+        if self.mode == "object":
+            try:
+                self.scanner.feed(piece)
+            except ValueError:
+                self.mode = "text"
+        elif self.mode == "other":
+            self.other.append(piece)
+            # A giant top-level JSON array/string isn't worth buffering; truncate it as text
+            if self.total > OTHER_JSON_LIMIT * self.limit:
+                self.mode = "text"
+                self.other = []
+
+    def end_item(self):
+        pass
+
+    def value(self, obj):
+        self.text(str(obj))
+
+    def _as_text(self):
+        if self.total > self.limit and self.text_lines is not None:
+            self.text_lines.end_item()
+            return "\n".join(self.text_lines.sink.select(self.limit, self.limit))
+        # The first limit + 1 chars are all head truncation needs
+        return _truncate_text("".join(self.head), self.limit, self.truncation)
+
+    def result(self):
+        if self.mode == "other":
+            try:
+                return json.dumps(json.loads("".join(self.other)), ensure_ascii=False, indent=2)
+            except ValueError:
+                return self._as_text()
+        if self.mode != "object":
+            return self._as_text()
+        try:
+            self.scanner.finish()
+            data = {}
+            streamed = False
+            for key, raw in self.scanner.members:
+                if raw is not None:
+                    data[key] = json.loads(raw)
+                elif key in self.errors:
+                    data[key] = self.errors[key].result(string=key in self.scanner.strings)
+                else:
+                    data[key] = None
+                    streamed = True
+        except ValueError:
+            return self._as_text()
+
+        base_data = {k: v for k, v in data.items() if k != "stdout"}
+        base_size = len(json.dumps(base_data, ensure_ascii=False, indent=2))
+        available_for_stdout = max(self.limit - base_size - 500, 1000)
+
+        if not streamed:
+            # stdout missing or not a list (kept raw): same handling as normalize_results
+            if self.truncation.mode == HEAD_TAIL:
+                kept = self.truncation.keeper(_stdout_cap(self.limit))
+            else:
+                kept = _HeadLines(_stdout_cap(self.limit))
+            kept.add_lines(normalize_stdout(data.get("stdout", []) or []))
+        else:
+            kept = self.kept
+
+        if self.truncation.mode == HEAD_TAIL:
+            data["stdout"] = kept.select(available_for_stdout, self.limit)
+            return json.dumps(data, ensure_ascii=False, indent=2)
+
+        final_stdout = []
+        current_size = 0
+        for line in kept.lines:
+            line_size = len(line) + 10
+            if current_size + line_size > available_for_stdout:
+                break
+            final_stdout.append(line)
+            current_size += line_size
+        if len(final_stdout) < len(kept.lines) or kept.full:
+            final_stdout.append(f"...[TRUNCATED to fit {self.limit} char limit]...")
+
+        data["stdout"] = final_stdout
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def normalize_stream(chunks, limit=LOG_CHAR_LIMIT, truncation=None):
+    """
+    Streaming version of normalize_results() with bounded memory.
+
+    stdout and the error output fields are never held whole; other fields of
+    the response and of the results object are (they are small in practice).
+
+    Args:
+        chunks (iterable[str]): The /api/results/{job_id} body as decoded text chunks.
+        limit (int): Max size of the returned text.
+        truncation (Truncation): How to cut an oversized log (default: from the environment).
+
+    Returns:
+        tuple: (text for the .jsonl log, dict of the other response fields such as
+        exit_code and stderr; stderr keeps only its last limit // ERROR_FIELD_SHARE chars).
+
+    Raises:
+        ValueError: The response body is not a JSON object.
+    """
+    inner = _InnerLog(limit, truncation or Truncation.from_env())
+    stderr = _ErrorTail(limit // ERROR_FIELD_SHARE)
+    outer = _ObjectScanner({"stdout": inner, "stderr": stderr}, stream_strings=("stdout", "stderr"))
+    for chunk in chunks:
+        outer.feed(chunk)
+    outer.finish()
+
+    wrapper = outer.raw_values()
+    if any(key == "stderr" and raw is None for key, raw in outer.members):
+        wrapper["stderr"] = stderr.result(string="stderr" in outer.strings)
+    if "stdout" in wrapper:
+        # stdout was neither a string nor a list (e.g. null)
+        value = wrapper.pop("stdout")
+        inner.text(str(value) if value is not None else "")
+    return inner.result(), wrapper
@@ -0,0 +1,221 @@
+"""
+Live tail of a cluster job's console output.
+
+LogTail follows one job and appends what it prints to a file (normally
+logs/<datarow_id>/<debug_step>.raw.log) as it arrives, so a traceback shows
+up within seconds instead of after /api/results at the end of the run.
+
+It uses the best transport the cluster offers:
+
+1. stream:  GET /api/logs/{id}?follow=true, a chunked response held open
+2. offset:  GET /api/logs/{id}?offset=N, polled every few seconds
+3. results: GET /api/results/{id}, polled with backoff, appending whatever
+            stdout grew by (servers that only have the full results blob)
+
+Only whole lines are written, and always in append mode, so the tail can
+share a file with another writer (the UI redirects gpu_submit.sh there).
+"""
+import json
+import threading
+
+import requests
+
+from log_normalizer import EXCEPTION_LINE, TRACEBACK_START
+
+STREAM, OFFSET, RESULTS = "stream", "offset", "results"
+
+# HTTP codes that mean "this server has no such endpoint/feature"
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+def console_text(results):
+    """Console output contained in an /api/results/{job_id} response."""
+    stdout = results.get("stdout") or ""
+    if isinstance(stdout, list):
+        stdout = "".join(str(item) for item in stdout)
+    try:
+        data = json.loads(stdout)
+    except ValueError:
+        return stdout
+    if isinstance(data, dict):
+        lines = data.get("stdout") or []
+        return "".join(str(item) for item in lines) if isinstance(lines, list) else str(lines)
+    return stdout
+
+
+class TracebackDetector:
+    """Spots the first complete Python traceback in console output fed line block by line block."""
+
+    def __init__(self):
+        self.in_traceback = False
+        self.traceback = None
+        self._lines = []
+
+    def feed(self, text):
+        """
+        Scans whole lines of output.
+
+        Returns:
+            bool: True once a traceback has been printed up to its exception line.
+        """
+        if self.traceback is not None:
+            return True
+        for line in text.splitlines():
+            stripped = line.rstrip()
+            if stripped.endswith(TRACEBACK_START):
+                self.in_traceback = True
+                self._lines = [stripped]
+                continue
+            if not self.in_traceback:
+                continue
+            self._lines.append(stripped)
+            # Frames are indented; the first unindented line ends the traceback
+            if stripped and not stripped[0].isspace():
+                if EXCEPTION_LINE.match(stripped):
+                    self.traceback = "\n".join(self._lines)
+                    return True
+                self.in_traceback = False
+        return False
+
+
+class LogTail:
+    """Appends a job's console output to a file while the job runs."""
+
+    def __init__(self, client, job_id, path, interval=2.0, max_interval=30.0, on_text=None):
+        self.client = client
+        self.job_id = job_id
+        self.path = path
+        self.interval = interval
+        self.max_interval = max_interval
+        # Called with each block of complete lines (e.g. to scan for tracebacks)
+        self.on_text = on_text
+
+        self.mode = STREAM
+        self.offset = 0
+        self.bytes_written = 0
+        self._partial = ""
+        self._response = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"log-tail-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stops tailing after a last catch-up read and flushes any unterminated line."""
+        self._stop_event.set()
+        if self._thread is not None:
+            # Cut an open stream right away (it only ends when the server closes
+            # it); the catch-up read below fetches whatever it had not delivered
+            response = self._response
+            if response is not None:
+                response.close()
+            self._thread.join(timeout)
+        self._catch_up()
+        self._flush(final=True)
+
+    # ---- transports ----
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop_event.is_set():
+            try:
+                if self.mode == STREAM:
+                    self._follow()
+                    delay = self.interval
+                elif self.mode == OFFSET:
+                    self._poll_offset()
+                    delay = self.interval
+                else:
+                    grew = self._poll_results()
+                    # The blob often only fills in at the end; back off while it doesn't change
+                    delay = self.interval if grew else min(self.max_interval, delay * 2)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status in UNSUPPORTED_STATUSES and self.mode != RESULTS:
+                    self.mode = OFFSET if self.mode == STREAM and status != 404 else RESULTS
+                    continue
+                delay = min(self.max_interval, delay * 2)
+            except (requests.exceptions.RequestException, ValueError, AttributeError, OSError):
+                # Closing a stream from stop() surfaces here too
+                if self._stop_event.is_set():
+                    break
+                delay = min(self.max_interval, delay * 2)
+            self._stop_event.wait(delay)
+
+    def _follow(self):
+        response = self.client.stream_logs(self.job_id, offset=self.offset)
+        if "json" in response.headers.get("Content-Type", ""):
+            # follow isn't supported, but offset polling is
+            try:
+                self._apply_offset(response.json())
+            finally:
+                response.close()
+            self.mode = OFFSET
+            return
+        self._response = response
+        try:
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                if chunk:
+                    self.offset += len(chunk)
+                    self._append(chunk)
+        finally:
+            self._response = None
+            response.close()
+
+    def _poll_offset(self):
+        self._apply_offset(self.client.logs(self.job_id, offset=self.offset))
+
+    def _apply_offset(self, data):
+        content = data.get("content") or ""
+        next_offset = data.get("next_offset")
+        self.offset = next_offset if isinstance(next_offset, int) else self.offset + len(content)
+        if content:
+            self._append(content)
+
+    def _poll_results(self):
+        text = console_text(self.client.results(self.job_id))
+        if len(text) <= self.offset:
+            return False
+        new_text = text[self.offset:]
+        self.offset = len(text)
+        self._append(new_text)
+        return True
+
+    def _catch_up(self):
+        # A stream cut short by stop() may have missed the last lines; both
+        # stream and offset servers answer a plain offset request
+        try:
+            if self.mode == RESULTS:
+                self._poll_results()
+            else:
+                self._poll_offset()
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+
+    # ---- output ----
+
+    def _append(self, text):
+        with self._lock:
+            text = self._partial + text
+            cut = text.rfind("\n") + 1
+            self._partial = text[cut:]
+            self._write(text[:cut])
+
+    def _flush(self, final=False):
+        with self._lock:
+            if self._partial:
+                self._write(self._partial + ("\n" if final else ""))
+                self._partial = ""
+
+    def _write(self, text):
+        if not text:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+        self.bytes_written += len(text)
+        if self.on_text:
+            self.on_text(text)
@@ -0,0 +1,103 @@
+"""
+Change notifications for a handful of log files.
+
+One background thread stats every watched path every `interval` seconds and
+calls the path's callbacks when its size or mtime changes (including the
+file appearing or disappearing). Watching only the files someone follows
+keeps this to a few stats per tick, with no platform-specific watcher to
+install; a write shows up within one interval.
+"""
+import os
+import threading
+
+WATCH_INTERVAL = 0.25
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FileWatcher:
+    """Calls callback(path) whenever a watched file changes."""
+
+    def __init__(self, interval=WATCH_INTERVAL):
+        self.interval = interval
+        # path -> [last signature, callbacks]
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, path, callback):
+        """
+        Starts calling callback(path) on changes to path.
+
+        Returns:
+            callable: Call it to stop watching.
+        """
+        path = str(path)
+        with self._lock:
+            entry = self._paths.setdefault(path, [_signature(path), []])
+            entry[1].append(callback)
+        self._ensure_running()
+        self._wake.set()
+
+        def unwatch():
+            with self._lock:
+                entry = self._paths.get(path)
+                if entry and callback in entry[1]:
+                    entry[1].remove(callback)
+                    if not entry[1]:
+                        del self._paths[path]
+        return unwatch
+
+    def check(self):
+        """Stats every watched path once and notifies changes."""
+        with self._lock:
+            paths = list(self._paths)
+        for path in paths:
+            signature = _signature(path)
+            with self._lock:
+                entry = self._paths.get(path)
+                if entry is None or entry[0] == signature:
+                    continue
+                entry[0] = signature
+                callbacks = list(entry[1])
+            for callback in callbacks:
+                try:
+                    callback(path)
+                except Exception as e:
+                    print(f"[FileWatcher] Callback error for {path}: {e}")
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._paths
+            if idle:
+                # Nothing to do: sleep until something is watched
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self._wake.clear()
+            self.check()
+            # watch() cuts the wait short; stop() sets both events
+            self._wake.wait(self.interval)
@@ -0,0 +1,468 @@
+"""
+Local stand-in for the GPU cluster API.
+
+Implements /api/submit, /api/status/{job_id}, /api/results/{job_id},
+/api/cancel/{job_id}, /api/jobs and /api/nodes with simulated queueing,
+configurable run times, failures, timeouts (exit codes 137/143) and large
+stdout payloads, so gpu_submit.sh, fairy.py and the UI can be exercised
+offline.
+
+Console output is printed gradually while a job runs and can be tailed
+through /api/logs/{job_id}?offset=N (JSON) or ?follow=true (chunked
+stream); --no-log-endpoint turns that off to exercise the clients' fallback.
+
+usage:
+    python tools/mock_cluster/server.py --port 9000 --nodes 4 --run-time 5:15
+    SERVER_URL=http://127.0.0.1:9000 TOKEN=x ./gpu_submit.sh
+
+Every option can also be set through a MOCK_* environment variable
+(e.g. MOCK_NODES=8), which is handy with `uvicorn server:app`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class MockSettings:
+    """Simulation knobs for the mock cluster."""
+
+    def __init__(self, nodes=4, run_time=(5.0, 15.0), fail_rate=0.05, timeout_rate=0.05,
+                 error_rate=0.5, stdout_bytes=2000, rate_limit=0, token=None, seed=None,
+                 crash_at=None, log_endpoint=True, latency=0.0):
+        self.nodes = nodes
+        self.run_time = run_time              # (min, max) seconds
+        self.fail_rate = fail_rate            # job status 'failed' with exit code 1
+        self.timeout_rate = timeout_rate      # job status 'failed' with exit code 137/143
+        self.error_rate = error_rate          # 'completed' but the script raised (traceback in stdout)
+        self.stdout_bytes = stdout_bytes      # approx size of the console output per job
+        self.rate_limit = rate_limit          # submissions per minute, 0 = unlimited
+        self.token = token                    # required bearer token, None = accept anything
+        self.seed = seed
+        # (min, max) fraction of the run time at which a crashing script prints its
+        # traceback and then hangs (stuck workers) until the run ends; None = crash at the end
+        self.crash_at = crash_at
+        self.log_endpoint = log_endpoint      # serve /api/logs/{job_id}
+        self.latency = latency                # seconds before every /api/ response (slow cluster)
+
+    @classmethod
+    def from_env(cls):
+        def env(name, default, cast):
+            value = os.getenv(f"MOCK_{name}")
+            return cast(value) if value not in (None, "") else default
+
+        return cls(
+            nodes=env("NODES", 4, int),
+            run_time=env("RUN_TIME", (5.0, 15.0), parse_run_time),
+            fail_rate=env("FAIL_RATE", 0.05, float),
+            timeout_rate=env("TIMEOUT_RATE", 0.05, float),
+            error_rate=env("ERROR_RATE", 0.5, float),
+            stdout_bytes=env("STDOUT_BYTES", 2000, int),
+            rate_limit=env("RATE_LIMIT", 0, int),
+            token=os.getenv("MOCK_TOKEN") or None,
+            seed=env("SEED", None, int),
+            crash_at=env("CRASH_AT", None, parse_run_time),
+            log_endpoint=env("LOG_ENDPOINT", True, lambda v: v.lower() not in ("0", "false", "no")),
+            latency=env("LATENCY", 0.0, float),
+        )
+
+
+def parse_run_time(value):
+    """'10' -> (10, 10); '5:15' -> (5, 15)."""
+    low, _, high = str(value).partition(":")
+    return float(low), float(high or low)
+
+
+TRACEBACK_TEMPLATES = [
+    ("ValueError", "could not convert string to float: 'NaN'"),
+    ("KeyError", "'target'"),
+    ("RuntimeError", "CUDA out of memory. Tried to allocate 2.00 GiB"),
+    ("FileNotFoundError", "[Errno 2] No such file or directory: '/root/data/train.csv'"),
+    ("IndexError", "list index out of range"),
+]
+
+
+def build_stdout(rng, n_bytes, traceback=None):
+    """Fake training console output of roughly n_bytes, optionally ending in a traceback."""
+    lines = ["Data Directory: /root/data", "Work Directory: ."]
+    size = sum(len(line) + 1 for line in lines)
+    epoch = 0
+    while size < n_bytes:
+        epoch += 1
+        line = f"Epoch {epoch}: loss={rng.uniform(0.1, 2.0):.4f} val_loss={rng.uniform(0.1, 2.0):.4f} lr=0.001"
+        lines.append(line)
+        size += len(line) + 1
+    if traceback:
+        exc_type, message = traceback
+        lines += [
+            "Traceback (most recent call last):",
+            f'  File "solution.py", line {rng.randint(20, 300)}, in <module>',
+            "    main()",
+            f'  File "solution.py", line {rng.randint(20, 300)}, in main',
+            "    model.fit(X, y)",
+            f"{exc_type}: {message}",
+        ]
+    return lines
+
+
+class MockJob:
+    def __init__(self, job_id, competition_id, expected_time):
+        self.job_id = job_id
+        self.competition_id = competition_id
+        self.expected_time = expected_time
+        self.status = "pending"
+        self.node_id = None
+        self.created_at = datetime.now().isoformat(timespec="seconds")
+        self.started = None
+        self.finished = None
+        self.exit_code = None
+        self.stdout = ""
+        self.stderr = ""
+        # Console output printed so far (what /api/logs serves)
+        self.console = ""
+        self.task: Optional[asyncio.Task] = None
+        self.done = asyncio.Event()
+
+    def summary(self, queue_position=None):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "node_id": self.node_id,
+            "queue_position": queue_position,
+            "created_at": self.created_at,
+            "exit_code": self.exit_code,
+        }
+
+
+def parse_config(text):
+    """Reads the flat key: value config.yaml the clients send."""
+    config = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            config[key.strip()] = value.strip().strip('"')
+    return config
+
+
+def create_app(settings: Optional[MockSettings] = None) -> FastAPI:
+    settings = settings or MockSettings.from_env()
+    rng = random.Random(settings.seed)
+
+    app = FastAPI(title="Mock GPU Cluster")
+    app.state.settings = settings
+    app.state.stats = {"requests": 0, "submits": 0, "by_endpoint": {}}
+
+    jobs: Dict[str, MockJob] = {}
+    queue: deque = deque()
+    free_nodes = deque(range(1, settings.nodes + 1))
+    submit_times: deque = deque()
+    node_freed = asyncio.Condition()
+
+    @app.middleware("http")
+    async def count_requests(request: Request, call_next):
+        stats = app.state.stats
+        stats["requests"] += 1
+        endpoint = "/".join(request.url.path.split("/")[:3])
+        stats["by_endpoint"][endpoint] = stats["by_endpoint"].get(endpoint, 0) + 1
+        if settings.token and request.url.path.startswith("/api/") and request.url.path != "/api/submit" \
+                and request.url.path != "/api/nodes":
+            if request.headers.get("Authorization") != f"Bearer {settings.token}":
+                return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+        if settings.latency and request.url.path.startswith("/api/"):
+            await asyncio.sleep(settings.latency)
+        return await call_next(request)
+
+    def queue_position(job):
+        try:
+            return queue.index(job.job_id) + 1
+        except ValueError:
+            return None
+
+    async def print_lines(job, lines, duration):
+        """Appends lines to the job's console output spread evenly over duration seconds."""
+        steps = max(1, min(len(lines), int(duration / 0.1)))
+        per_step = -(-len(lines) // steps)
+        for i in range(0, len(lines), per_step):
+            job.console += "\n".join(lines[i:i + per_step]) + "\n"
+            await asyncio.sleep(duration / steps)
+
+    async def run_job(job: MockJob):
+        # Wait for a free node (FIFO)
+        async with node_freed:
+            await node_freed.wait_for(lambda: free_nodes and queue and queue[0] == job.job_id)
+            queue.popleft()
+            job.node_id = free_nodes.popleft()
+            node_freed.notify_all()
+
+        job.status = "running"
+        job.started = time.monotonic()
+        roll = rng.random()
+        run_time = rng.uniform(*settings.run_time)
+        timeout_limit = job.expected_time * 2
+        try:
+            if roll < settings.timeout_rate:
+                # Killed at 2x expected_time (or earlier if the simulated run is shorter)
+                await print_lines(job, build_stdout(rng, settings.stdout_bytes), min(run_time, timeout_limit))
+                job.status = "failed"
+                job.exit_code = rng.choice([137, 143])
+                job.stderr = f"Job killed: timeout after {timeout_limit}s"
+            elif roll < settings.timeout_rate + settings.fail_rate:
+                await print_lines(job, build_stdout(rng, settings.stdout_bytes), run_time)
+                job.status = "failed"
+                job.exit_code = 1
+                job.stderr = "Grading failed: submission.csv not found"
+            else:
+                crashed = rng.random() < settings.error_rate
+                traceback = rng.choice(TRACEBACK_TEMPLATES) if crashed else None
+                lines = build_stdout(rng, settings.stdout_bytes, traceback)
+                if crashed and settings.crash_at:
+                    printing = run_time * rng.uniform(*settings.crash_at)
+                    await print_lines(job, lines, printing)
+                    await asyncio.sleep(run_time - printing)
+                else:
+                    await print_lines(job, lines, run_time)
+                inner = {
+                    "success": not crashed,
+                    "exit_code": 1 if crashed else 0,
+                    "timed_out": False,
+                    "exec_time": round(time.monotonic() - job.started, 2),
+                    "valid_solution": not crashed,
+                    "validation_fitness": None,
+                    "test_fitness": None if crashed else round(rng.uniform(0.5, 0.99), 5),
+                    "error_output": [],
+                    "stdout": ["\n".join(lines) + "\n"],
+                }
+                job.status = "completed"
+                job.exit_code = 0
+                job.stdout = json.dumps(inner)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.exit_code = None
+        finally:
+            job.finished = time.monotonic()
+            async with node_freed:
+                free_nodes.append(job.node_id)
+                node_freed.notify_all()
+            job.done.set()
+
+    @app.post("/api/submit")
+    async def submit(
+        code: UploadFile = File(...),
+        config_file: UploadFile = File(...),
+        wait: bool = False,
+    ):
+        now = time.monotonic()
+        while submit_times and now - submit_times[0] > 60:
+            submit_times.popleft()
+        if settings.rate_limit and len(submit_times) >= settings.rate_limit:
+            retry_after = int(60 - (now - submit_times[0])) + 1
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(retry_after)},
+            )
+        submit_times.append(now)
+
+        await code.read()
+        config = parse_config((await config_file.read()).decode("utf-8", errors="replace"))
+        if settings.token and config.get("token") != settings.token:
+            return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+
+        job = MockJob(
+            str(uuid.uuid4()),
+            config.get("competition_id", "unknown"),
+            float(config.get("expected_time") or 600),
+        )
+        jobs[job.job_id] = job
+        queue.append(job.job_id)
+        app.state.stats["submits"] += 1
+        job.task = asyncio.create_task(run_job(job))
+
+        if wait:
+            await job.done.wait()
+            return {**job.summary(), "stdout": job.stdout, "stderr": job.stderr}
+        return {
+            "job_id": job.job_id,
+            "node_id": job.node_id,
+            "status": job.status,
+            "message": "Job submitted successfully. Use /api/status/{job_id} to check progress.",
+        }
+
+    def get_job(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return None, JSONResponse(status_code=404, content={"detail": "Job not found"})
+        return job, None
+
+    @app.get("/api/status/{job_id}")
+    async def status(job_id: str):
+        job, error = get_job(job_id)
+        if error:
+            return error
+        return job.summary(queue_position(job))
+
+    @app.get("/api/results/{job_id}")
+    async def results(job_id: str):
+        job, error = get_job(job_id)
+        if error:
+            return error
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "stdout": job.stdout,
+            "stderr": job.stderr,
+            "exit_code": job.exit_code,
+        }
+
+    @app.get("/api/logs/{job_id}")
+    async def logs(job_id: str, offset: int = 0, follow: bool = False):
+        if not settings.log_endpoint:
+            return JSONResponse(status_code=404, content={"detail": "Not Found"})
+        job, error = get_job(job_id)
+        if error:
+            return error
+        offset = max(0, offset)
+
+        if not follow:
+            content = job.console[offset:]
+            return {
+                "job_id": job.job_id,
+                "status": job.status,
+                "offset": offset,
+                "next_offset": offset + len(content),
+                "content": content,
+                "complete": job.done.is_set(),
+            }
+
+        async def tail():
+            position = offset
+            while True:
+                finished = job.done.is_set()
+                if len(job.console) > position:
+                    chunk = job.console[position:]
+                    position += len(chunk)
+                    yield chunk
+                if finished:
+                    return
+                await asyncio.sleep(0.2)
+
+        return StreamingResponse(tail(), media_type="text/plain; charset=utf-8")
+
+    @app.post("/api/cancel/{job_id}")
+    async def cancel(job_id: str):
+        job, error = get_job(job_id)
+        if error:
+            return error
+        if job.status in ("pending", "running") and job.task:
+            if job.job_id in queue:
+                queue.remove(job.job_id)
+            job.task.cancel()
+            if job.status == "pending":
+                job.status = "cancelled"
+                job.done.set()
+            # The queue head may have changed
+            async with node_freed:
+                node_freed.notify_all()
+        return {"message": "Job cancelled successfully", "status": "cancelled"}
+
+    @app.get("/api/jobs")
+    async def list_jobs():
+        ordered = sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return {"jobs": [job.summary(queue_position(job)) for job in ordered]}
+
+    @app.get("/api/nodes")
+    async def nodes():
+        running = {job.node_id: job.job_id for job in jobs.values() if job.status == "running"}
+        return {"nodes": [
+            {"node_id": node_id, "busy": node_id in running, "job_id": running.get(node_id),
+             "queue_length": len(queue)}
+            for node_id in range(1, settings.nodes + 1)
+        ]}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        counts = {}
+        for job in jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {**app.state.stats, "jobs": counts, "queue_length": len(queue)}
+
+    return app
+
+
+def run_in_thread(settings: Optional[MockSettings] = None, host="127.0.0.1", port=0):
+    """
+    Starts the mock cluster in a background thread (for benchmarks).
+
+    Returns:
+        tuple: (uvicorn.Server, base_url, app)
+    """
+    import uvicorn
+
+    if port == 0:
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+    app = create_app(settings)
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}", app
+
+
+# Module-level app for `uvicorn server:app`, configured from MOCK_* env vars
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock GPU cluster API for offline testing and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--nodes", type=int, default=4, help="GPU nodes (jobs running at once)")
+    parser.add_argument("--run-time", default="5:15", help="seconds per job, N or MIN:MAX")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="fraction of jobs that fail (exit 1)")
+    parser.add_argument("--timeout-rate", type=float, default=0.05, help="fraction of jobs killed (exit 137/143)")
+    parser.add_argument("--error-rate", type=float, default=0.5, help="fraction of completed jobs whose script raised")
+    parser.add_argument("--stdout-bytes", type=int, default=2000, help="approx console output size per job")
+    parser.add_argument("--rate-limit", type=int, default=0, help="submissions per minute (0 = unlimited)")
+    parser.add_argument("--token", help="require this bearer token")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible runs")
+    parser.add_argument("--crash-at", help="fraction of the run time (N or MIN:MAX) at which crashing scripts "
+                                           "print their traceback and then hang until the run ends")
+    parser.add_argument("--no-log-endpoint", action="store_true", help="don't serve /api/logs (streaming fallback)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API response")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = MockSettings(
+        nodes=args.nodes,
+        run_time=parse_run_time(args.run_time),
+        fail_rate=args.fail_rate,
+        timeout_rate=args.timeout_rate,
+        error_rate=args.error_rate,
+        stdout_bytes=args.stdout_bytes,
+        rate_limit=args.rate_limit,
+        token=args.token,
+        seed=args.seed,
+        crash_at=parse_run_time(args.crash_at) if args.crash_at else None,
+        log_endpoint=not args.no_log_endpoint,
+        latency=args.latency,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Adaptive polling intervals for GPU cluster jobs.
+
+Instead of a fixed 10 second sleep, the next poll is picked from the state
+the server already returns:
+
+- pending: proportional to queue_position (deep in the queue -> slow)
+- running: fast right after start (most repro crashes happen early) and
+  close to the job's deadline, the normal interval otherwise
+- errors: exponential backoff with jitter
+
+Per-job stats compare the polls actually made with what a fixed-interval
+loop would have sent.
+"""
+import random
+import threading
+import time
+
+FIXED_INTERVAL = 10         # what gpu_submit.sh used, for the "requests saved" stats
+
+
+class PollScheduler:
+    """Picks the next poll delay per job and keeps request statistics."""
+
+    def __init__(self, base_interval=10.0, min_interval=3.0, max_interval=60.0,
+                 per_queue_position=5.0, startup_window=60.0, max_backoff=300.0, jitter=0.2):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max_interval
+        self.per_queue_position = per_queue_position
+        self.startup_window = startup_window
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self._jobs = {}
+        # Totals of the jobs forgotten so far (a long-running UI sees thousands)
+        self._retired = {"jobs": 0, "polls": 0, "errors": 0, "fixed_polls": 0, "saved": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_job():
+        return {
+            "first_seen": time.monotonic(),
+            "running_since": None,
+            "deadline": None,
+            "polls": 0,
+            "errors": 0,
+            "consecutive_errors": 0,
+            "status": None,
+            "finished": None,
+        }
+
+    def _job(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = self._new_job()
+        return job
+
+    def _clamp(self, seconds):
+        return max(self.min_interval, min(self.max_interval, seconds))
+
+    def set_deadline(self, job_id, seconds):
+        """Tells the scheduler the job gets cancelled after running this long."""
+        with self._lock:
+            self._job(job_id)["deadline"] = seconds
+
+    def on_success(self, job_id, state):
+        """Records a successful poll and returns the delay until the next one."""
+        with self._lock:
+            job = self._job(job_id)
+            job["polls"] += 1
+            job["consecutive_errors"] = 0
+            return self._interval_for(job, state or {})
+
+    def on_error(self, job_id):
+        """Records a failed poll and returns a backoff delay (with jitter)."""
+        with self._lock:
+            job = self._job(job_id)
+            job["polls"] += 1
+            job["errors"] += 1
+            job["consecutive_errors"] += 1
+            backoff = min(self.max_backoff, self.base_interval * 2 ** (job["consecutive_errors"] - 1))
+            return backoff * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _interval_for(self, job, state):
+        status = state.get("status")
+        job["status"] = status
+        now = time.monotonic()
+
+        if status in ("completed", "failed", "cancelled"):
+            job["finished"] = job["finished"] or now
+            return self.max_interval
+
+        if status == "pending":
+            queue_position = state.get("queue_position")
+            if isinstance(queue_position, (int, float)):
+                return self._clamp(queue_position * self.per_queue_position)
+            return self.base_interval
+
+        if status == "running":
+            if job["running_since"] is None:
+                job["running_since"] = now
+            running_for = now - job["running_since"]
+            if running_for < self.startup_window:
+                return self.min_interval
+            if job["deadline"] is not None:
+                remaining = job["deadline"] - running_for
+                if remaining < self.base_interval:
+                    return self._clamp(remaining)
+            return self.base_interval
+
+        return self.base_interval
+
+    def interval_hint(self, job_id, state):
+        """Suggested delay for a client that polls on our behalf (no stats recorded)."""
+        with self._lock:
+            job = dict(self._jobs.get(job_id) or self._new_job())
+            return self._interval_for(job, state or {})
+
+    @staticmethod
+    def _job_stats(job, now):
+        elapsed = (job["finished"] or now) - job["first_seen"]
+        fixed_polls = int(elapsed // FIXED_INTERVAL) + 1
+        return {
+            "polls": job["polls"],
+            "errors": job["errors"],
+            "fixed_polls": fixed_polls,
+            "saved": fixed_polls - job["polls"],
+            "status": job["status"],
+        }
+
+    def forget(self, job_id):
+        """Drops a finished or unwatched job, keeping its counts in summary()."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return
+            stats = self._job_stats(job, time.monotonic())
+            self._retired["jobs"] += 1
+            for key in ("polls", "errors", "fixed_polls", "saved"):
+                self._retired[key] += stats[key]
+
+    def stats(self):
+        """
+        Returns per-job poll counts next to a fixed 10 second loop (jobs not forgotten yet).
+
+        Returns:
+            dict: {job_id: {"polls", "errors", "fixed_polls", "saved", "status"}}
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {job_id: self._job_stats(job, now) for job_id, job in self._jobs.items()}
+
+    def summary(self):
+        """Totals over all jobs, forgotten ones included (same keys as a single stats() entry)."""
+        with self._lock:
+            totals = dict(self._retired)
+        for job in self.stats().values():
+            totals["jobs"] += 1
+            for key in ("polls", "errors", "fixed_polls", "saved"):
+                totals[key] += job[key]
+        return totals
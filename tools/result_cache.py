@@ -0,0 +1,199 @@
+"""
+Content-addressed cache of processed job results.
+
+A run is keyed on sha256(code + competition_id + expected_time), so
+resubmitting byte-identical code returns the stored log instantly instead of
+spending GPU minutes. Each entry records the cluster that produced it: a
+result from another server (the mock cluster, say) is a miss. Entries live
+as JSON files under RESULT_CACHE_DIR and are evicted by age
+(RESULT_CACHE_MAX_AGE_DAYS) and total size (RESULT_CACHE_MAX_MB, least
+recently used first).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "results"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+# Puts between full scans: they drop expired entries and correct the running size
+# (get() and invalidate() delete files without updating it)
+EVICT_EVERY = 100
+
+
+def cache_key(code, competition_id, expected_time):
+    """
+    Hashes everything that determines a run's outcome.
+
+    Args:
+        code (bytes | str | Path): The code itself, or a path to the code file.
+        competition_id (str): Competition ID.
+        expected_time (int): Expected runtime in seconds (it sets the cluster timeout).
+
+    Returns:
+        str: Hex sha256 digest.
+    """
+    if isinstance(code, Path):
+        code = code.read_bytes()
+    elif isinstance(code, str):
+        code = code.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(code)
+    # Separators keep ("ab", "c") and ("a", "bc") from colliding
+    digest.update(b"\0" + competition_id.encode("utf-8"))
+    digest.update(b"\0" + str(int(expected_time)).encode("ascii"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Stores processed logs on disk by cache_key()."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Total bytes on disk, known after the first scan and kept up to date by put()
+        self._size = None
+        self._puts = 0
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key, truncation=None, server_url=None, stop_on_error=False, cancel_after=None):
+        """
+        Returns the cached entry for key, or None on a miss or an expired entry.
+
+        Args:
+            key (str): cache_key() of the run.
+            truncation (str): Truncation mode the caller writes logs with; a log
+                cut in another mode is treated as a miss.
+            server_url (str): Cluster the caller submits to; entries produced by
+                another cluster (or stored without one) are treated as a miss.
+            stop_on_error (bool): Whether the caller cancels jobs at their first
+                traceback; entries from runs with the other setting are a miss
+                (a run cut short is not the full run's result, nor the reverse).
+            cancel_after (int): No Repro deadline the caller would run the code
+                under; a No Repro result cancelled sooner than that is a miss
+                (the longer run might reproduce the error).
+
+        Returns:
+            dict: {"log", "outcome", "job_id", "competition_id", "created_at", "truncation",
+                "server_url", "stop_on_error", "cancel_after"}
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created_at", 0) > self.max_age:
+            path.unlink(missing_ok=True)
+            return None
+        if truncation and entry.get("truncation") not in (None, truncation):
+            return None
+        if server_url and entry.get("server_url") != server_url.rstrip("/"):
+            return None
+        if bool(entry.get("stop_on_error")) != stop_on_error:
+            return None
+        if cancel_after is not None and entry.get("cancel_after") is not None \
+                and entry["cancel_after"] < cancel_after:
+            return None
+        # mtime stays the creation time, atime records the last hit for LRU eviction
+        try:
+            stat = path.stat()
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, log, outcome, job_id=None, competition_id=None, truncation=None, server_url=None,
+            stop_on_error=False, cancel_after=None):
+        """
+        Stores a processed log.
+
+        Args:
+            key (str): cache_key() of the run.
+            log (str): Contents written to logs/<datarow>/<step>.jsonl.
+            outcome (str): Batch outcome bucket (submitted, failed, skipped).
+            job_id (str): Cluster job that produced the log.
+            truncation (str): Truncation mode the log was cut with (None if nothing was cut).
+            server_url (str): Cluster that ran the job.
+            stop_on_error (bool): The job ran with stop-on-error (its log may end at the first traceback).
+            cancel_after (int): Deadline a No Repro result was auto-cancelled at (None for other results).
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "log": log,
+            "outcome": outcome,
+            "job_id": job_id,
+            "competition_id": competition_id,
+            "truncation": truncation,
+            "server_url": server_url.rstrip("/") if server_url else None,
+            "stop_on_error": stop_on_error,
+            "cancel_after": cancel_after,
+            "created_at": time.time(),
+        }
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        added = tmp.stat().st_size - replaced
+        os.replace(tmp, path)
+        with self._lock:
+            self._puts += 1
+            if self._size is not None:
+                self._size += added
+            scan = self._size is None or self._size > self.max_bytes or self._puts % EVICT_EVERY == 0
+        if scan:
+            self.evict()
+
+    def invalidate(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            total = 0
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            self._size = total
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Returns the process-wide cache configured from RESULT_CACHE_* env vars."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache(
+            os.getenv("RESULT_CACHE_DIR") or DEFAULT_CACHE_DIR,
+            max_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+            max_age=int(float(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE / 86400)) * 86400),
+        )
+    return _default_cache
@@ -0,0 +1,148 @@
+"""
+Manifest of batch runs for incremental change detection.
+
+logs/manifest.json records, per code file, the content hash, mtime and size
+it was last submitted with, the cluster job ID, the final status and where
+the result was written, the job's exit code, plus submit/start/finish
+timestamps (queue wait is started_at - submitted_at).
+
+A batch run computes its dirty set in one pass: a file whose mtime and size
+match its entry is clean without being read, a touched file is hashed and
+stays clean if the content is unchanged. Files without an entry fall back to
+gpu_submit.sh's log checks once and are then recorded.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Outcomes that count as a finished run; failed files are retried next time
+SUCCESS_OUTCOMES = ("submitted", "skipped", "legacy")
+
+
+def file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class RunManifest:
+    """JSON index of code files and their last run."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._saved_at = 0
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, name):
+        with self._lock:
+            return self.entries.get(name)
+
+    def dirty_reason(self, code_path, result_path, legacy_check=None):
+        """
+        Decides whether a code file needs a run.
+
+        Args:
+            code_path (Path): The code file.
+            result_path (Path): Where its processed log is written.
+            legacy_check (callable): Returns a skip reason for files missing from
+                the manifest (gpu_submit.sh's log checks), or None.
+
+        Returns:
+            tuple: (dirty (bool), reason (str)).
+        """
+        name = Path(code_path).name
+        stat = os.stat(code_path)
+        with self._lock:
+            entry = self.entries.get(name)
+
+        if entry is None:
+            reason = legacy_check() if legacy_check else None
+            if reason is None:
+                return True, "new file"
+            # Adopt runs done before the manifest existed
+            self._record(name, hash=file_hash(code_path), mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                         outcome="legacy", status="legacy", result_path=str(result_path))
+            return False, reason
+
+        if entry.get("outcome") not in SUCCESS_OUTCOMES:
+            return True, f"last run {entry.get('outcome') or 'unfinished'}"
+        if not Path(result_path).exists():
+            return True, "result missing"
+        if entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            return False, f"unchanged since job {entry.get('job_id')}"
+
+        # Touched: only a content change makes it dirty
+        digest = file_hash(code_path)
+        if digest != entry.get("hash"):
+            return True, "content changed"
+        self._record(name, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        return False, f"unchanged since job {entry.get('job_id')} (touched only)"
+
+    def _record(self, name, **fields):
+        with self._lock:
+            entry = self.entries.setdefault(name, {})
+            entry.update(fields)
+            entry["updated_at"] = time.time()
+
+    def record_submitted(self, code_path, code, competition_id, job_id):
+        """Records the submitted content (hash of exactly what was sent) and the job ID."""
+        stat = os.stat(code_path)
+        self._record(
+            Path(code_path).name,
+            hash=hashlib.sha256(code).hexdigest(),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            competition_id=competition_id,
+            job_id=job_id,
+            status="submitted",
+            outcome=None,
+            submitted_at=time.time(),
+            started_at=None,
+            finished_at=None,
+        )
+
+    def record_started(self, code_path):
+        self._record(Path(code_path).name, status="running", started_at=time.time())
+
+    def record_finished(self, code_path, status, outcome, result_path, exit_code=None, exec_time=None):
+        self._record(
+            Path(code_path).name,
+            status=status,
+            outcome=outcome,
+            result_path=str(result_path),
+            exit_code=exit_code,
+            exec_time=exec_time,
+            finished_at=time.time(),
+        )
+
+    def queue_wait(self, name):
+        """Seconds the job spent queued before it started running, or None."""
+        entry = self.get(name) or {}
+        if entry.get("submitted_at") and entry.get("started_at"):
+            return entry["started_at"] - entry["submitted_at"]
+        return None
+
+    def save(self, min_interval=0):
+        """Writes the manifest atomically, unless it was saved less than min_interval seconds ago."""
+        with self._lock:
+            if time.monotonic() - self._saved_at < min_interval:
+                return
+            self._saved_at = time.monotonic()
+            data = {"version": MANIFEST_VERSION, "files": self.entries}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
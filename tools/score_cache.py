@@ -0,0 +1,145 @@
+"""
+On-disk cache of LM Studio analysis scores.
+
+A score is keyed on sha256 of exactly what the model sees (the truncated code
+and logs plus the proposed analysis), the model id and the system prompt
+version, so regenerating a row whose inputs did not change skips a query that
+can take tens of seconds on a local model. Entries live as JSON files under
+SCORE_CACHE_DIR/<model>/, which makes dropping every score of one model a
+directory delete. Eviction keeps the SCORE_CACHE_MAX_ENTRIES most recently
+used scores.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "scores"
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def score_key(code, logs, analysis, model, prompt_version):
+    """
+    Hashes the prompt inputs of one scoring call.
+
+    Args:
+        code (str): Code as sent to the model (already truncated).
+        logs (str): Logs as sent to the model (already truncated).
+        analysis (str): Proposed analysis.
+        model (str): Model identifier.
+        prompt_version (int | str): Version of the system prompt.
+
+    Returns:
+        str: Hex sha256 digest.
+    """
+    digest = hashlib.sha256()
+    for part in (code, logs, analysis, model, str(prompt_version)):
+        # Separators keep ("ab", "c") and ("a", "bc") from colliding
+        digest.update(part.encode("utf-8", "surrogatepass") + b"\0")
+    return digest.hexdigest()
+
+
+def _model_dir_name(model):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", model) or "_"
+
+
+class ScoreCache:
+    """Stores scores on disk by score_key(), grouped by model."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Number of cached scores, counted on the first put; evict() only scans when over the limit
+        self._count = None
+
+    def _path(self, key, model):
+        return self.cache_dir / _model_dir_name(model) / key[:2] / f"{key}.json"
+
+    def get(self, key, model):
+        """Returns the cached score ("0", "1" or "2") for key, or None on a miss."""
+        path = self._path(key, model)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # mtime stays the creation time, atime records the last hit for LRU eviction
+        try:
+            os.utime(path, (time.time(), path.stat().st_mtime))
+        except OSError:
+            pass
+        return entry.get("score")
+
+    def put(self, key, model, score):
+        path = self._path(key, model)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        new = not path.exists()
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"score": score, "model": model, "created_at": time.time()}, f)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._count is None:
+                self._count = sum(1 for _ in self.cache_dir.glob("*/*/*.json"))
+            elif new:
+                self._count += 1
+            over = self._count > self.max_entries
+        if over:
+            self.evict()
+
+    def invalidate_model(self, model):
+        """Drops every score of a model (e.g. after swapping the weights behind its id)."""
+        with self._lock:
+            shutil.rmtree(self.cache_dir / _model_dir_name(model), ignore_errors=True)
+            self._count = None
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._count = None
+
+    def stats(self):
+        """Returns {model directory: number of cached scores}."""
+        if not self.cache_dir.is_dir():
+            return {}
+        return {
+            model_dir.name: sum(1 for _ in model_dir.glob("*/*.json"))
+            for model_dir in sorted(self.cache_dir.iterdir()) if model_dir.is_dir()
+        }
+
+    def evict(self):
+        """Drops least recently used scores until at most max_entries are left."""
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob("*/*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), path))
+            self._count = len(entries)
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                path.unlink(missing_ok=True)
+            self._count = self.max_entries
+
+
+_default_cache = None
+
+
+def get_score_cache():
+    """Returns the process-wide cache configured from SCORE_CACHE_* env vars."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ScoreCache(
+            os.getenv("SCORE_CACHE_DIR") or DEFAULT_CACHE_DIR,
+            max_entries=int(os.getenv("SCORE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+    return _default_cache
@@ -0,0 +1,156 @@
+"""
+Rule-based PROPOSED_DEBUG_ANALYSIS_ACCURATE scoring for the clear-cut cases.
+
+Most step 0 analyses quote an exception ("The code fails with a ValueError:
+'...' at line 59 because ..."). When the log's last traceback shows the same
+exception class and message, the score is 2; when the log reports a
+successful run and the analysis only names exception classes that appear
+nowhere in it, it is 0. Everything else (vague analyses, a different
+exception raised, class right but message wrong, truncated logs) is left to
+the LLM judge: an analysis can name the wrong class and still find the bug.
+"""
+import json
+import re
+
+from log_normalizer import EXCEPTION_LINE, TRACEBACK_START, is_truncated
+
+FRAME_LINE = re.compile(r'^\s*File "([^"]+)", line (\d+)')
+# Frames inside installed packages say nothing about the lines an analysis cites
+LIBRARY_PATH = re.compile(r"site-packages|dist-packages|[/\\]lib[/\\]python\d")
+EXCEPTION_NAME = re.compile(r"\b((?:[A-Za-z_]\w*\.)*[A-Z]\w*(?:Error|Exception|Exit|Interrupt))\b")
+CITED_LINES = re.compile(r"\blines?\s+(\d+)(?:\s*(?:-|–|to)\s*(\d+))?", re.IGNORECASE)
+# Shorter messages ("'target'", "0") match too much unrelated text to be trusted
+MIN_MESSAGE_CHARS = 12
+MESSAGE_KEY_CHARS = 80
+
+
+def run_succeeded(logs):
+    """True if a JSON log reports success: true."""
+    try:
+        data = json.loads(logs)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("success") is True
+
+
+def console_text(logs):
+    """Console output in a log as written to logs/<datarow>/<step>.jsonl (JSON or plain text)."""
+    try:
+        data = json.loads(logs)
+    except ValueError:
+        return logs
+    if not isinstance(data, dict):
+        return logs
+    lines = data.get("stdout") or []
+    text = "\n".join(str(line).rstrip("\n") for line in lines) if isinstance(lines, list) else str(lines)
+    # Loggers that record the exception separately
+    if data.get("exc_type"):
+        text += f"\n{data['exc_type']}: {data.get('exc_info') or ''}"
+    return text
+
+
+def last_traceback(text):
+    """
+    Finds the last traceback in console output.
+
+    Returns:
+        dict: {"exception", "message", "lines"} or None. "lines" are the line
+            numbers of the frames outside installed packages.
+    """
+    start = text.rfind(TRACEBACK_START)
+    if start == -1:
+        return None
+    lines = []
+    for line in text[start:].splitlines()[1:]:
+        frame = FRAME_LINE.match(line)
+        if frame:
+            if not LIBRARY_PATH.search(frame.group(1)):
+                lines.append(int(frame.group(2)))
+            continue
+        if line[:1].isspace() or not line.strip():
+            continue
+        if EXCEPTION_LINE.match(line.strip()):
+            exception, _, message = line.strip().partition(":")
+            return {"exception": exception, "message": message.strip(), "lines": lines}
+        break
+    return None
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[\"'`‘’“”]", "", text).lower().split())
+
+
+def _message_key(message):
+    """First sentence of an exception message, normalized (numbers later on tend to vary)."""
+    message = _normalize(message)
+    return message.split(". ")[0][:MESSAGE_KEY_CHARS]
+
+
+def _short_name(exception):
+    return exception.rsplit(".", 1)[-1]
+
+
+def classify(logs, analysis):
+    """
+    Scores the clear-cut cases without an LLM.
+
+    Args:
+        logs (str): The step 0 log (JSON or plain text).
+        analysis (str): The proposed analysis.
+
+    Returns:
+        dict: {"score": "0", "2" or None when the LLM has to decide,
+            "rule": which rule decided (or why none did), plus what was extracted}.
+    """
+    text = console_text(logs or "")
+    named = sorted({_short_name(name) for name in EXCEPTION_NAME.findall(analysis or "")})
+    decision = {"score": None, "rule": None, "analysis_exceptions": named}
+
+    traceback = last_traceback(text)
+    if traceback:
+        decision.update(traceback)
+
+    if not named:
+        decision["rule"] = "analysis names no exception"
+        return decision
+
+    if traceback is None:
+        if is_truncated(logs or "") or not text.strip():
+            decision["rule"] = "no traceback in a truncated or empty log"
+        elif any(re.search(rf"\b{re.escape(name)}\b", text) for name in named):
+            decision["rule"] = "named exception in log without a traceback"
+        elif run_succeeded(logs):
+            decision.update(score="0", rule="run succeeded, named exception not in log")
+        else:
+            decision["rule"] = "named exception not in log"
+        return decision
+
+    thrown = _short_name(traceback["exception"])
+    if thrown not in named:
+        if any(re.search(rf"\b{re.escape(name)}\b", text) for name in named):
+            decision["rule"] = "named exception in log but not the one raised"
+        elif is_truncated(logs):
+            decision["rule"] = "named exception not raised, log truncated"
+        else:
+            decision["rule"] = "named exception not in log"
+        return decision
+
+    key = _message_key(traceback["message"])
+    if len(key) < MIN_MESSAGE_CHARS:
+        decision["rule"] = "exception matches, message too short to compare"
+        return decision
+    if key not in _normalize(analysis):
+        decision["rule"] = "exception matches, message does not"
+        return decision
+
+    cited = []
+    for low, high in CITED_LINES.findall(analysis):
+        cited.append((int(low), int(high or low)))
+    if cited and traceback["lines"] and not any(
+        low <= line <= high for low, high in cited for line in traceback["lines"]
+    ):
+        decision["rule"] = "exception and message match, cited lines do not"
+        return decision
+
+    decision.update(score="2", rule="exception and message match")
+    return decision